@@ -10,7 +10,8 @@ this = sys.modules[__name__]
 wrapper_path = ".wrappers."
 
 # Change this to your SBC's file
-sbc_name = "RPi"
+# Can be overridden with the ANYGPIO_SBC environment variable (e.g. "Virtual")
+sbc_name = os.environ.get("ANYGPIO_SBC", "RPi")
 
 try:
 	#from .wrappers import RPi as SBC
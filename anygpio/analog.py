@@ -0,0 +1,157 @@
+import time, array, threading
+
+from .events import EventQueue
+
+
+# Waits shorter than this are busy-waited instead of slept (nanoseconds)
+SPIN_NS = 200000
+
+
+def _numpy(use):
+	"""
+	Returns the numpy module if use is True, or None and it is installed, else None
+	"""
+	if use is False:
+		return None
+	try:
+		import numpy
+	except ImportError:
+		if use:
+			raise
+		return None
+	return numpy
+
+
+def summary(samples):
+	"""
+	Returns the min, max and mean of a block of samples as a dict
+
+	Computed by NumPy for arrays, by the builtins (in C) for memoryviews
+	"""
+	if not len(samples):
+		return {"min": None, "max": None, "mean": None}
+	if hasattr(samples, "mean"):
+		return {"min": float(samples.min()), "max": float(samples.max()), "mean": float(samples.mean())}
+	return {"min": min(samples), "max": max(samples), "mean": sum(samples) / len(samples)}
+
+
+class AnalogStream:
+	"""
+	Samples an AnalogInputPin at a fixed rate into a preallocated ring buffer
+
+	The buffer holds blocks blocks of block float32 samples, allocated once
+		as a NumPy array or an array.array. A sampling thread writes each
+		sample in place (sleeping, then busy-waiting to each due time) and
+		hands every full block to the on_block() callbacks through an
+		EventQueue, as a view of the buffer: nothing is copied or allocated
+		per sample or per block.
+	A block is overwritten blocks periods after it was filled, the queue
+		only holds blocks - 1 so older blocks are dropped instead
+
+	Attributes:
+		pin				AnalogInputPin sampled
+		rate			Samples per second
+		block			Samples per block
+		blocks			Blocks in the ring buffer
+		buffer			The ring buffer (numpy.ndarray or array.array)
+		views			View of each block of the buffer
+		filled			Number of blocks filled
+		late			Number of samples read after their due time
+		queue			EventQueue delivering (samples, started) blocks to the callbacks
+		_callbacks		Functions called with (samples, started)
+		_running		Is the sampling thread running?
+	"""
+
+	def __init__(self, pin, rate, block=256, blocks=8, numpy=None):
+		"""
+		Sets default values, allocates the ring buffer and constructs instance of AnalogStream
+		"""
+		self.pin = pin
+		self.rate = rate
+		self.block = block
+		self.blocks = blocks
+		self.filled = 0
+		self.late = 0
+		self.queue = EventQueue(self._emit, maxsize=max(blocks - 1, 1))
+		self._callbacks = []
+		self._running = False
+		self._thread = None
+
+		numpy = _numpy(numpy)
+		if numpy is not None:
+			self.buffer = numpy.zeros(block * blocks, dtype=numpy.float32)
+			self.views = [self.buffer[index * block:(index + 1) * block] for index in range(blocks)]
+		else:
+			self.buffer = array.array("f", bytes(4 * block * blocks))
+			view = memoryview(self.buffer)
+			self.views = [view[index * block:(index + 1) * block] for index in range(blocks)]
+
+	def on_block(self, callback):
+		"""
+		Call callback(samples, started) with each full block
+		"""
+		self._callbacks.append(callback)
+
+	def start(self):
+		"""
+		Start sampling on a dedicated thread
+		"""
+		self._running = True
+		self._thread = threading.Thread(target=self._run, name="anygpio-analog", daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		"""
+		Stop sampling after the current sample
+		"""
+		self._running = False
+		if self._thread is not None and self._thread is not threading.current_thread():
+			self._thread.join()
+
+	def stats(self):
+		"""
+		Returns filled, late and the queue's dropped blocks
+		"""
+		return {"filled": self.filled, "late": self.late, "dropped": self.queue.dropped}
+
+	def _run(self):
+		"""
+		Sampling thread
+		"""
+		read = self.pin.read
+		buffer = self.buffer
+		block = self.block
+		period = int(1e9 / self.rate)
+		perf_counter_ns = time.perf_counter_ns
+		due = perf_counter_ns()
+
+		while self._running:
+			index = self.filled % self.blocks
+			offset = index * block
+			started = time.monotonic_ns()
+
+			for position in range(offset, offset + block):
+				wait = due - perf_counter_ns()
+				if wait > SPIN_NS:
+					time.sleep((wait - SPIN_NS) / 1e9)
+				elif wait < 0:
+					self.late += 1
+				while perf_counter_ns() < due:
+					pass
+
+				buffer[position] = read()
+				due += period
+
+				if not self._running:
+					return
+
+			self.filled += 1
+			self.queue.put(self.views[index], started)
+
+	def _emit(self, samples, started):
+		"""
+		Dispatcher side of the queue: run the callbacks
+		"""
+		for callback in self._callbacks:
+			callback(samples, started)
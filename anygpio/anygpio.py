@@ -1,6 +1,8 @@
-import sys, os, time
+import sys, os, time, threading
 
 from . import errors
+from .registry import PinRegistry
+from .watchstats import WatchStats
 
 # Get the running module
 this = sys.modules[__name__]
@@ -24,10 +26,15 @@ class Supports:
 	Base class for storing features supported on a given system
 
 	In the future, this will contain pull_up_down, etc
+
+	available_pins is the set of valid pin ids, None if unknown
+	analog is True if the system has analog inputs (AnalogInputPin)
 	"""
 	pwm = False
 	pull_up_down = False
 	events = False
+	analog = False
+	available_pins = None
 
 	def require(self, feature):
 		"""
@@ -35,7 +42,7 @@ class Supports:
 		"""
 		if not getattr(self, feature):
 			# self.<feature> is False (not supported)
-			raise GPIOFunctionNotSupported("Not supported on current system: ", feature)
+			raise errors.GPIOFunctionNotSupported("Not supported on current system: ", feature)
 
 
 
@@ -64,6 +71,7 @@ class Pin:
 							(0 or 1)
 		supports		Stores Supports() instance for pin support configurations
 		native			Native GPIO pin object if applicable
+		lock			Held for read-modify-write operations such as toggle()
 	"""
 
 	def __init__(self, id, name=None, action=do_nothing, *args, **kwargs):
@@ -79,6 +87,7 @@ class Pin:
 		self.desired_value = kwargs.get("desired_value") or 1
 		self.supports = Supports()
 		self.native = None
+		self.lock = threading.RLock()
 
 	def _require_system_set(self):
 		"""
@@ -130,6 +139,12 @@ class InputPin(Pin):
 							1 is Pull Up
 							None is no resistor
 							Default is 1 (PULL UP) for a button switch
+		event_queue		EventQueue between the native callback and the action
+							None if events run on the native callback thread
+		limiter			RateLimit applied to action by event() and watch()
+							None if not rate limited
+		latency			LatencyStats of event() and watch() actions
+							None if latency is not tracked
 	"""
 
 	def __init__(self, id, name=None, action=do_nothing, pull_up_down=1, *args, **kwargs):
@@ -140,6 +155,11 @@ class InputPin(Pin):
 
 		# TEMPLATE: Parse number and header (if applicable) from id by running setter
 		self.pull_up_down = pull_up_down
+		self.event_queue = None
+		self.limiter = None
+		self.latency = None
+		self._gesture_recognizer = None
+		self.counter = None
 
 	def setup(self):
 		"""
@@ -175,20 +195,40 @@ class InputPin(Pin):
 		"""
 		return (self.value() == self.desired_value)
 
-	def event(self, action=None, rising_falling=None, bounce=None, both=False):
+	def event(self, action=None, rising_falling=None, bounce=None, both=False, queue=None, overflow="drop_oldest"):
 		"""
 		Registers an event handler for interrupt-driven GPIO if supported
 
 		Uses self.action as default callback
 		Uses self.desired_value to determine GPIO.RISING or GPIO.FALLING
+
+		If queue is set (True or a queue size), the native callback only
+			enqueues the event and the action runs on a dispatcher thread
+			overflow is the policy when the queue is full ("drop_oldest" or "drop_newest")
 		"""
 
 		# Don't set self.action, just use it as default
 		action = action or self.action
 
+		if queue:
+			from .events import EventQueue, QUEUE_SIZE
+
+			# Hand the native library a callback that only enqueues
+			self.event_queue = EventQueue(action, QUEUE_SIZE if queue is True else queue, overflow, latency=self.latency)
+			action = self.event_queue.put
+		else:
+			self.event_queue = None
+
+			if self.latency:
+				action = self.latency.wrap(action)
+
+		if self.limiter:
+			# Limit before queueing so bursts don't fill the queue
+			action = self.limiter.wrap(action)
+
 		if both:
 			# Watch both RISING and FALLING
-			rising_or_falling = native_gpio.BOTH
+			rising_or_falling = self._native_both()
 		elif rising_falling is not None:
 			# Determine GPIO.RISING or GPIO.FALLING
 			rising_or_falling = self._native_rising_falling(rising_falling)
@@ -200,7 +240,7 @@ class InputPin(Pin):
 			rising_or_falling = self._native_rising_falling(not self.pull_up_down)
 
 		# Register the event callback
-		self._add_event(rising_or_falling, self.action, bounce)
+		self._add_event(rising_or_falling, action, bounce)
 
 	def remove_event(self):
 		"""
@@ -208,6 +248,147 @@ class InputPin(Pin):
 		"""
 
 		self._remove_event()
+		self.event_queue = None
+		self.counter = None
+
+	def start_counter(self, rising_falling=None, both=False):
+		"""
+		Count edges instead of running an action, for fast pulse outputs
+
+		No Python code runs per edge (see counter.PulseCounter)
+		Edges are chosen as for event(), replaces the pin's event callback
+		Returns the PulseCounter (value, total, reset())
+		"""
+		from .counter import PulseCounter
+
+		if both:
+			rising_or_falling = self._native_both()
+		elif rising_falling is not None:
+			rising_or_falling = self._native_rising_falling(rising_falling)
+		else:
+			rising_or_falling = self._native_rising_falling(not self.pull_up_down)
+
+		self.counter = PulseCounter(self, rising_or_falling)
+		return self.counter
+
+	def stop_counter(self):
+		"""
+		Stop counting edges
+		"""
+		if self.counter:
+			self.remove_event()
+
+	def track_latency(self, enabled=True):
+		"""
+		Record the latency of this pin's event() and watch() actions in histograms
+
+		Events registered before calling this are not tracked
+		"""
+		if not enabled:
+			self.latency = None
+			return None
+
+		from .latency import LatencyStats
+
+		self.latency = self.latency or LatencyStats()
+		return self.latency
+
+	def measure(self, window=16, seconds=None, timeout=1):
+		"""
+		Measure frequency, period, pulse width and duty cycle of the signal on this pin
+
+		Averages over the last window periods, or the last seconds seconds if set
+		Uses the pin's event callback
+		Returns the PulseMeter
+		"""
+		from .pulse import PulseMeter
+
+		return PulseMeter(self, window, seconds, timeout)
+
+	def pulse_train(self, decoder, trigger=None, callback=None):
+		"""
+		Decode a pulse train protocol (pulsetrain.NEC, DHT, HCSR04) from this pin's edges
+
+		trigger is the OutputPin (or query for pin()) of request/response
+			devices, None to send the request on this pin
+		callback(frame) is called with each frame of devices sending by themselves
+		Replaces the pin's event callback
+		Returns the PulseTrain (read() for request/response devices)
+		"""
+		from . import GPIO
+		from .pulsetrain import PulseTrain
+
+		train = PulseTrain(GPIO, self, decoder, trigger)
+		if callback:
+			train.on_frame(callback)
+		return train
+
+	def rate_limit(self, max_calls=None, window=1, trailing=True, on_burst=None):
+		"""
+		Limit action to max_calls per window seconds for event() and watch()
+
+		Calls over the limit are merged into one trailing call at the end of
+			the window (on_burst(Burst) if set, else action). Call with no
+			max_calls to remove the limit
+		Events registered before calling this are not limited
+		"""
+		if max_calls is None:
+			self.limiter = None
+			return None
+
+		from .ratelimit import RateLimit
+
+		self.limiter = RateLimit(max_calls, window, trailing, on_burst)
+		return self.limiter
+
+	def gestures(self):
+		"""
+		Returns the pin's GestureRecognizer, created and started on first use
+
+		Registers an event for both edges on the pin, replacing any other event
+		"""
+		if self._gesture_recognizer is None:
+			from .gestures import GestureRecognizer
+
+			self._gesture_recognizer = GestureRecognizer(self)
+			self._gesture_recognizer.start()
+		return self._gesture_recognizer
+
+	def on_gesture(self, gesture, callback, ms=None):
+		"""
+		Call callback(pin) on a gesture
+
+		gesture is "press", "release", "click", "long_press" or "double_press"
+		"""
+		self.gestures().on(gesture, callback, ms)
+
+	def on_click(self, callback):
+		"""
+		Call callback(pin) on a short press that is not part of a double press
+		"""
+		self.on_gesture("click", callback)
+
+	def on_long_press(self, callback, ms=None):
+		"""
+		Call callback(pin) when the pin is held for ms milliseconds
+
+		ms (800 by default) is shared by every long press handler of the pin
+		"""
+		self.on_gesture("long_press", callback, ms)
+
+	def on_double_press(self, callback, ms=None):
+		"""
+		Call callback(pin) when the pin is pressed again within ms milliseconds of a release
+
+		ms (300 by default) is shared by every double press handler of the pin
+		"""
+		self.on_gesture("double_press", callback, ms)
+
+	def event_stats(self):
+		"""
+		Returns the event queue depth and counters, None if events are not queued
+		"""
+		return self.event_queue.stats() if self.event_queue else None
 
 	def _add_event(self, rising_or_falling, action, bounce=300):
 		"""
@@ -237,6 +418,16 @@ class InputPin(Pin):
 
 		return wrapper._native_rising_falling(*args[1:])
 
+	def _native_both(self):
+		"""
+		Call the wrapper._native_both() method
+
+		This has to be here to have access to the wrapper variable
+		"""
+		self._require_system_set()
+
+		return wrapper._native_both()
+
 
 
 # Generic OutputPin class
@@ -267,6 +458,17 @@ class OutputPin(Pin):
 		self._require_system_set()
 		# raise errors.WrongPinType("Pin is set to input")
 
+	def toggle(self):
+		"""
+		Invert the value of the pin and return the new value
+
+		Atomic with respect to other toggle() calls on the pin
+		"""
+		with self.lock:
+			value = int(not self.input())
+			self.output(value)
+			return value
+
 	def setup(self):
 		"""
 		Initialize the output pin with the native_gpio
@@ -361,6 +563,16 @@ class PWMPin(OutputPin):
 		# Run native ChangeDutyCycle function
 		# self.native.ChangeDutyCycle(value)
 
+	def ramp(self, target, duration, curve="linear"):
+		"""
+		Ramp the duty cycle to target over duration seconds
+
+		curve is a name from ramp.CURVES or a function (0..1 -> 0..1)
+		Returns a Future resolved when the ramp finishes
+		"""
+		from .ramp import default_engine
+		return default_engine.ramp(self, target, duration, curve)
+
 	def destroy(self):
 		"""
 		Remove PWM pin configuration through native pin object then drop pin
@@ -372,29 +584,100 @@ class PWMPin(OutputPin):
 		# wrapper.drop_pin(self)
 
 
+# Generic AnalogInputPin class
+class AnalogInputPin(Pin):
+	"""
+	Derived class for storing analog input (ADC) pin configurations and related methods
+
+	Attributes:
+		stream			Running AnalogStream of the pin, None if not streaming
+	"""
+
+	def __init__(self, id, name=None, action=do_nothing, *args, **kwargs):
+		"""
+		Sets default values and constructs instance of AnalogInputPin
+		"""
+		super().__init__(id, name, action, *args, **kwargs)
+		self.is_analog = True
+		self.stream = None
+
+	def setup(self):
+		"""
+		Initialize the analog input pin with the native_gpio
+		"""
+		self._require_system_set()
+		# native_gpio.ADC.setup()
+
+	def read(self):
+		"""
+		Returns the input as a fraction of full scale (0.0 - 1.0)
+		"""
+		self._require_system_set()
+		# return native_gpio.ADC.read(self.id)
+
+	def read_raw(self):
+		"""
+		Returns the input in the native library's raw unit (e.g. ADC counts or millivolts)
+		"""
+		self._require_system_set()
+		# return native_gpio.ADC.read_raw(self.id)
+
+	def start_stream(self, rate, callback=None, block=256, blocks=8, numpy=None):
+		"""
+		Sample the pin rate times per second into a preallocated ring buffer
+
+		Every block samples, callback(samples, started) is called with the
+			block (a NumPy array, or a memoryview of an array.array) and
+			the time.monotonic_ns() of its first sample. Callbacks run on the
+			event dispatcher and must be done with a block within blocks - 1
+			block periods, when it's overwritten.
+		numpy: True to use NumPy, False for array.array, None to use NumPy if installed
+		Returns the started AnalogStream (on_block(), stats(), stop())
+		"""
+		from .analog import AnalogStream
+
+		self.stop_stream()
+		self.stream = AnalogStream(self, rate, block, blocks, numpy)
+		if callback:
+			self.stream.on_block(callback)
+		return self.stream.start()
+
+	def stop_stream(self):
+		"""
+		Stop sampling the pin
+		"""
+		if self.stream:
+			self.stream.stop()
+			self.stream = None
+
+
 # Generic module class
 class GPIO:
 	"""
 	Base class for storing GPIO pin configurations and related methods
 
 	Attributes:
-		pins			Array of configured pins
+		pins			PinRegistry (thread-safe dict) of configured pins by id
 		supports		Stores Support() instance for system-wide support configurations
 		system			String that identifies the SBC in use
 							The name of the wrapper file (no extension)
 		native			Native GPIO Library
 		_watching		Is the watch() loop running?
 							Also used to stop the watch() loop
+		_watch_stats	WatchStats of the watch() loop
+		_output_scheduler	OutputScheduler of schedule(), None until first used
 	"""
 	def __init__(self):
 		"""
 		Sets default values and constructs instance of Pin
 		"""
-		self.pins = {}
+		self.pins = PinRegistry()
 		self.supports = Supports()
 		self.system = None
 		self.native = None
 		self._watching = False
+		self._watch_stats = WatchStats()
+		self._output_scheduler = None
 
 	def _native_high_or_low(self, value):
 		"""
@@ -455,18 +738,58 @@ class GPIO:
 		"""
 		return PWMPin(*args[1:], **kwargs)
 
+	def _create_AnalogInputPin_instance(*args, **kwargs):
+		"""
+		Create an instance of AnalogInputPin
+		"""
+		return AnalogInputPin(*args[1:], **kwargs)
+
+	def _create_SoftPWMPin_instance(self, *args, **kwargs):
+		"""
+		Create an instance of SoftPWMPin
+
+		Imported here since softpwm derives from this module
+		"""
+		from .softpwm import SoftPWMPin
+		return SoftPWMPin(*args, gpio=self, **kwargs)
+
 	def _add_pin(self, pin):
 		"""
 		Add a pin to the pins array
 
 		Drops the pin if it already exists
 		"""
-		try:
-			self.drop_pin(self.pins[pin.id])
-		except KeyError:
-			# If the pin doesn't exist, ignore it
-			pass
-		self.pins[pin.id] = (pin)
+		previous = self.pins.replace(pin)
+		if previous is not None and previous is not pin:
+			self.drop_pin(previous)
+
+	def _add_pins(self, pins):
+		"""
+		Add several pins to the pins array in one update
+
+		Drops the pins they replace and returns them
+		"""
+		added = {id(pin) for pin in pins}
+		replaced = [previous for previous in self.pins.replace_all(pins) if id(previous) not in added]
+		for previous in replaced:
+			self.drop_pin(previous)
+		return replaced
+
+	def load_config(self, path, actions=None, cache=True):
+		"""
+		Configure the pins described in a JSON or TOML file, returns them
+
+		The file has a list of pins, each with id, name, mode ("in", "out"
+			or "pwm"), pull ("up", "down" or "off"), desired_value, initial,
+			frequency, duty_cycle, software, event (true or {edge, bounce,
+			queue}) and action (a key of actions)
+		The whole file is validated against the board (supports.available_pins)
+			then compiled into a plan, cached by file hash so later boots
+			skip parsing and validation
+		"""
+		from .config import load
+
+		return load(self, path, actions, cache)
 
 	def drop_pin(self, pin):
 		"""
@@ -482,36 +805,287 @@ class GPIO:
 		Remove all pin configurations
 
 		Calls destroy() on all pins
+		The registry is emptied with one swap first, so each destroy()
+			doesn't copy it again to drop its pin
 		"""
-		pins = list(self.pins)
-		for id in pins:
-			self.pins[id].destroy()
+		for pin in self.pins.clear().values():
+			pin.destroy()
 
 	def _remove_pin(self, pin):
 		"""
 		Removes a pin from the pins array
+
+		Only removes the pin if it is still the one registered under its id
 		"""
-		try:
-			del self.pins[pin.id]
-		except KeyError:
-			# If the pin doesn't exist, ignore it
-			pass
+		self.pins.discard(pin)
 
-	def PWM(self, number, frequency, duty_cycle=0, name=None):
+	def PWM(self, number, frequency, duty_cycle=0, name=None, software=False):
 		"""
 		Use this to initialize a PWM pin
 
 		Use explicit argument for name
 		PWM pins should call their own setup()
+		Software PWM is used if software is True or the system has no hardware PWM
 		"""
 		self._require_system_set()
 
-		self.supports.require('pwm')
-
-		pwm_pin = self._create_PWMPin_instance(number, name)
+		if software or not self.supports.pwm:
+			# Drive the pin from the shared software PWM engine
+			pwm_pin = self._create_SoftPWMPin_instance(number, name)
+		else:
+			pwm_pin = self._create_PWMPin_instance(number, name)
 		pwm_pin.setup(frequency, duty_cycle)
 		self._add_pin(pwm_pin)
 
+	def setup_analog(self, id, name=None):
+		"""
+		Use this to initialize an analog input pin
+
+		Raises GPIOFunctionNotSupported if the system has no analog inputs
+		"""
+		self._require_system_set()
+		self.supports.require("analog")
+
+		pin = self._create_AnalogInputPin_instance(id, name)
+		pin.setup()
+		self._add_pin(pin)
+
+	def ramp(self, pins, target, duration, curve="linear"):
+		"""
+		Ramp the duty cycle of several PWM pins together
+
+		pins can be PWMPins or queries for pin()
+		target is one duty cycle for all pins or a list with one per pin
+		Returns a Future resolved when every ramp has finished
+		"""
+		from .ramp import default_engine
+
+		pins = [self._resolve_pin(pin, PWMPin) for pin in pins]
+		return default_engine.ramp_group(pins, target, duration, curve)
+
+	def publish_state(self, name="anygpio", interval=None):
+		"""
+		Publish the state of all configured pins in shared memory
+
+		Other processes read it with mirror.MirrorReader(name)
+		With interval (seconds), inputs are also read periodically
+		Returns the StateMirror
+		"""
+		from .mirror import StateMirror
+
+		state_mirror = StateMirror(self, name).attach()
+		if interval:
+			state_mirror.refresh(interval)
+		return state_mirror
+
+	def profile(self, hook=None):
+		"""
+		Time every native call of this wrapper and its pins until stop()
+
+		hook(op, pin, duration_ns) is called after each call, by default a
+			profiling.CallStats whose report() gives calls/s and time per op per pin
+		Returns the started Profiler
+		"""
+		from .profiling import Profiler
+
+		return Profiler(self, hook).start()
+
+	def on_chord(self, pins, callback, ms=50):
+		"""
+		Call callback(pins) when all pins are pressed within ms milliseconds
+
+		pins can be InputPins or queries for pin()
+		"""
+		from .gestures import ChordDetector
+
+		pins = [self._resolve_pin(pin, InputPin) for pin in pins]
+		return ChordDetector(pins, callback, ms)
+
+	def on_count_rates(self, callback, interval=1):
+		"""
+		Call callback every interval seconds with the counts of every pin counting edges
+
+		callback gets {pin id: {"count", "delta", "rate"}}, rate is in edges per second
+		Returns the started RateReporter (stop() to stop)
+		"""
+		from .counter import RateReporter
+
+		counters = [pin.counter for pin in self.pins.values() if getattr(pin, "counter", None)]
+		return RateReporter(counters, callback, interval).start()
+
+	def encoder(self, a, b, index=None, reset_on_index=False, window=0.1):
+		"""
+		Count a quadrature encoder on input pins a and b (and an optional index pin)
+
+		Pins can be InputPins or queries for pin()
+		Returns the QuadratureEncoder (position, velocity(), errors, revolutions)
+		"""
+		from .encoder import QuadratureEncoder
+
+		return QuadratureEncoder(self, a, b, index, reset_on_index, window)
+
+	def keypad(self, rows, columns, keys=None, callback=None, scan_interval=0.005, debounce=0.02):
+		"""
+		Scan a key matrix of row output pins and column input pins (with pull up resistors)
+
+		Pins can be pins or queries for pin()
+		keys[row][column] is reported for each key, (row, column) if None
+		callback(key, pressed) is called when a key is pressed or released
+		Returns the KeypadMatrix (on_key(), pressed(), close())
+		"""
+		from .keypad import KeypadMatrix
+
+		keypad = KeypadMatrix(self, rows, columns, keys, scan_interval, debounce)
+		if callback:
+			keypad.on_key(callback)
+		return keypad
+
+	def multiplex(self, selects, segments, rate=100, brightness=1, select_active=1, segment_active=1):
+		"""
+		Refresh multiplexed 7-segment digits or LED matrix rows rate times per second
+
+		selects (one per digit or row) and segments can be OutputPins or queries for pin()
+		Returns the started Multiplexer (show(), show_text(), set_brightness(), stop())
+		"""
+		from .display import Multiplexer
+
+		return Multiplexer(self, selects, segments, rate, brightness, select_active, segment_active).start()
+
+	def charlieplex(self, pins, rate=100, brightness=1):
+		"""
+		Refresh n * (n - 1) charlieplexed LEDs on n pins rate times per second
+
+		pins can be pins or queries for pin(), they are switched between output and input
+		Returns the started Charlieplexer (show(), led(), set_brightness(), stop())
+		"""
+		from .display import Charlieplexer
+
+		return Charlieplexer(self, pins, rate, brightness).start()
+
+	def schedule(self, pin, value, at=None, delay=0):
+		"""
+		Write value to an output pin at time.monotonic_ns() at, or delay seconds from now
+
+		pin can be an OutputPin or a query for pin()
+		All writes run on one timing thread, writes due within 50µs of
+			each other are written together with output_mask()
+		Returns a ScheduledWrite (cancel(), lateness)
+		Raises WrongPinType if pin is not an output pin
+		"""
+		if self._output_scheduler is None:
+			from .timedoutput import OutputScheduler
+
+			self._output_scheduler = OutputScheduler(self)
+
+		pin = self._resolve_pin(pin, OutputPin)
+		if at is None:
+			at = time.monotonic_ns() + int(delay * 1e9)
+		return self._output_scheduler.schedule(pin, value, at)
+
+	def schedule_pulse(self, pin, width, at=None, delay=0, value=1):
+		"""
+		Set an output pin to value at at (or after delay seconds) and back width seconds later
+
+		Returns the (start, end) ScheduledWrites
+		"""
+		if at is None:
+			at = time.monotonic_ns() + int(delay * 1e9)
+		return self.schedule(pin, value, at), self.schedule(pin, not value, at + int(width * 1e9))
+
+	def cancel_scheduled(self, pin=None):
+		"""
+		Cancel every pending scheduled write (of pin if given), returns the number cancelled
+		"""
+		if self._output_scheduler is None:
+			return 0
+		if pin is not None:
+			pin = self._resolve_pin(pin, OutputPin)
+		return self._output_scheduler.cancel(pin)
+
+	def schedule_stats(self):
+		"""
+		Returns the statistics of scheduled writes: writes, batches, cancelled,
+			errors, pending and lateness (count, mean, p50, p99, max in nanoseconds)
+		"""
+		if self._output_scheduler is None:
+			return None
+		return self._output_scheduler.stats()
+
+	def capture(self, pins, rate=None, duration=1, path="capture.bin"):
+		"""
+		Record the levels of up to 64 pins into a memory mapped file, like a logic analyzer
+
+		pins can be pins or queries for pin(), bit i of each mask is pins[i]
+		With rate, the pins are read rate times per second and every sample
+			is stored. Without, they are read as fast as the backend allows
+			and only (time, mask) transitions are stored
+		Pins are read with input_mask(), blocks for duration seconds
+		Returns the capture.Capture of the file (samples, times(), levels())
+		"""
+		from . import capture
+
+		pins = [self._resolve_pin(pin, error=errors.CaptureError) for pin in pins]
+		capture.record(self, pins, rate, duration, path)
+		return capture.load(path)
+
+	def output_mask(self, pins, mask, changed=None):
+		"""
+		Output a bitmask of values to a list of output pins
+
+		Bit i of mask is the value for pins[i]
+		Only pins whose bit is set in changed are written (default all)
+		Wrappers with native port or bank writes should override this
+		"""
+		if changed is None:
+			changed = (1 << len(pins)) - 1
+
+		# Visit only the set bits of changed
+		while changed:
+			bit = changed & -changed
+			index = bit.bit_length() - 1
+			pins[index].output(1 if mask & bit else 0)
+			changed ^= bit
+
+	def input_mask(self, pins):
+		"""
+		Read a list of pins into a bitmask, bit i is the value of pins[i]
+
+		Wrappers with native port or bank reads should override this
+		"""
+		mask = 0
+		for index, pin in enumerate(pins):
+			if pin.input():
+				mask |= 1 << index
+		return mask
+
+	def sequence_writer(self, pins):
+		"""
+		Returns write(steps) to output sequences of bitmasks to a list of output pins
+
+		Each step is a (mask, changed) tuple as for output_mask()
+		Used by the protocol engines to push precomputed bit and clock sequences
+		Wrappers with faster bulk writes should override this
+		"""
+		output_mask = self.output_mask
+
+		def write(steps):
+			for mask, changed in steps:
+				output_mask(pins, mask, changed)
+		return write
+
+	def play(self, pins, samples, rate, loop=False):
+		"""
+		Stream packed pin states to output pins at rate samples per second
+
+		pins can be OutputPins or queries for pin(), bit i of each sample is pins[i]
+		samples is bytes, a memoryview or a one dimensional NumPy array
+		Returns the started Player (stop(), wait(), update() for double buffering)
+		"""
+		from .player import Player
+
+		pins = [self._resolve_pin(pin, OutputPin) for pin in pins]
+		return Player(self, pins, samples, rate, loop).start()
+
 	def _find_pin_by_number(self, number):
 		"""
 		Return pin from pins array by number
@@ -554,6 +1128,21 @@ class GPIO:
 			# If query is pin.name
 			return self._find_pin_by_name(query)
 
+	def _resolve_pin(self, pin, kind=None, error=errors.PinNotFound):
+		"""
+		Returns pin if it is a kind (default Pin) instance, else the pin found by pin(pin)
+
+		Raises error naming the query if no pin matches it
+		Raises WrongPinType if the pin is not a kind instance
+		"""
+		kind = kind or Pin
+		found = pin if isinstance(pin, Pin) else self.pin(pin)
+		if not found:
+			raise error("No configured pin matches " + repr(pin))
+		if not isinstance(found, kind):
+			raise errors.WrongPinType("Pin " + str(found.id) + " is not a " + kind.__name__)
+		return found
+
 	def setup(self):
 		"""
 		Native GPIO initialization
@@ -583,6 +1172,17 @@ class GPIO:
 
 		return (native_gpio.RISING if value else native_gpio.FALLING)
 
+	def _native_both(self):
+		"""
+		Returns GPIO.BOTH (RISING and FALLING)
+		"""
+
+		self._require_system_set()
+
+		self.supports.require('events')
+
+		return native_gpio.BOTH
+
 	def _native_pull_up_down(self, value):
 		"""
 		Returns GPIO.PUD_UP (1) or GPIO.PUD_DOWN (0) or None (None)
@@ -665,17 +1265,27 @@ class GPIO:
 			# Create array of only InputPins
 			inputs = self._get_input_pins_only()
 
+		stats = self._watch_stats
+		stats.start(interval)
+		now = time.monotonic_ns
+
 		# Loop through each pin checking its value()
 		try:
 			# Ensure that breaking out is possible using _watching
 			while self._watching:
 				# Delay pin value checks to reduce CPU load
 				time.sleep(interval)
+				started = now()
+				acting = 0
 
 				# Check each pin
 				for pin in inputs:
 					if pin.test():
-						pin.action()
+						detected = now()
+						self._run_action(pin, detected)
+						acting += now() - detected
+
+				stats.tick(started, now() - started - acting, acting)
 		except KeyboardInterrupt:
 			# This is currently not being used, see signal.signal
 			print("Breaking out of watch()")
@@ -686,6 +1296,76 @@ class GPIO:
 		# Reset self._watching just in case stop_watching wasn't run
 		self.stop_watching()
 
+	def _run_action(self, pin, detected=None):
+		"""
+		Run pin.action() for watch(), through its rate limit and latency tracking
+
+		detected is the time.monotonic_ns() the tick saw the desired value,
+			latency is measured from it
+		"""
+		action = pin.action
+		if pin.latency:
+			action = pin.latency.wrap(action, detected)
+
+		if pin.limiter:
+			pin.limiter.call(action)
+		else:
+			action()
+
+	def track_latency(self, enabled=True):
+		"""
+		Track the latency of event() and watch() actions of every configured pin
+		"""
+		for pin in self._get_all_input_pins():
+			pin.track_latency(enabled)
+
+	def latency_stats(self):
+		"""
+		Returns latency summaries (p50/p99/max in ns) by pin id and of the event dispatcher
+		"""
+		from .events import default_dispatcher
+
+		return {
+			"pins": {pin.id: pin.latency.summary() for pin in self.pins.values() if getattr(pin, "latency", None)},
+			"dispatcher": default_dispatcher.latency.summary(),
+		}
+
+	def reset_latency(self):
+		"""
+		Reset every latency histogram
+		"""
+		from .events import default_dispatcher
+
+		for pin in self.pins.values():
+			if getattr(pin, "latency", None):
+				pin.latency.reset()
+		default_dispatcher.latency.reset()
+
+	def watch_stats(self):
+		"""
+		Returns statistics of the watch() loop as a dict (times in ns)
+
+		Requested and actual period, jitter (|actual - requested| p50/p99/max),
+			time reading pins and running actions per tick, and overruns
+			(ticks whose reads and actions took longer than the interval)
+		"""
+		return self._watch_stats.summary()
+
+	def on_watch_stats(self, callback, every=60):
+		"""
+		Call callback(watch_stats()) every `every` seconds from the watch() loop
+
+		Call with callback None to stop. Takes effect when watch() starts
+		"""
+		self._watch_stats.callback = callback
+		self._watch_stats.every = every
+
+	def reset_watch_stats(self):
+		"""
+		Reset the statistics of the watch() loop
+		"""
+		self._watch_stats.reset()
+
 	def stop_watching(self):
 		"""
 		Changes the _watching variable to False to stop watch() if it is running
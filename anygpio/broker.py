@@ -0,0 +1,680 @@
+import sys, os, json, stat, time, struct, socket, socketserver, threading, itertools
+from concurrent.futures import Future
+
+from . import anygpio
+from . import errors
+from .events import EventQueue, QUEUE_SIZE
+
+
+# Every frame starts with a header: sequence number, op, payload length
+# Responses carry the sequence number of their request, pushed events use 0
+HEADER = struct.Struct("<HBxI")
+
+# Requests
+OP_INPUT = 1			# pin -> level
+OP_OUTPUT = 2			# pin, level
+OP_VALUE = 3			# pin -> value()
+OP_TOGGLE = 4			# pin -> new level
+OP_READ_MANY = 5		# count, pins -> one level byte per pin
+OP_WRITE_MANY = 6		# count, (pin, level) pairs
+OP_CALL = 7				# JSON {"target", "method", "args", "kwargs"} -> JSON result
+OP_SUBSCRIBE = 8		# pin, edge events are pushed as OP_EVENT (without debouncing)
+OP_UNSUBSCRIBE = 9		# pin
+
+# Responses
+OP_EVENT = 10			# timestamp (ns), level, pin
+OP_RESULT = 11			# op specific payload
+OP_ERROR = 12			# utf-8 error message
+
+EVENT = struct.Struct("<QB")
+
+# Methods clients may call through OP_CALL
+GPIO_METHODS = ("setup_pin", "PWM", "pin", "pins")
+PIN_METHODS = ("start", "stop", "change_frequency", "change_duty_cycle", "destroy")
+
+# Default socket path of the broker
+SOCKET_PATH = "/tmp/anygpio.sock"
+
+
+def pack_id(id):
+	"""
+	Encode a pin id (int or string)
+	"""
+	if isinstance(id, int):
+		return struct.pack("<Bi", 0, id)
+	encoded = str(id).encode()
+	return struct.pack("<BB", 1, len(encoded)) + encoded
+
+
+def unpack_id(buffer, offset=0):
+	"""
+	Decode a pin id, returns (id, offset after the id)
+	"""
+	kind = buffer[offset]
+	if kind == 0:
+		return struct.unpack_from("<i", buffer, offset + 1)[0], offset + 5
+	length = buffer[offset + 1]
+	return bytes(buffer[offset + 2:offset + 2 + length]).decode(), offset + 2 + length
+
+
+def describe(pin):
+	"""
+	Describe a pin as a JSON serializable dict
+	"""
+	if not pin:
+		return None
+	if isinstance(pin, anygpio.PWMPin):
+		type = "pwm"
+	elif isinstance(pin, anygpio.OutputPin):
+		type = "output"
+	elif isinstance(pin, anygpio.AnalogInputPin):
+		type = "analog"
+	else:
+		type = "input"
+	return {
+		"id": pin.id,
+		"name": pin.name,
+		"number": pin.number,
+		"type": type,
+		"pull_up_down": getattr(pin, "pull_up_down", None),
+	}
+
+
+def read_frame(file):
+	"""
+	Read one frame, returns (sequence, op, payload) or None at end of stream
+	"""
+	header = file.read(HEADER.size)
+	if len(header) < HEADER.size:
+		return None
+	sequence, op, length = HEADER.unpack(header)
+	payload = file.read(length) if length else b""
+	if len(payload) < length:
+		return None
+	return sequence, op, payload
+
+
+class _Connection(socketserver.StreamRequestHandler):
+	"""
+	Serves one client connection of the Broker
+	"""
+
+	def setup(self):
+		"""
+		Set up the connection's write lock and subscriptions
+		"""
+		super().setup()
+		self.write_lock = threading.Lock()
+		self.subscriptions = set()
+
+	def send(self, sequence, op, payload=b""):
+		"""
+		Send a frame, safe to call from native event callback threads
+		"""
+		with self.write_lock:
+			self.wfile.write(HEADER.pack(sequence, op, len(payload)) + payload)
+
+	def handle(self):
+		"""
+		Answer requests in order until the client disconnects
+		"""
+		broker = self.server.broker
+		while True:
+			frame = read_frame(self.rfile)
+			if frame is None:
+				break
+			sequence, op, payload = frame
+
+			try:
+				result = broker.handle(self, op, payload)
+			except Exception as error:
+				self.send(sequence, OP_ERROR, (type(error).__name__ + ": " + str(error)).encode())
+			else:
+				self.send(sequence, OP_RESULT, result)
+
+	def finish(self):
+		"""
+		Drop the subscriptions of the closed connection
+		"""
+		self.server.broker.unsubscribe_all(self)
+		super().finish()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+	daemon_threads = True
+
+
+class Broker:
+	"""
+	Serves a GPIO wrapper instance to other local processes over a Unix socket
+
+	Only one process can own the pins. The broker owns them and clients
+		use Client, which implements the GPIO and Pin API over the socket
+
+	Attributes:
+		gpio			GPIO wrapper instance being served
+		path			Path of the Unix socket
+		_subscribers	Connections subscribed to edge events by pin id
+		_server			socketserver serving the connections
+	"""
+
+	def __init__(self, gpio, path=SOCKET_PATH):
+		"""
+		Sets default values and constructs instance of Broker
+		"""
+		self.gpio = gpio
+		self.path = path
+		self._subscribers = {}
+		self._lock = threading.Lock()
+		self._server = None
+
+	def start(self):
+		"""
+		Start serving on a background thread
+		"""
+		self._bind()
+		thread = threading.Thread(target=self._server.serve_forever, name="anygpio-broker", daemon=True)
+		thread.start()
+		return self
+
+	def serve_forever(self):
+		"""
+		Serve on the calling thread until shutdown()
+		"""
+		self._bind()
+		self._server.serve_forever()
+
+	def shutdown(self):
+		"""
+		Stop serving and remove the socket
+		"""
+		if self._server:
+			self._server.shutdown()
+			self._server.server_close()
+			self._server = None
+		if os.path.exists(self.path):
+			os.unlink(self.path)
+
+	def _bind(self):
+		"""
+		Create the listening socket, replacing a stale one
+
+		Raises BrokerError if another broker is listening on path or path
+			is not a socket
+		"""
+		if os.path.exists(self.path):
+			if not stat.S_ISSOCK(os.stat(self.path).st_mode):
+				raise errors.BrokerError(self.path + " exists and is not a socket")
+
+			probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			try:
+				probe.connect(self.path)
+			except ConnectionRefusedError:
+				# Nothing accepts on it, left behind by a broker that exited
+				os.unlink(self.path)
+			except OSError as error:
+				raise errors.BrokerError("Can't check the socket at " + self.path + ": " + str(error))
+			else:
+				raise errors.BrokerError("A broker is already listening on " + self.path)
+			finally:
+				probe.close()
+		self._server = _Server(self.path, _Connection)
+		self._server.broker = self
+
+	def _pin(self, id):
+		"""
+		Return the pin with id, raise if there is none
+		"""
+		pin = self.gpio.pin(id)
+		if not pin:
+			raise KeyError("No pin " + str(id))
+		return pin
+
+	def handle(self, connection, op, payload):
+		"""
+		Handle one request, returns the result payload
+		"""
+		if op == OP_INPUT:
+			return bytes((self._pin(unpack_id(payload)[0]).input(),))
+
+		if op == OP_OUTPUT:
+			id, offset = unpack_id(payload)
+			self._pin(id).output(payload[offset])
+			return b""
+
+		if op == OP_VALUE:
+			return bytes((self._pin(unpack_id(payload)[0]).value(),))
+
+		if op == OP_TOGGLE:
+			return bytes((self._pin(unpack_id(payload)[0]).toggle(),))
+
+		if op == OP_READ_MANY:
+			count, = struct.unpack_from("<H", payload)
+			offset = 2
+			levels = bytearray(count)
+			for index in range(count):
+				id, offset = unpack_id(payload, offset)
+				levels[index] = self._pin(id).input()
+			return bytes(levels)
+
+		if op == OP_WRITE_MANY:
+			count, = struct.unpack_from("<H", payload)
+			offset = 2
+			for _ in range(count):
+				id, offset = unpack_id(payload, offset)
+				self._pin(id).output(payload[offset])
+				offset += 1
+			return b""
+
+		if op == OP_CALL:
+			return json.dumps(self._call(json.loads(payload))).encode()
+
+		if op == OP_SUBSCRIBE:
+			self.subscribe(connection, self._pin(unpack_id(payload)[0]))
+			return b""
+
+		if op == OP_UNSUBSCRIBE:
+			self.unsubscribe(connection, self._pin(unpack_id(payload)[0]))
+			return b""
+
+		raise errors.BrokerError("Unknown op " + str(op))
+
+	def _call(self, request):
+		"""
+		Run a whitelisted GPIO or Pin method for OP_CALL
+		"""
+		method = request["method"]
+		args = request.get("args", [])
+		kwargs = request.get("kwargs", {})
+
+		if request.get("target") is None:
+			if method not in GPIO_METHODS:
+				raise errors.BrokerError("Method not allowed: " + method)
+			if method == "pin":
+				return describe(self.gpio.pin(*args))
+			if method == "pins":
+				return [describe(pin) for pin in self.gpio.pins.values()]
+
+			getattr(self.gpio, method)(*args, **kwargs)
+
+			# setup_pin() and PWM() take the id first, describe the new pin
+			return describe(self.gpio.pin(args[0] if args else kwargs.get("id", kwargs.get("number"))))
+
+		if method not in PIN_METHODS:
+			raise errors.BrokerError("Method not allowed: " + method)
+		getattr(self._pin(request["target"]), method)(*args, **kwargs)
+		return None
+
+	def subscribe(self, connection, pin):
+		"""
+		Push edge events of pin to connection
+
+		The native event is shared by every subscriber and not debounced,
+			clients debounce with their own bounce time
+		"""
+		with self._lock:
+			subscribers = self._subscribers.get(pin.id)
+			if subscribers is None:
+				subscribers = self._subscribers[pin.id] = set()
+				pin.event(action=self._edge_callback(pin), both=True, bounce=0)
+			subscribers.add(connection)
+			connection.subscriptions.add(pin.id)
+
+	def unsubscribe(self, connection, pin):
+		"""
+		Stop pushing edge events of pin to connection
+		"""
+		with self._lock:
+			self._unsubscribe(connection, pin.id)
+
+	def unsubscribe_all(self, connection):
+		"""
+		Remove every subscription of a closed connection
+		"""
+		with self._lock:
+			for id in list(connection.subscriptions):
+				self._unsubscribe(connection, id)
+
+	def _unsubscribe(self, connection, id):
+		"""
+		Remove a subscription, removing the native event when none are left
+		"""
+		connection.subscriptions.discard(id)
+		subscribers = self._subscribers.get(id)
+		if subscribers is None:
+			return
+		subscribers.discard(connection)
+		if not subscribers:
+			del self._subscribers[id]
+			pin = self.gpio.pin(id)
+			if pin:
+				pin.remove_event()
+
+	def _edge_callback(self, pin):
+		"""
+		Return the native event callback pushing edges of pin
+		"""
+		encoded = pack_id(pin.id)
+
+		def edge(*_):
+			payload = EVENT.pack(time.monotonic_ns(), pin.input()) + encoded
+			for connection in list(self._subscribers.get(pin.id, ())):
+				try:
+					connection.send(0, OP_EVENT, payload)
+				except OSError:
+					# The connection is closing, finish() unsubscribes it
+					pass
+		return edge
+
+
+class RemotePin:
+	"""
+	Proxy for a pin owned by a Broker, with the same API as Pin
+
+	Attributes:
+		client			Client the pin belongs to
+		id				Pin ID as identified by the broker's native_gpio
+		name			User defined pin name
+		number			Pin number as integer
+		type			"input", "output", "pwm" or "analog"
+		pull_up_down	Pull up or pull down resistor of input pins
+		action			Default event callback
+	"""
+
+	def __init__(self, client, info, action=anygpio.do_nothing):
+		"""
+		Sets default values and constructs instance of RemotePin
+		"""
+		self.client = client
+		self.id = info["id"]
+		self.name = info["name"]
+		self.number = info["number"]
+		self.type = info["type"]
+		self.pull_up_down = info["pull_up_down"]
+		self.action = action
+		self._encoded = pack_id(self.id)
+
+	def input(self):
+		"""
+		Get input value of pin from the broker
+		"""
+		return self.client.request(OP_INPUT, self._encoded).result()[0]
+
+	def value(self):
+		"""
+		Get the curated value() of the pin from the broker
+		"""
+		return self.client.request(OP_VALUE, self._encoded).result()[0]
+
+	def output(self, value):
+		"""
+		Output the desired value to the pin
+		"""
+		self.client.request(OP_OUTPUT, self._encoded + bytes((int(value),))).result()
+
+	def toggle(self):
+		"""
+		Invert the value of the pin and return the new value
+		"""
+		return self.client.request(OP_TOGGLE, self._encoded).result()[0]
+
+	def event(self, action=None, rising_falling=None, bounce=None, both=False, queue=None, overflow="drop_oldest"):
+		"""
+		Subscribe to edge events, action runs on a dispatcher thread
+
+		Edges are filtered on the client like the native rising/falling
+		bounce (milliseconds) is applied on the client to the broker's edge
+			timestamps, None or 0 delivers every edge
+		queue sets the size of the client side EventQueue
+		"""
+		if both:
+			level = None
+		elif rising_falling is not None:
+			level = int(bool(rising_falling))
+		else:
+			level = int(not self.pull_up_down)
+
+		maxsize = QUEUE_SIZE if queue is None or isinstance(queue, bool) else queue
+		events = EventQueue(action or self.action, maxsize, overflow)
+		self.client._subscribe(self, level, events, int((bounce or 0) * 1e6))
+
+	def remove_event(self):
+		"""
+		Deregisters event handlers for the pin
+		"""
+		self.client._unsubscribe(self)
+
+	def _call(self, method, *args):
+		"""
+		Call a Pin method on the broker
+		"""
+		return self.client.call(method, *args, target=self.id)
+
+	def start(self, duty_cycle=None):
+		"""
+		Start PWM at specified duty_cycle
+		"""
+		self._call("start", duty_cycle)
+
+	def stop(self):
+		"""
+		Stop PWM
+		"""
+		self._call("stop")
+
+	def change_frequency(self, value):
+		"""
+		Update the PWM frequency
+		"""
+		self._call("change_frequency", value)
+
+	def change_duty_cycle(self, value):
+		"""
+		Update the PWM duty cycle
+		"""
+		self._call("change_duty_cycle", value)
+
+	def destroy(self):
+		"""
+		Remove pin configuration on the broker
+		"""
+		self._call("destroy")
+
+
+class _Subscription:
+	"""
+	Client side filter of the edges pushed for one pin
+
+	Attributes:
+		level			Level of the edges delivered, None for both
+		events			EventQueue running the action
+		bounce			Nanoseconds after a delivered edge during which edges are ignored
+		last			Broker timestamp of the last delivered edge
+	"""
+
+	def __init__(self, level, events, bounce=0):
+		self.level = level
+		self.events = events
+		self.bounce = bounce
+		self.last = None
+
+	def accept(self, timestamp, level):
+		"""
+		Returns True if the edge should be delivered
+		"""
+		if self.level not in (None, level):
+			return False
+		if self.bounce and self.last is not None and timestamp - self.last < self.bounce:
+			return False
+		self.last = timestamp
+		return True
+
+
+class Client:
+	"""
+	Connects to a Broker and implements the GPIO API over its socket
+
+	Requests are pipelined: request() returns a Future straight away and
+		any number of requests can be in flight. read_pins() and
+		write_pins() batch many pins into one request
+
+	Attributes:
+		path			Path of the broker's Unix socket
+		_pending		Futures of requests in flight by sequence number
+		_subscriptions	_Subscription by pin id
+		_closed			Has the connection to the broker closed?
+	"""
+
+	def __init__(self, path=SOCKET_PATH):
+		"""
+		Sets default values, connects and constructs instance of Client
+		"""
+		self.path = path
+		self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		self._socket.connect(path)
+		self._file = self._socket.makefile("rb")
+		self._sequence = itertools.count(1)
+		self._pending = {}
+		self._subscriptions = {}
+		self._closed = False
+		self._write_lock = threading.Lock()
+		self._reader = threading.Thread(target=self._read, name="anygpio-client", daemon=True)
+		self._reader.start()
+
+	def close(self):
+		"""
+		Close the connection to the broker
+		"""
+		self._socket.shutdown(socket.SHUT_RDWR)
+		self._socket.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *_):
+		self.close()
+
+	def request(self, op, payload=b""):
+		"""
+		Send a request, returns a Future of the result payload
+		"""
+		future = Future()
+		with self._write_lock:
+			if self._closed:
+				future.set_exception(errors.BrokerError("Connection to broker closed"))
+				return future
+			# Sequence 0 is reserved for pushed events
+			sequence = next(self._sequence) % 65535 + 1
+			self._pending[sequence] = future
+			self._socket.sendall(HEADER.pack(sequence, op, len(payload)) + payload)
+		return future
+
+	def call(self, method, *args, target=None, **kwargs):
+		"""
+		Call a GPIO method (or a Pin method with target) on the broker
+		"""
+		request = {"target": target, "method": method, "args": args, "kwargs": kwargs}
+		return json.loads(self.request(OP_CALL, json.dumps(request).encode()).result())
+
+	def setup_pin(self, id, name=None, out=False, **kwargs):
+		"""
+		Initialize a pin on the broker, same as GPIO.setup_pin() without action
+		"""
+		return RemotePin(self, self.call("setup_pin", id, name, out=out, **kwargs))
+
+	def PWM(self, number, frequency, duty_cycle=0, name=None, software=False):
+		"""
+		Initialize a PWM pin on the broker
+		"""
+		return RemotePin(self, self.call("PWM", number, frequency, duty_cycle, name, software))
+
+	def pin(self, query=None):
+		"""
+		Find a pin on the broker by id, number or name, False if not found
+		"""
+		info = self.call("pin", query)
+		return RemotePin(self, info) if info else False
+
+	@property
+	def pins(self):
+		"""
+		Dict of all pins configured on the broker by id
+		"""
+		return {info["id"]: RemotePin(self, info) for info in self.call("pins")}
+
+	def read_pins(self, ids):
+		"""
+		Read the input of many pins in one request, returns a list of levels
+		"""
+		payload = struct.pack("<H", len(ids)) + b"".join(pack_id(id) for id in ids)
+		return list(self.request(OP_READ_MANY, payload).result())
+
+	def write_pins(self, values):
+		"""
+		Output to many pins in one request, values is a dict of levels by pin id
+		"""
+		payload = struct.pack("<H", len(values)) + b"".join(pack_id(id) + bytes((int(value),)) for id, value in values.items())
+		self.request(OP_WRITE_MANY, payload).result()
+
+	def _subscribe(self, pin, level, events, bounce=0):
+		"""
+		Route pushed edges of pin through events, filtered by level and bounce (ns)
+		"""
+		self._subscriptions[pin.id] = _Subscription(level, events, bounce)
+		self.request(OP_SUBSCRIBE, pack_id(pin.id)).result()
+
+	def _unsubscribe(self, pin):
+		"""
+		Stop receiving edges of pin
+		"""
+		self._subscriptions.pop(pin.id, None)
+		self.request(OP_UNSUBSCRIBE, pack_id(pin.id)).result()
+
+	def _read(self):
+		"""
+		Reader thread: resolve futures and queue pushed events
+		"""
+		while True:
+			try:
+				frame = read_frame(self._file)
+			except (OSError, ValueError):
+				frame = None
+			if frame is None:
+				break
+			sequence, op, payload = frame
+
+			if op == OP_EVENT:
+				timestamp, level = EVENT.unpack_from(payload)
+				id, _ = unpack_id(payload, EVENT.size)
+				subscription = self._subscriptions.get(id)
+				if subscription and subscription.accept(timestamp, level):
+					subscription.events.put(id)
+				continue
+
+			future = self._pending.pop(sequence, None)
+			if future is None:
+				continue
+			if op == OP_ERROR:
+				future.set_exception(errors.BrokerError(payload.decode()))
+			else:
+				future.set_result(payload)
+
+		# Fail everything still waiting, later requests fail straight away
+		with self._write_lock:
+			self._closed = True
+			pending = list(self._pending.values())
+			self._pending.clear()
+		for future in pending:
+			future.set_exception(errors.BrokerError("Connection to broker closed"))
+
+
+if __name__ == "__main__":
+	# python -m anygpio.broker [socket path]
+	from . import GPIO
+
+	broker = Broker(GPIO, sys.argv[1] if len(sys.argv) > 1 else SOCKET_PATH)
+	print("Serving GPIO on " + broker.path)
+	try:
+		broker.serve_forever()
+	finally:
+		broker.shutdown()
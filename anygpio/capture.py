@@ -0,0 +1,255 @@
+import json, mmap, time, struct
+
+from . import errors
+
+
+# Waits shorter than this are busy-waited instead of slept (nanoseconds)
+SPIN_NS = 200000
+
+MAGIC = b"AGPC"
+VERSION = 1
+
+# magic, version, kind, item size, rate, started (time.time_ns()), records, reads, pins JSON length
+HEADER = struct.Struct("<4sBBHdQQQI")
+
+# Kinds of capture
+#	SAMPLES			One packed bitmask per sample at a fixed rate
+#	TRANSITIONS		(nanoseconds since start, bitmask) records of each change
+SAMPLES = 0
+TRANSITIONS = 1
+
+# Data starts on a multiple of this many bytes
+ALIGN = 64
+
+# Bytes added to a transitions file each time it fills up
+GROW = 1 << 20
+
+# array/memoryview format of each item size
+FORMATS = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+
+def _item_size(count):
+	"""
+	Returns the bytes needed for a bitmask of count pins
+	"""
+	for size in (1, 2, 4, 8):
+		if count <= size * 8:
+			return size
+	raise errors.CaptureError("Can't capture more than 64 pins")
+
+
+def _data_offset(pins_length):
+	"""
+	Returns the offset of the data after the header and pins JSON
+	"""
+	return -(-(HEADER.size + pins_length) // ALIGN) * ALIGN
+
+
+def record(gpio, pins, rate, duration, path):
+	"""
+	Capture pins into a memory mapped file, see GPIO.capture()
+
+	Returns the number of (records, reads)
+	"""
+	item_size = _item_size(len(pins))
+	kind = SAMPLES if rate else TRANSITIONS
+	description = json.dumps({"pins": [pin.id for pin in pins], "names": [pin.name for pin in pins]}).encode()
+	offset = _data_offset(len(description))
+
+	if kind == SAMPLES:
+		size = offset + int(rate * duration) * item_size
+	else:
+		size = offset + GROW
+
+	with open(path, "w+b") as file:
+		file.truncate(size)
+		memory = mmap.mmap(file.fileno(), size)
+		try:
+			memory[HEADER.size:HEADER.size + len(description)] = description
+			started = time.time_ns()
+
+			if kind == SAMPLES:
+				records = reads = _record_samples(gpio, pins, rate, memory, offset, item_size)
+				end = offset + records * item_size
+			else:
+				records, reads, end = _record_transitions(gpio, pins, duration, memory, offset, item_size)
+
+			HEADER.pack_into(memory, 0, MAGIC, VERSION, kind, item_size, float(rate or 0), started, records, reads, len(description))
+			memory.flush()
+		finally:
+			memory.close()
+
+		# Drop the unused preallocated space
+		file.truncate(end)
+
+	return records, reads
+
+
+def _record_samples(gpio, pins, rate, memory, offset, item_size):
+	"""
+	Read the pins at a fixed rate into the mapped file, returns the number of samples
+	"""
+	input_mask = gpio.input_mask
+	perf_counter_ns = time.perf_counter_ns
+	period = int(1e9 / rate)
+	samples = memoryview(memory)[offset:].cast(FORMATS[item_size])
+
+	try:
+		due = perf_counter_ns()
+		for index in range(len(samples)):
+			wait = due - perf_counter_ns()
+			if wait > SPIN_NS:
+				time.sleep((wait - SPIN_NS) / 1e9)
+			while perf_counter_ns() < due:
+				pass
+
+			samples[index] = input_mask(pins)
+			due += period
+		return len(samples)
+	finally:
+		samples.release()
+
+
+def _record_transitions(gpio, pins, duration, memory, offset, item_size):
+	"""
+	Read the pins as fast as possible for duration seconds, storing each change
+
+	Returns (records, reads, end of the data)
+	"""
+	input_mask = gpio.input_mask
+	perf_counter_ns = time.perf_counter_ns
+	pack_into = struct.Struct("<Q" + FORMATS[item_size]).pack_into
+	record_size = 8 + item_size
+
+	position = offset
+	records = reads = 0
+	previous = None
+	start = perf_counter_ns()
+	end = start + int(duration * 1e9)
+
+	while True:
+		mask = input_mask(pins)
+		now = perf_counter_ns()
+		reads += 1
+		if now >= end:
+			break
+		if mask == previous:
+			continue
+
+		if position + record_size > len(memory):
+			memory.resize(len(memory) + GROW)
+		pack_into(memory, position, now - start, mask)
+		position += record_size
+		records += 1
+		previous = mask
+
+	return records, reads, position
+
+
+def load(path):
+	"""
+	Open a capture file for analysis, returns a Capture
+	"""
+	return Capture(path)
+
+
+class Capture:
+	"""
+	A capture file opened for analysis
+
+	samples is a read only numpy.memmap of the data when NumPy is
+		installed, so nothing is read until it is used: bitmasks for
+		SAMPLES captures, a record array with "time" (ns since the start)
+		and "mask" fields for TRANSITIONS captures. Without NumPy it is a
+		memoryview of the mapped bitmasks, or a list of (time, mask) tuples.
+
+	Attributes:
+		path			Path of the file
+		kind			SAMPLES or TRANSITIONS
+		rate			Samples per second (SAMPLES captures)
+		started			time.time_ns() of the start of the capture
+		records			Number of samples or transitions
+		reads			Number of times the pins were read
+		pins			Ids of the pins, bit i of a mask is pins[i]
+		names			Names of the pins
+		samples			The data, see above
+		item_size		Bytes per bitmask
+		offset			Offset of the data in the file
+	"""
+
+	def __init__(self, path):
+		"""
+		Reads the header and maps the data of a capture file
+		"""
+		self.path = path
+
+		with open(path, "rb") as file:
+			header = file.read(HEADER.size)
+			if len(header) < HEADER.size:
+				raise errors.CaptureError(path + ": not a capture file")
+			magic, version, self.kind, self.item_size, self.rate, self.started, self.records, self.reads, length = HEADER.unpack(header)
+			if magic != MAGIC or version != VERSION:
+				raise errors.CaptureError(path + ": not a capture file")
+			description = json.loads(file.read(length))
+
+		self.pins = description["pins"]
+		self.names = description["names"]
+		self.offset = _data_offset(length)
+		self.samples = self._map()
+
+	def _map(self):
+		"""
+		Returns the data as a numpy.memmap, or a memoryview or list without NumPy
+		"""
+		try:
+			import numpy
+		except ImportError:
+			numpy = None
+
+		if numpy is not None:
+			mask = "<u" + str(self.item_size)
+			dtype = numpy.dtype(mask if self.kind == SAMPLES else [("time", "<u8"), ("mask", mask)])
+			# Empty files can't be mapped
+			if not self.records:
+				return numpy.zeros(0, dtype=dtype)
+			return numpy.memmap(self.path, dtype=dtype, mode="r", offset=self.offset, shape=(self.records,))
+
+		with open(self.path, "rb") as file:
+			memory = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+		if self.kind == SAMPLES:
+			return memoryview(memory)[self.offset:self.offset + self.records * self.item_size].cast(FORMATS[self.item_size])
+		data = memoryview(memory)[self.offset:self.offset + self.records * (8 + self.item_size)]
+		return list(struct.iter_unpack("<Q" + FORMATS[self.item_size], data))
+
+	def masks(self):
+		"""
+		Returns the bitmasks (one per sample or transition)
+		"""
+		if self.kind == SAMPLES:
+			return self.samples
+		if isinstance(self.samples, list):
+			return [mask for _, mask in self.samples]
+		return self.samples["mask"]
+
+	def times(self):
+		"""
+		Returns the time of each sample or transition in seconds since the start
+		"""
+		if self.kind == SAMPLES:
+			if hasattr(self.samples, "dtype"):
+				import numpy
+				return numpy.arange(self.records) / self.rate
+			return [index / self.rate for index in range(self.records)]
+		if isinstance(self.samples, list):
+			return [nanoseconds / 1e9 for nanoseconds, _ in self.samples]
+		return self.samples["time"] / 1e9
+
+	def levels(self, index):
+		"""
+		Returns the level (0 or 1) of pins[index] in each sample or transition
+		"""
+		masks = self.masks()
+		if hasattr(masks, "dtype"):
+			return (masks >> index) & 1
+		return [mask >> index & 1 for mask in masks]
+
@@ -0,0 +1,307 @@
+import os, json, marshal, hashlib
+
+from . import errors
+
+
+# Bump when the plan format changes so old cached plans are ignored
+PLAN_VERSION = 1
+
+# Directory of cached plans, can be overridden with ANYGPIO_CACHE
+CACHE_DIR = os.environ.get("ANYGPIO_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "anygpio"))
+
+# Pin modes and the plan step kind they compile to
+MODES = {"in": "in", "input": "in", "out": "out", "output": "out", "pwm": "pwm"}
+
+# Pull resistor names and their pull_up_down value
+PULLS = {"up": 1, "down": 0, "off": None, "none": None, 1: 1, 0: 0, None: None}
+
+# Event edge names and their event() arguments
+EDGES = {
+	"rising": {"rising_falling": 1},
+	"falling": {"rising_falling": 0},
+	"both": {"both": True},
+}
+
+# Plans compiled in this process by cache key
+_plans = {}
+
+
+def load(gpio, path, actions=None, cache=True):
+	"""
+	Configure every pin described in a JSON or TOML file
+
+	See GPIO.load_config()
+	"""
+	with open(path, "rb") as file:
+		data = file.read()
+
+	key = hashlib.sha256(data + str(gpio.system).encode()).hexdigest()
+	plan = _plans.get(key) or (cache and _read_plan(key))
+	if not plan:
+		plan = compile_plan(gpio, parse(path, data))
+		if cache:
+			_write_plan(key, plan)
+	_plans[key] = plan
+
+	return apply(gpio, plan, actions or {})
+
+
+def parse(path, data):
+	"""
+	Returns the configuration in data (JSON, or TOML if path ends in .toml) as a dict
+	"""
+	if not path.endswith(".toml"):
+		try:
+			return json.loads(data)
+		except ValueError as error:
+			raise errors.ConfigError(path + ": " + str(error))
+
+	try:
+		import tomllib
+	except ImportError:
+		try:
+			import tomli as tomllib
+		except ImportError:
+			raise errors.ConfigError("TOML configuration needs Python 3.11+ or the tomli package")
+
+	try:
+		return tomllib.loads(data.decode())
+	except (ValueError, UnicodeDecodeError) as error:
+		raise errors.ConfigError(path + ": " + str(error))
+
+
+def compile_plan(gpio, config):
+	"""
+	Validate a configuration and compile it into a plan
+
+	The plan is a tuple of (kind, id, name, options, event, action) steps
+		made only of builtin types, so it can be cached with marshal.
+	Every problem is collected and raised in one ConfigError
+	"""
+	supports = gpio.supports
+	available = supports.available_pins
+	problems = []
+	plan = []
+	ids = set()
+	names = set()
+
+	if not isinstance(config, dict):
+		raise errors.ConfigError("Invalid pin configuration:\n\texpected a table with a pins list, got " + type(config).__name__)
+	pins = config.get("pins", [])
+	if not isinstance(pins, list):
+		raise errors.ConfigError("Invalid pin configuration:\n\tpins must be a list, got " + type(pins).__name__)
+
+	for index, pin in enumerate(pins):
+		where = "pins[" + str(index) + "]"
+		if not isinstance(pin, dict):
+			problems.append(where + ": expected a table, got " + type(pin).__name__)
+			continue
+
+		id = pin.get("id")
+		name = pin.get("name")
+		mode = pin.get("mode", "in")
+		kind = MODES.get(mode) if isinstance(mode, str) else None
+
+		if id is None:
+			problems.append(where + ": missing id")
+		elif not isinstance(id, (int, str)) or isinstance(id, bool):
+			problems.append(where + ": id must be a number or a string, got " + type(id).__name__)
+		elif available is not None and id not in available:
+			problems.append(where + ": pin " + str(id) + " does not exist on " + str(gpio.system))
+		elif id in ids:
+			problems.append(where + ": pin " + str(id) + " is configured twice")
+		else:
+			ids.add(id)
+
+		if name is not None:
+			if not isinstance(name, str):
+				problems.append(where + ": name must be a string, got " + type(name).__name__)
+			elif name in names:
+				problems.append(where + ": name " + str(name) + " is used twice")
+			else:
+				names.add(name)
+
+		if kind is None:
+			problems.append(where + ": unknown mode " + str(pin.get("mode")))
+			continue
+
+		options = {}
+		event = None
+
+		if kind == "pwm":
+			frequency = pin.get("frequency")
+			if not frequency:
+				problems.append(where + ": PWM needs a frequency")
+			elif not isinstance(frequency, (int, float)) or isinstance(frequency, bool) or frequency < 0:
+				problems.append(where + ": PWM frequency must be a positive number, got " + repr(frequency))
+			options["frequency"] = pin.get("frequency")
+			options["duty_cycle"] = pin.get("duty_cycle", 0)
+			options["software"] = bool(pin.get("software")) or not supports.pwm
+
+		elif kind == "out":
+			options["initial_value"] = int(bool(pin.get("initial", 0)))
+
+		else:
+			pull = pin.get("pull", 1)
+			pull = pull.lower() if isinstance(pull, str) else pull
+			if not isinstance(pull, (int, str, type(None))) or pull not in PULLS:
+				problems.append(where + ": unknown pull " + str(pin.get("pull")))
+				pull = None
+			elif PULLS[pull] is not None and not supports.pull_up_down:
+				problems.append(where + ": pull resistors are not supported on " + str(gpio.system))
+			options["pull_up_down"] = PULLS.get(pull)
+
+			if "desired_value" in pin:
+				options["desired_value"] = pin["desired_value"]
+
+			if pin.get("event"):
+				event, problem = _compile_event(pin["event"], supports)
+				if problem:
+					problems.append(where + ": " + problem)
+
+		action = pin.get("action")
+		if action is not None and not isinstance(action, str):
+			problems.append(where + ": action must be a name, got " + type(action).__name__)
+
+		plan.append((kind, id, name, options, event, action))
+
+	if problems:
+		raise errors.ConfigError("Invalid pin configuration:\n\t" + "\n\t".join(problems))
+
+	return tuple(plan)
+
+
+def _compile_event(event, supports):
+	"""
+	Returns (event() keyword arguments, problem or None) of a pin's event entry
+	"""
+	if not supports.events:
+		return None, "events are not supported"
+
+	if not isinstance(event, (dict, bool)):
+		return None, "event must be true or a table, got " + type(event).__name__
+
+	# "event": true uses the defaults
+	event = event if isinstance(event, dict) else {}
+	arguments = {}
+
+	edge = event.get("edge")
+	if edge is not None:
+		if edge not in EDGES:
+			return None, "unknown event edge " + str(edge)
+		arguments.update(EDGES[edge])
+
+	if event.get("bounce") is not None:
+		# 0 disables debouncing
+		arguments["bounce"] = event["bounce"]
+	if event.get("queue"):
+		arguments["queue"] = event["queue"]
+
+	return arguments, None
+
+
+def apply(gpio, plan, actions):
+	"""
+	Create and set up the pins of a plan, returns them
+
+	All pins are registered with one registry update, then events are added.
+	If anything fails, the pins set up so far are destroyed and the pins
+		they replaced are registered and set up again before re-raising
+		(their events are not added again)
+	"""
+	from .anygpio import do_nothing
+
+	gpio._require_system_set()
+
+	# Check every action before touching any pin
+	for kind, id, name, options, event, action_name in plan:
+		if action_name is not None and action_name not in actions:
+			raise errors.ConfigError("No action named " + str(action_name) + " for pin " + str(id))
+
+	pins = []
+	events = []
+	replaced = None
+	try:
+		for kind, id, name, options, event, action_name in plan:
+			action = do_nothing if action_name is None else actions[action_name]
+
+			if kind == "pwm":
+				if options["software"]:
+					pin = gpio._create_SoftPWMPin_instance(id, name)
+				else:
+					pin = gpio._create_PWMPin_instance(id, name)
+				pin.setup(options["frequency"], options["duty_cycle"])
+			elif kind == "out":
+				pin = gpio._create_OutputPin_instance(id, name, action, **options)
+				pin.setup()
+			else:
+				pin = gpio._create_InputPin_instance(id, name, action, **options)
+				pin.setup()
+
+			pins.append(pin)
+			if event is not None:
+				events.append((pin, event))
+
+		replaced = gpio._add_pins(pins)
+
+		for pin, event in events:
+			pin.event(**event)
+	except Exception:
+		if replaced is None:
+			# Not registered yet, but their native setup was overwritten
+			replaced = [gpio.pins[pin.id] for pin in pins if pin.id in gpio.pins]
+
+		for pin in pins:
+			try:
+				pin.destroy()
+			except Exception:
+				# Keep the original error
+				pass
+		_restore(gpio, replaced)
+		raise
+
+	return pins
+
+
+def _restore(gpio, pins):
+	"""
+	Register pins again and set them up, after a failed apply() replaced them
+	"""
+	from .anygpio import PWMPin
+
+	gpio._add_pins(pins)
+	for pin in pins:
+		try:
+			if isinstance(pin, PWMPin):
+				pin.setup(pin.frequency, pin.duty_cycle)
+			else:
+				pin.setup()
+		except Exception:
+			# Keep the original error
+			pass
+
+
+def _read_plan(key):
+	"""
+	Returns the cached plan of key, None if there is none
+	"""
+	try:
+		with open(os.path.join(CACHE_DIR, key + ".plan"), "rb") as file:
+			version, plan = marshal.load(file)
+	except (OSError, ValueError, EOFError, TypeError):
+		return None
+	return plan if version == PLAN_VERSION else None
+
+
+def _write_plan(key, plan):
+	"""
+	Cache a plan, ignoring failures (e.g. read only file systems)
+	"""
+	try:
+		os.makedirs(CACHE_DIR, exist_ok=True)
+		temporary = os.path.join(CACHE_DIR, key + ".tmp" + str(os.getpid()))
+		with open(temporary, "wb") as file:
+			marshal.dump((PLAN_VERSION, plan), file)
+		os.replace(temporary, os.path.join(CACHE_DIR, key + ".plan"))
+	except (OSError, ValueError, TypeError):
+		pass
@@ -0,0 +1,133 @@
+import time, threading, itertools, functools
+
+from .scheduler import default_scheduler
+
+
+class PulseCounter:
+	"""
+	Counts edges of an input pin without running any Python code per edge
+
+	The native callback is functools.partial(next, itertools.count()), so
+		each edge only advances a C level counter. next() on it is atomic,
+		reads take one value from the counter too and subtract the values
+		taken so far
+
+	Attributes:
+		pin				InputPin being counted
+		_counter		itertools.count() advanced by every edge and every read
+		_taken			Values taken from _counter by reads
+		_base			Edge count at the last reset()
+	"""
+
+	def __init__(self, pin, rising_or_falling):
+		"""
+		Sets default values, registers the native callback and constructs instance of PulseCounter
+		"""
+		self.pin = pin
+		self._counter = itertools.count()
+		self._taken = 0
+		self._base = 0
+		self._lock = threading.Lock()
+
+		# Registered with the wrapper directly, event() would wrap it in Python
+		pin._add_event(rising_or_falling, functools.partial(next, self._counter), 0)
+
+	@property
+	def total(self):
+		"""
+		Number of edges since the counter started, not affected by reset()
+		"""
+		with self._lock:
+			value = next(self._counter)
+			edges = value - self._taken
+			self._taken += 1
+		return edges
+
+	@property
+	def value(self):
+		"""
+		Number of edges since the last reset()
+		"""
+		return self.total - self._base
+
+	def reset(self):
+		"""
+		Restart counting from 0, returns the count before the reset
+
+		No edge is lost or counted twice between the returned count and the new one
+		"""
+		edges = self.total
+		count = edges - self._base
+		self._base = edges
+		return count
+
+	def close(self):
+		"""
+		Remove the native callback
+		"""
+		self.pin.remove_event()
+
+
+class RateReporter:
+	"""
+	Calls one callback every interval with the counts of several PulseCounters
+
+	Runs on the shared scheduler, each interval is due exactly interval
+		seconds after the previous one so reports don't drift
+
+	Attributes:
+		counters		PulseCounters reported
+		callback		Called with {pin id: {"count", "delta", "rate"}} every interval
+		interval		Seconds between reports
+		_previous		Total edges of each counter at the previous report
+		_last			time.monotonic_ns() of the previous report
+		_due			time.monotonic_ns() the next report is due
+		_timer			Scheduler timer of the next report
+	"""
+
+	def __init__(self, counters, callback, interval=1):
+		"""
+		Sets default values and constructs instance of RateReporter
+		"""
+		self.counters = counters
+		self.callback = callback
+		self.interval = interval
+		self._previous = {counter.pin.id: counter.total for counter in counters}
+		self._last = time.monotonic_ns()
+		self._due = self._last
+		self._timer = None
+
+	def start(self):
+		"""
+		Start reporting
+		"""
+		self._due = self._last + int(self.interval * 1e9)
+		self._timer = default_scheduler.call_at(self._due, self._report)
+		return self
+
+	def stop(self):
+		"""
+		Stop reporting
+		"""
+		if self._timer:
+			self._timer.cancel()
+			self._timer = None
+
+	def _report(self):
+		"""
+		Snapshot every counter, call the callback and schedule the next report
+		"""
+		now = time.monotonic_ns()
+		elapsed = (now - self._last) / 1e9
+		self._last = now
+
+		report = {}
+		for counter in self.counters:
+			total = counter.total
+			delta = total - self._previous.get(counter.pin.id, 0)
+			self._previous[counter.pin.id] = total
+			report[counter.pin.id] = {"count": total - counter._base, "delta": delta, "rate": delta / elapsed if elapsed else 0.0}
+
+		self._due += int(self.interval * 1e9)
+		self._timer = default_scheduler.call_at(self._due, self._report)
+		self.callback(report)
@@ -0,0 +1,387 @@
+import time, threading
+
+
+# Waits shorter than this are busy-waited instead of slept (nanoseconds)
+SPIN_NS = 200000
+
+# Default frames per second (every phase is shown once per frame)
+RATE = 100
+
+# 7-segment patterns, bit 0 is segment a ... bit 6 is segment g
+SEGMENTS = {
+	"0": 0x3f, "1": 0x06, "2": 0x5b, "3": 0x4f, "4": 0x66,
+	"5": 0x6d, "6": 0x7d, "7": 0x07, "8": 0x7f, "9": 0x6f,
+	"A": 0x77, "B": 0x7c, "C": 0x39, "D": 0x5e, "E": 0x79, "F": 0x71,
+	"H": 0x76, "L": 0x38, "P": 0x73, "U": 0x3e,
+	"-": 0x40, "_": 0x08, " ": 0x00,
+}
+
+# Decimal point segment
+DP = 0x80
+
+
+def encode(text):
+	"""
+	Returns the 7-segment patterns of text, one per digit
+
+	A "." lights the decimal point of the digit before it
+	"""
+	patterns = []
+	for character in text:
+		if character == "." and patterns and not patterns[-1] & DP:
+			patterns[-1] |= DP
+		else:
+			patterns.append(DP if character == "." else SEGMENTS.get(character.upper(), 0))
+	return patterns
+
+
+class Display:
+	"""
+	Refresh engine of multiplexed displays
+
+	A display is shown one phase (digit, row, anode...) at a time, each
+		phase for an equal slot of the frame. The pin states of each phase
+		are computed once per frame buffer by show(), as the steps needed
+		to get from the previous state: one GPIO.output_mask() call for
+		the pins that change value, plus a setup() of an OutputPin or
+		InputPin twin for each pin switching between driven and released
+		(tri-state). The refresh thread only runs these steps.
+	Within each slot a phase is on for brightness * duty[phase] of the
+		slot, then blanked
+
+	Subclasses define _states(), _blank() and _off()
+
+	Attributes:
+		gpio			GPIO wrapper instance
+		pins			Pins of the display, state i of a phase is pins[i]
+		rate			Frames per second
+		brightness		Fraction (0-1) of each slot the phase is shown
+		duty			Fraction (0-1) of the brightness per phase, e.g. to even out digits
+		frames			Number of frames shown
+		late			Number of phases started after their due time (the refresh can't keep up)
+		_outputs		OutputPins written with output_mask()
+		_low			OutputPin twins whose setup() drives each pin low (tri-state displays)
+		_high			OutputPin twins whose setup() drives each pin high (tri-state displays)
+		_released		InputPin twins whose setup() releases each pin (tri-state displays)
+		_frame			Frame buffer shown
+		_pending		(program, start state) queued by show(), swapped in at the end of a frame.
+						The program is (on steps, on ns, off steps, off ns) per phase
+		_state			Pin states between frames of the running program
+		_running		Is the refresh thread running?
+	"""
+	tristate = False
+
+	def __init__(self, gpio, pins, phases, rate=RATE, brightness=1):
+		"""
+		Sets default values and constructs instance of Display
+		"""
+		self.gpio = gpio
+		self.pins = [gpio._resolve_pin(pin) for pin in pins]
+		self.rate = rate
+		self.brightness = brightness
+		self.duty = [1] * phases
+		self.frames = 0
+		self.late = 0
+		self._outputs = self.pins
+		self._low = self._high = self._released = None
+		self._pending = None
+		self._state = None
+		self._running = False
+		self._thread = None
+		self._lock = threading.Lock()
+		self._frame = None
+
+		if self.tristate:
+			self._low = [gpio._create_OutputPin_instance(pin.id, pin.name, initial_value=0) for pin in self.pins]
+			self._high = [gpio._create_OutputPin_instance(pin.id, pin.name, initial_value=1) for pin in self.pins]
+			self._released = [gpio._create_InputPin_instance(pin.id, pin.name, pull_up_down=None) for pin in self.pins]
+			self._outputs = self._high
+
+	def start(self):
+		"""
+		Start refreshing on a dedicated thread
+		"""
+		if self._frame is not None:
+			self._show(self._frame)
+		self._running = True
+		self._thread = threading.Thread(target=self._run, name="anygpio-display", daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		"""
+		Stop refreshing and blank the display
+		"""
+		self._running = False
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+
+	def set_brightness(self, brightness, duty=None):
+		"""
+		Set the brightness (0-1), and optionally the duty (0-1) of each phase
+		"""
+		with self._lock:
+			self.brightness = brightness
+			if duty is not None:
+				self.duty = list(duty)
+		if self._frame is not None:
+			self._show(self._frame)
+
+	def _show(self, frame):
+		"""
+		Compile the program of a frame buffer, swapped in at the end of the current frame
+		"""
+		with self._lock:
+			self._frame = frame
+			slot = int(1e9 / (self.rate * len(self.duty)))
+			phases = []
+			for index, state in enumerate(self._states(frame)):
+				on = int(slot * max(0, min(1, self.brightness * self.duty[index])))
+				phases.append((state, on) if state is not None and on else (None, 0))
+
+			# The program ends blanked after its last shown phase, which is where it starts again
+			start = self._off()
+			for state, on in reversed(phases):
+				if state is not None:
+					start = self._blank(state)
+					break
+
+			program = []
+			previous = start
+			for state, on in phases:
+				if state is None:
+					program.append(((), 0, (), slot))
+					continue
+
+				blank = self._blank(state)
+				program.append((self._steps(previous, state), on, self._steps(state, blank), slot - on))
+				previous = blank
+
+			self._pending = (tuple(program), start)
+
+	def _steps(self, previous, state):
+		"""
+		Returns the (function, args) steps changing the pins from previous to state
+
+		A state has a value per pin: 0, 1 or None (released)
+		previous is None when the pin states are unknown, every pin is then written
+		Pins are released first and driven last, so no other path lights up in between
+		"""
+		releases = []
+		drives = []
+		mask = changed = 0
+
+		for index, value in enumerate(state):
+			before = None if previous is None else previous[index]
+			if previous is not None and value == before:
+				continue
+
+			if value is None:
+				releases.append((self._released[index].setup, ()))
+			elif self.tristate and before is None:
+				drives.append(((self._high if value else self._low)[index].setup, ()))
+			else:
+				changed |= 1 << index
+				if value:
+					mask |= 1 << index
+
+		writes = [(self.gpio.output_mask, (self._outputs, mask, changed))] if changed else []
+		return tuple(releases + writes + drives)
+
+	def _run(self):
+		"""
+		Refresh thread
+		"""
+		perf_counter_ns = time.perf_counter_ns
+		program = ()
+		due = perf_counter_ns()
+
+		while self._running:
+			# Swap in a new frame buffer between frames
+			with self._lock:
+				pending, self._pending = self._pending, None
+			if pending is not None:
+				program, start = pending
+				for function, args in self._steps(self._state, start):
+					function(*args)
+				self._state = start
+
+			if not program:
+				time.sleep(1 / self.rate)
+				due = perf_counter_ns()
+				continue
+
+			for on_steps, on, off_steps, off in program:
+				late = False
+				if on:
+					for function, args in on_steps:
+						function(*args)
+					due += on
+					late = self._wait(due)
+					for function, args in off_steps:
+						function(*args)
+				if off:
+					due += off
+					late = self._wait(due) or late
+				if late:
+					self.late += 1
+
+			self.frames += 1
+
+		self._blank_all()
+
+	def _wait(self, due):
+		"""
+		Sleep then busy-wait until time.perf_counter_ns() reaches due
+
+		Returns True if due had already passed
+		"""
+		wait = due - time.perf_counter_ns()
+		if wait > SPIN_NS:
+			time.sleep((wait - SPIN_NS) / 1e9)
+		while time.perf_counter_ns() < due:
+			pass
+		return wait < 0
+
+	def _blank_all(self):
+		"""
+		Turn every phase off
+		"""
+		if self._state is not None:
+			off = self._off()
+			for function, args in self._steps(self._state, off):
+				function(*args)
+			self._state = off
+
+
+class Multiplexer(Display):
+	"""
+	Multiplexed displays with select lines (7-segment digits, LED matrix rows)
+
+	One select line is active per phase and the segment lines carry that
+		phase's pattern. All pins stay outputs. Segments come first in the
+		pin order, so a phase's segments are written before its select
+		line turns on
+
+	Attributes:
+		selects			Select OutputPins, one per phase (digit or row)
+		segments		Segment (column) OutputPins
+		select_active	Level of an active select line (0 for common anode digits switched by PNP transistors)
+		segment_active	Level of a lit segment
+	"""
+
+	def __init__(self, gpio, selects, segments, rate=RATE, brightness=1, select_active=1, segment_active=1):
+		"""
+		Sets default values and constructs instance of Multiplexer
+
+		selects and segments can be OutputPins or queries for pin()
+		"""
+		Display.__init__(self, gpio, list(segments) + list(selects), len(selects), rate, brightness)
+		self.segments = self.pins[:len(segments)]
+		self.selects = self.pins[len(segments):]
+		self.select_active = select_active
+		self.segment_active = segment_active
+
+	def show(self, frame):
+		"""
+		Show a frame buffer: one segment bitmask per select line, bit i is segments[i]
+		"""
+		frame = list(frame) + [0] * (len(self.selects) - len(frame))
+		self._show(frame[:len(self.selects)])
+
+	def show_text(self, text):
+		"""
+		Show text on 7-segment digits (segments a-g and dp in order), see encode()
+		"""
+		self.show(encode(text))
+
+	def _states(self, frame):
+		"""
+		Returns the pin states of each phase, None for phases with nothing lit
+		"""
+		count = len(self.selects)
+		inactive = 1 - self.select_active
+		states = []
+		for index, pattern in enumerate(frame):
+			if not pattern:
+				states.append(None)
+				continue
+			selects = [self.select_active if select == index else inactive for select in range(count)]
+			segments = [self.segment_active if pattern >> bit & 1 else 1 - self.segment_active for bit in range(len(self.segments))]
+			states.append(tuple(segments + selects))
+		return states
+
+	def _blank(self, state):
+		"""
+		Returns state with every select line inactive, segment lines are left as they are
+		"""
+		return state[:len(self.segments)] + (1 - self.select_active,) * len(self.selects)
+
+	def _off(self):
+		"""
+		Returns the state with every select line inactive and every segment off
+		"""
+		return (1 - self.segment_active,) * len(self.segments) + (1 - self.select_active,) * len(self.selects)
+
+
+class Charlieplexer(Display):
+	"""
+	Charlieplexed LEDs: n pins drive n * (n - 1) LEDs
+
+	Each phase drives one anode pin high and the cathode pins of its lit
+		LEDs low, every other pin is released (tri-state) by setting it
+		up as an input without pull resistor.
+	LED numbers count (anode, cathode) pairs in order: (0, 1), (0, 2) ... (1, 0), (1, 2) ...
+
+	Attributes:
+		leds			Number of LEDs
+	"""
+	tristate = True
+
+	def __init__(self, gpio, pins, rate=RATE, brightness=1):
+		"""
+		Sets default values and constructs instance of Charlieplexer
+
+		pins can be pins or queries for pin()
+		"""
+		Display.__init__(self, gpio, pins, len(pins), rate, brightness)
+		self.leds = len(self.pins) * (len(self.pins) - 1)
+
+	def led(self, number):
+		"""
+		Returns the (anode, cathode) pin indexes of an LED number
+		"""
+		anode, cathode = divmod(number, len(self.pins) - 1)
+		return anode, cathode + 1 if cathode >= anode else cathode
+
+	def show(self, leds):
+		"""
+		Light a set of LEDs, given as LED numbers or (anode, cathode) pin indexes
+		"""
+		self._show(frozenset(led if isinstance(led, tuple) else self.led(led) for led in leds))
+
+	def _states(self, leds):
+		"""
+		Returns the pin states of each phase (anode), None for anodes with nothing lit
+		"""
+		states = []
+		for anode in range(len(self.pins)):
+			cathodes = {cathode for lit_anode, cathode in leds if lit_anode == anode}
+			if not cathodes:
+				states.append(None)
+				continue
+			states.append(tuple(1 if pin == anode else 0 if pin in cathodes else None for pin in range(len(self.pins))))
+		return states
+
+	def _blank(self, state):
+		"""
+		Returns state with its anode released, cathodes are left driven low
+		"""
+		return tuple(None if value == 1 else value for value in state)
+
+	def _off(self):
+		"""
+		Returns the state with every pin released
+		"""
+		return (None,) * len(self.pins)
@@ -0,0 +1,241 @@
+import time, threading
+from collections import deque
+
+
+# Position change for each (previous state << 2 | new state), state is A << 1 | B
+# ERROR marks transitions where both channels changed (an edge was missed)
+ERROR = None
+TRANSITIONS = (
+	0, 1, -1, ERROR,
+	-1, 0, ERROR, 1,
+	1, ERROR, 0, -1,
+	ERROR, -1, 1, 0,
+)
+
+# Edges decoded inside the native callback once this many are waiting,
+# so edges never pile up when nobody reads the encoder
+BATCH = 4096
+
+# Default velocity window in seconds
+WINDOW = 0.1
+
+# Positions kept per velocity window while decoding a batch
+SAMPLES = 16
+
+# Kinds of captured edges
+EDGE = 0
+INDEX = 1
+
+
+class QuadratureEncoder:
+	"""
+	Counts the position of a quadrature (A/B) rotary encoder
+
+	The native callbacks of both channels only append (time, kind, state)
+		to a deque. The edges are decoded in batches through the 16 entry
+		TRANSITIONS table when the position is read (or BATCH edges are
+		waiting), so no Python state machine runs per edge.
+	Counts every edge of both channels (x4 decoding)
+
+	Attributes:
+		a				InputPin of channel A
+		b				InputPin of channel B
+		index			InputPin of the index pulse, None if not used
+		position		Position in counts
+		errors			Number of illegal transitions (missed edges)
+		revolutions		Number of index pulses seen
+		index_position	Position at the last index pulse, None before the first
+		reset_on_index	Reset the position to 0 on each index pulse
+		window			Seconds of edges used for velocity()
+		_edges			(time ns, kind, state) edges waiting to be decoded
+		_state			A << 1 | B after the last decoded edge
+		_history		(time ns, position) samples, SAMPLES per window
+	"""
+
+	def __init__(self, gpio, a, b, index=None, reset_on_index=False, window=WINDOW):
+		"""
+		Sets default values, registers the edge callbacks and constructs instance of QuadratureEncoder
+
+		a, b and index can be InputPins or queries for pin()
+		"""
+		self.a, self.b, self.index = [None if pin is None else gpio._resolve_pin(pin) for pin in (a, b, index)]
+		self.reset_on_index = reset_on_index
+		self.window = window
+		self._errors = 0
+		self._revolutions = 0
+		self._index_position = None
+		self._position = 0
+		self._edges = deque()
+		self._history = deque()
+		self._next_sample = 0
+		self._lock = threading.Lock()
+		self._state = self._read_state()
+
+		edge = self._edge_callback()
+		self.a.event(action=edge, both=True, bounce=0)
+		self.b.event(action=edge, both=True, bounce=0)
+		if self.index is not None:
+			self.index.event(action=self._index_callback(), rising_falling=1, bounce=0)
+
+	def _read_state(self):
+		"""
+		Returns the current A << 1 | B state
+		"""
+		return (1 if self.a.input() else 0) << 1 | (1 if self.b.input() else 0)
+
+	def _edge_callback(self):
+		"""
+		Returns the native callback of A and B: timestamp and read both channels
+		"""
+		append = self._edges.append
+		edges = self._edges
+		now = time.monotonic_ns
+		read_a = self.a.input
+		read_b = self.b.input
+		decode = self.decode
+
+		def edge(*_):
+			append((now(), EDGE, (2 if read_a() else 0) | (1 if read_b() else 0)))
+			if len(edges) >= BATCH:
+				decode()
+		return edge
+
+	def _index_callback(self):
+		"""
+		Returns the native callback of the index pin
+		"""
+		append = self._edges.append
+		now = time.monotonic_ns
+
+		def index(*_):
+			append((now(), INDEX, 0))
+		return index
+
+	def decode(self):
+		"""
+		Decode every waiting edge, returns the position
+		"""
+		with self._lock:
+			edges = self._edges
+			if not edges:
+				return self._position
+
+			table = TRANSITIONS
+			state = self._state
+			position = self._position
+			errors = 0
+			timestamp = None
+			history = self._history
+			sample_ns = int(self.window * 1e9) // SAMPLES
+			next_sample = self._next_sample
+
+			# Only pop the edges present now, callbacks may keep appending
+			for _ in range(len(edges)):
+				timestamp, kind, new = edges.popleft()
+
+				if kind == INDEX:
+					self._revolutions += 1
+					self._index_position = position
+					if self.reset_on_index:
+						position = 0
+					continue
+
+				delta = table[state << 2 | new]
+				if delta is None:
+					errors += 1
+				else:
+					position += delta
+				state = new
+
+				if timestamp >= next_sample:
+					history.append((timestamp, position))
+					next_sample = timestamp + sample_ns
+
+			self._state = state
+			self._position = position
+			self._errors += errors
+			self._next_sample = next_sample
+			history.append((timestamp, position))
+			self._prune(timestamp)
+			return position
+
+	def _prune(self, now):
+		"""
+		Drop history older than the window, keeping one entry at or before its start
+		"""
+		history = self._history
+		start = now - int(self.window * 1e9)
+		while len(history) > 1 and history[1][0] <= start:
+			history.popleft()
+
+	@property
+	def position(self):
+		"""
+		Position in counts, decoding waiting edges first
+		"""
+		return self.decode()
+
+	@property
+	def errors(self):
+		"""
+		Number of illegal transitions, decoding waiting edges first
+		"""
+		self.decode()
+		return self._errors
+
+	@property
+	def revolutions(self):
+		"""
+		Number of index pulses, decoding waiting edges first
+		"""
+		self.decode()
+		return self._revolutions
+
+	@property
+	def index_position(self):
+		"""
+		Position at the last index pulse, decoding waiting edges first
+		"""
+		self.decode()
+		return self._index_position
+
+	def reset(self, position=0):
+		"""
+		Set the position (default 0) and clear the error count
+		"""
+		with self._lock:
+			self._edges.clear()
+			self._history.clear()
+			self._next_sample = 0
+			self._state = self._read_state()
+			self._position = position
+			self._errors = 0
+
+	def velocity(self):
+		"""
+		Returns the velocity in counts per second over the last window seconds
+		"""
+		position = self.decode()
+		now = time.monotonic_ns()
+
+		with self._lock:
+			# The oldest entry left is the reference at (or before) the window start
+			self._prune(now)
+			if not self._history:
+				return 0.0
+			then, previous = self._history[0]
+
+		# The position didn't change between the last edge of that batch and the window start
+		then = max(then, now - int(self.window * 1e9))
+
+		if then >= now:
+			return 0.0
+		return (position - previous) * 1e9 / (now - then)
+
+	def close(self):
+		"""
+		Remove the edge callbacks
+		"""
+		for pin in (self.a, self.b, self.index):
+			if pin is not None:
+				pin.remove_event()
@@ -25,8 +25,51 @@ class WrapperError(Exception):
 	"""
 	pass
 
+class PinNotFound(WrapperError):
+	"""
+	Thrown when no configured pin matches a pin query
+	"""
+	pass
+
 class GPIOFunctionNotSupported(Exception):
 	"""
 	Generic exception regarding GPIO function support
 	"""
 	pass
+
+class TraceError(Exception):
+	"""
+	Thrown when a GPIO trace file can not be read
+	"""
+	pass
+
+class BrokerError(Exception):
+	"""
+	Thrown when a request to the GPIO broker fails
+	"""
+	pass
+
+class MirrorError(Exception):
+	"""
+	Thrown when the shared memory pin state mirror can not be used
+	"""
+	pass
+
+class ConfigError(Exception):
+	"""
+	Thrown when a pin configuration file is invalid
+	"""
+	pass
+
+class ProtocolError(Exception):
+	"""
+	Thrown when a bit-banged bus transfer fails (NACK, no 1-Wire presence, bad CRC)
+	or a pulse train can't be decoded
+	"""
+	pass
+
+class CaptureError(Exception):
+	"""
+	Thrown when pins can't be captured or a capture file can't be read
+	"""
+	pass
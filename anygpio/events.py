@@ -0,0 +1,204 @@
+import time, threading, traceback
+from collections import deque
+
+from .latency import LatencyStats
+
+
+# Default number of events an EventQueue holds
+QUEUE_SIZE = 64
+
+# What EventQueue.put() does when the queue is full
+#	drop_oldest		Discard the oldest queued event to make room
+#	drop_newest		Discard the new event
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+
+
+class EventQueue:
+	"""
+	Bounded queue of timestamped events between a native callback and a pin's action
+
+	put() is the native event callback, it only timestamps and enqueues.
+		The action runs later on a Dispatcher worker thread, so a slow
+		action can't delay the native library's edge detection.
+	The dispatcher is only notified when the queue becomes ready, a worker
+		then drains it. A flood of events is bounded by maxsize on both sides
+
+	Attributes:
+		action			Called with the native callback arguments for each event
+		maxsize			Number of events the queue holds
+		overflow		Overflow policy, one of OVERFLOW_POLICIES
+		dispatcher		Dispatcher running the action
+		enqueued		Number of events put in the queue
+		dispatched		Number of events whose action has run
+		dropped			Number of events discarded because the queue was full
+		max_depth		Largest number of queued events seen
+		latency			LatencyStats to record each event in, None to not record
+		_scheduled		Is the queue waiting for or being drained by a worker?
+		_lock			Guards the events, counters and _scheduled
+	"""
+
+	def __init__(self, action, maxsize=QUEUE_SIZE, overflow="drop_oldest", dispatcher=None, latency=None):
+		"""
+		Sets default values and constructs instance of EventQueue
+		"""
+		if overflow not in OVERFLOW_POLICIES:
+			raise ValueError("Unknown overflow policy: " + str(overflow))
+
+		self.action = action
+		self.maxsize = maxsize
+		self.overflow = overflow
+		self.dispatcher = dispatcher or default_dispatcher
+		self.enqueued = 0
+		self.dispatched = 0
+		self.dropped = 0
+		self.max_depth = 0
+		self.latency = latency
+
+		# drop_oldest is handled by the deque itself
+		self._events = deque(maxlen=maxsize if overflow == "drop_oldest" else None)
+		self._scheduled = False
+		self._lock = threading.Lock()
+
+	def put(self, *args):
+		"""
+		Enqueue an event, used as the native event callback
+		"""
+		timestamp = time.monotonic_ns()
+
+		with self._lock:
+			depth = len(self._events)
+			if depth >= self.maxsize:
+				self.dropped += 1
+				if self.overflow == "drop_newest":
+					return
+			else:
+				depth += 1
+				if depth > self.max_depth:
+					self.max_depth = depth
+
+			enqueued = time.monotonic_ns() if self.latency else timestamp
+			self._events.append((timestamp, enqueued, args))
+			self.enqueued += 1
+
+			# A worker already has the queue, it will reach this event
+			if self._scheduled:
+				return
+			self._scheduled = True
+
+		self.dispatcher.notify(self)
+
+	def get(self):
+		"""
+		Dequeue the oldest (detected, enqueued, args) event, None if empty
+
+		Returning None hands the queue back: the next put() notifies the dispatcher
+		"""
+		with self._lock:
+			try:
+				return self._events.popleft()
+			except IndexError:
+				self._scheduled = False
+				return None
+
+	def _done(self):
+		"""
+		Count an event whose action has run
+		"""
+		with self._lock:
+			self.dispatched += 1
+
+	def stats(self):
+		"""
+		Return the queue depth and event counters as a dict
+		"""
+		return {
+			"depth": len(self._events),
+			"max_depth": self.max_depth,
+			"enqueued": self.enqueued,
+			"dispatched": self.dispatched,
+			"dropped": self.dropped,
+		}
+
+
+class Dispatcher:
+	"""
+	Runs the actions of queued events on worker threads
+
+	A queue is drained by one worker at a time, so every pin's actions
+		run in the order its events happened. More workers (the default is
+		one) let a slow action on one pin run alongside other pins' actions.
+		A worker runs at most maxsize events of a queue before moving on
+
+	Attributes:
+		workers			Number of worker threads
+		latency			LatencyStats of every event from queues that record latency
+		_ready			Queues with pending events, each listed at most once
+		_semaphore		Counts entries in _ready, wakes the workers
+		_threads		Worker threads, started with the first event
+		_lock			Guards starting the workers and latency
+	"""
+
+	def __init__(self, workers=1):
+		"""
+		Sets default values and constructs instance of Dispatcher
+		"""
+		self.workers = workers
+		self.latency = LatencyStats()
+		self._ready = deque()
+		self._semaphore = threading.Semaphore(0)
+		self._threads = []
+		self._lock = threading.Lock()
+
+	def notify(self, queue):
+		"""
+		Tell the workers queue has events to run
+		"""
+		self._ready.append(queue)
+		self._semaphore.release()
+
+		if len(self._threads) < self.workers:
+			self._start_workers()
+
+	def _start_workers(self):
+		"""
+		Start the worker threads
+		"""
+		with self._lock:
+			while len(self._threads) < self.workers:
+				thread = threading.Thread(target=self._run, name="anygpio-dispatcher", daemon=True)
+				self._threads.append(thread)
+				thread.start()
+
+	def _run(self):
+		"""
+		Worker thread: run the action of each queued event
+		"""
+		while True:
+			self._semaphore.acquire()
+			queue = self._ready.popleft()
+
+			for _ in range(queue.maxsize):
+				event = queue.get()
+				if event is None:
+					break
+
+				detected, enqueued, args = event
+				started = time.monotonic_ns()
+				try:
+					queue.action(*args)
+				except Exception:
+					traceback.print_exc()
+				queue._done()
+
+				if queue.latency:
+					ended = time.monotonic_ns()
+					queue.latency.record(detected, enqueued, started, ended)
+					with self._lock:
+						self.latency.record(detected, enqueued, started, ended)
+			else:
+				# Give other queues a turn, this one is still scheduled
+				self.notify(queue)
+
+
+# Dispatcher shared by all queued pin events
+default_dispatcher = Dispatcher()
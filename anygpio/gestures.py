@@ -0,0 +1,217 @@
+import time, threading
+
+from .scheduler import default_scheduler
+
+
+# States
+IDLE = "idle"
+PRESSED = "pressed"
+HELD = "held"
+RELEASED = "released"
+PRESSED_AGAIN = "pressed_again"
+
+# Inputs
+PRESS = "press"
+RELEASE = "release"
+LONG_TIMEOUT = "long_timeout"
+DOUBLE_TIMEOUT = "double_timeout"
+
+# Timer actions
+START_LONG = "start_long"
+START_DOUBLE = "start_double"
+
+# (state, input): (next state, gestures emitted, timer to start)
+# Starting a timer cancels the running one, inputs missing from the table are ignored
+TRANSITIONS = {
+	(IDLE, PRESS): (PRESSED, ("press",), START_LONG),
+	(PRESSED, RELEASE): (RELEASED, ("release",), START_DOUBLE),
+	(PRESSED, LONG_TIMEOUT): (HELD, ("long_press",), None),
+	(HELD, RELEASE): (IDLE, ("release",), None),
+	(RELEASED, PRESS): (PRESSED_AGAIN, ("press", "double_press"), None),
+	(RELEASED, DOUBLE_TIMEOUT): (IDLE, ("click",), None),
+	(PRESSED_AGAIN, RELEASE): (IDLE, ("release",), None),
+}
+
+# Gestures that can be registered
+GESTURES = ("press", "release", "click", "long_press", "double_press")
+
+# Default long press and double press times in milliseconds
+LONG_PRESS_MS = 800
+DOUBLE_PRESS_MS = 300
+
+# Bounce time used for the native edge events in milliseconds
+BOUNCE_MS = 20
+
+
+class GestureRecognizer:
+	"""
+	Recognizes press, release, click, long press and double press on an InputPin
+
+	Driven by the pin's edge events (both edges) and a table-driven state
+		machine (TRANSITIONS). Timers run on a shared Scheduler, not a
+		thread per pin
+
+	Attributes:
+		pin				InputPin the gestures are recognized on
+		state			Current state of the state machine
+		handlers		Lists of callbacks by gesture name, called with the pin
+		long_ms			Hold time of a long press in milliseconds, for all its handlers
+		double_ms		Time allowed between the presses of a double press, for all its handlers
+		last_edge		Time (time.monotonic_ns()) of the last edge
+		_timer			Running scheduler timer
+	"""
+
+	def __init__(self, pin, scheduler=default_scheduler):
+		"""
+		Sets default values and constructs instance of GestureRecognizer
+		"""
+		self.pin = pin
+		self.scheduler = scheduler
+		self.state = IDLE
+		self.handlers = {gesture: [] for gesture in GESTURES}
+		self.long_ms = LONG_PRESS_MS
+		self.double_ms = DOUBLE_PRESS_MS
+		self.last_edge = None
+		self._timer = None
+		self._generation = 0
+		self._lock = threading.RLock()
+
+	def start(self):
+		"""
+		Register the edge events on the pin
+		"""
+		self.pin.event(action=self._edge, both=True, bounce=BOUNCE_MS)
+
+	def on(self, gesture, callback, ms=None):
+		"""
+		Register callback for a gesture
+
+		ms sets long_ms for "long_press" and double_ms for "double_press".
+			They are shared by all handlers of the recognizer, so ms must
+			match the one of the handlers already registered (ValueError)
+		"""
+		if gesture not in GESTURES:
+			raise ValueError("Unknown gesture: " + str(gesture))
+
+		attribute = {"long_press": "long_ms", "double_press": "double_ms"}.get(gesture)
+		if ms is not None and attribute:
+			if self.handlers[gesture] and ms != getattr(self, attribute):
+				raise ValueError("%s handlers of pin %s already use %s=%s" % (gesture, self.pin.id, attribute, getattr(self, attribute)))
+			setattr(self, attribute, ms)
+
+		self.handlers[gesture].append(callback)
+
+	def _timeout(self, input, generation):
+		"""
+		Scheduler callback, feeds a timeout if its timer is still current
+		"""
+		with self._lock:
+			if generation != self._generation:
+				return
+			gestures = self._step(input)
+		self._emit(gestures)
+
+	def _edge(self, *_):
+		"""
+		Native edge callback, reads the pin to tell presses from releases
+		"""
+		self.last_edge = time.monotonic_ns()
+		self.feed(PRESS if self.pin.value() else RELEASE)
+
+	def feed(self, input):
+		"""
+		Run one input through the state machine
+
+		The handlers are called after the recognizer's lock is released
+		"""
+		with self._lock:
+			gestures = self._step(input)
+		self._emit(gestures)
+
+	def _emit(self, gestures):
+		"""
+		Call the handlers of gestures
+		"""
+		for gesture in gestures:
+			for callback in self.handlers[gesture]:
+				callback(self.pin)
+
+	def _step(self, input):
+		"""
+		Apply one input to the state, returns the gestures emitted
+
+		Called with the lock held
+		"""
+		transition = TRANSITIONS.get((self.state, input))
+		if transition is None:
+			return ()
+		self.state, gestures, timer = transition
+
+		if self._timer:
+			self._timer.cancel()
+			self._timer = None
+
+		# Timeouts of older timers are ignored
+		self._generation += 1
+
+		if timer == START_LONG:
+			self._timer = self.scheduler.call_later(self.long_ms / 1000, self._timeout, LONG_TIMEOUT, self._generation)
+		elif timer == START_DOUBLE:
+			# Without double press handlers there is nothing to wait for
+			delay = self.double_ms / 1000 if self.handlers["double_press"] else 0
+			self._timer = self.scheduler.call_later(delay, self._timeout, DOUBLE_TIMEOUT, self._generation)
+
+		return gestures
+
+
+class ChordDetector:
+	"""
+	Calls back when all pins of a chord are pressed within ms of each other
+
+	Attributes:
+		pins			InputPins of the chord
+		callback		Called with the list of pins
+		ms				Time allowed between the first and last press
+		_pressed		Press times by pin id of the pins that are down
+		_fired			Has the chord fired since all pins were last released?
+	"""
+
+	def __init__(self, pins, callback, ms=50):
+		"""
+		Sets default values and constructs instance of ChordDetector
+		"""
+		self.pins = pins
+		self.callback = callback
+		self.ms = ms
+		self._pressed = {}
+		self._fired = False
+		self._lock = threading.Lock()
+
+		for pin in pins:
+			recognizer = pin.gestures()
+			recognizer.on("press", self._press)
+			recognizer.on("release", self._release)
+
+	def _press(self, pin):
+		"""
+		Record a press, fire if every pin is down within the window
+		"""
+		with self._lock:
+			self._pressed[pin.id] = time.monotonic_ns()
+			if self._fired or len(self._pressed) < len(self.pins):
+				return
+			spread = max(self._pressed.values()) - min(self._pressed.values())
+			if spread > self.ms * 1e6:
+				return
+			self._fired = True
+
+		self.callback(self.pins)
+
+	def _release(self, pin):
+		"""
+		Forget a press, the chord can fire again once all pins are released
+		"""
+		with self._lock:
+			self._pressed.pop(pin.id, None)
+			if not self._pressed:
+				self._fired = False
@@ -0,0 +1,40 @@
+def hook(pin, name, owner, factory):
+	"""
+	Wrap the pin method name on this pin instance only
+
+	factory(original) returns the wrapper, original is the method being
+		wrapped (the class method or the wrapper of an earlier hook).
+	Several owners (e.g. a trace Recorder and a StateMirror) can hook the
+		same method, each is removed with unhook() without disturbing the others
+	"""
+	hooks = pin.__dict__.setdefault("_hooks", [])
+	hooks.append((owner, name, factory))
+	_rebuild(pin, name)
+
+
+def unhook(pin, owner):
+	"""
+	Remove every hook of owner from pin
+	"""
+	hooks = pin.__dict__.get("_hooks", [])
+	names = {name for hook_owner, name, _ in hooks if hook_owner is owner}
+	hooks[:] = [hook for hook in hooks if hook[0] is not owner]
+
+	for name in names:
+		_rebuild(pin, name)
+
+
+def _rebuild(pin, name):
+	"""
+	Recreate the chain of wrappers of a method from the class method up
+	"""
+	# Drop the instance attribute to get back to the class method
+	pin.__dict__.pop(name, None)
+	factories = [factory for _, hooked, factory in pin.__dict__.get("_hooks", []) if hooked == name]
+	if not factories:
+		return
+
+	function = getattr(pin, name)
+	for factory in factories:
+		function = factory(function)
+	setattr(pin, name, function)
@@ -0,0 +1,221 @@
+import time, threading
+
+from .events import EventQueue
+from .scheduler import default_scheduler
+
+
+# Default seconds between scans while a key is down
+SCAN_INTERVAL = 0.005
+
+# Default seconds a key must stay in a new state before it is reported
+DEBOUNCE = 0.02
+
+
+class KeypadMatrix:
+	"""
+	Scans a row/column key matrix
+
+	Rows are output pins driven low one at a time, columns are input pins
+		with pull up resistors: a pressed key pulls its column low while
+		its row is driven low. Rows are written with GPIO.output_mask() and
+		columns read with GPIO.input_mask(), once per row per scan. They
+		are single native calls on wrappers with bulk writes or reads
+		(output_mask() on RPi), one call per pin otherwise.
+	While no key is down all rows are held low and nothing is scanned, a
+		falling edge on any column wakes the scanner, which then runs on
+		the shared scheduler until every key is released
+
+	Keys are debounced individually. When three pressed keys form the
+		corners of a rectangle the fourth reads as pressed too (ghosting)
+		and any of the four could be the ghost. Corners already reported
+		as pressed stay pressed, corners that newly read as pressed are
+		held back in ambiguous until the rectangle breaks up (a key is
+		released), then they are debounced and reported as usual
+
+	Key events (key, pressed) are delivered through an EventQueue, so
+		callbacks run on the event dispatcher and can't delay scanning
+
+	Attributes:
+		gpio			GPIO wrapper instance
+		rows			Row OutputPins
+		columns			Column InputPins
+		keys			keys[row][column] is reported for each key, (row, column) if None
+		scan_interval	Seconds between scans while a key is down
+		debounce		Seconds a key must stay in a new state before it is reported
+		ghosts			Number of scans where ghosting was detected
+		ambiguous		Keys read as pressed in the last scan that may be ghosts,
+							not reported until they can be told apart
+		scans			Number of scans
+		queue			EventQueue delivering key events to the callbacks
+		_callbacks		Functions called with (key, pressed)
+		_stable			Bitmask of reported pressed keys per row
+		_pending		{(row, column): time the key's new state was first seen}
+		_scanning		Is the scanner running?
+	"""
+
+	def __init__(self, gpio, rows, columns, keys=None, scan_interval=SCAN_INTERVAL, debounce=DEBOUNCE):
+		"""
+		Sets default values, registers the column callbacks and constructs instance of KeypadMatrix
+
+		rows and columns can be pins or queries for pin()
+		"""
+		self.gpio = gpio
+		self.rows = [gpio._resolve_pin(pin) for pin in rows]
+		self.columns = [gpio._resolve_pin(pin) for pin in columns]
+		self.keys = keys
+		self.scan_interval = scan_interval
+		self.debounce = debounce
+		self.ghosts = 0
+		self.ambiguous = frozenset()
+		self.scans = 0
+		self.queue = EventQueue(self._emit)
+		self._callbacks = []
+		self._stable = [0] * len(self.rows)
+		self._pending = {}
+		self._scanning = False
+		self._lock = threading.Lock()
+
+		# Drive one row low at a time, the others high
+		all_rows = (1 << len(self.rows)) - 1
+		self._row_masks = [all_rows & ~(1 << row) for row in range(len(self.rows))]
+		self._all_columns = (1 << len(self.columns)) - 1
+
+		self._idle()
+		for column in self.columns:
+			column.event(action=self._wake, rising_falling=0, bounce=0)
+
+	def on_key(self, callback):
+		"""
+		Call callback(key, pressed) when a key is pressed or released
+		"""
+		self._callbacks.append(callback)
+
+	def pressed(self):
+		"""
+		Returns the keys currently pressed
+		"""
+		return [self._key(row, column) for row, mask in enumerate(self._stable) for column in range(len(self.columns)) if mask >> column & 1]
+
+	def close(self):
+		"""
+		Remove the column callbacks and stop scanning
+		"""
+		for column in self.columns:
+			column.remove_event()
+		with self._lock:
+			self._scanning = False
+
+	def _key(self, row, column):
+		"""
+		Returns the key reported for a row and column
+		"""
+		return self.keys[row][column] if self.keys else (row, column)
+
+	def _idle(self):
+		"""
+		Drive all rows low so any key press pulls its column low
+		"""
+		self.gpio.output_mask(self.rows, 0)
+
+	def _wake(self, *_):
+		"""
+		Column callback: start scanning if not already
+		"""
+		with self._lock:
+			if self._scanning:
+				return
+			self._scanning = True
+		default_scheduler.call_later(0, self._scan)
+
+	def _read(self):
+		"""
+		Returns the bitmask of pressed columns of each row
+		"""
+		output_mask = self.gpio.output_mask
+		input_mask = self.gpio.input_mask
+		rows = self.rows
+		columns = self.columns
+		all_columns = self._all_columns
+
+		raw = []
+		previous = 0
+		for mask in self._row_masks:
+			# Only the rows that change are written
+			output_mask(rows, mask, previous ^ mask)
+			previous = mask
+			raw.append(~input_mask(columns) & all_columns)
+		output_mask(rows, 0, previous)
+		return raw
+
+	def _ghosted(self, raw):
+		"""
+		Returns a bitmask per row of keys that may be ghosts, counting ghosting
+		"""
+		ghosted = [0] * len(raw)
+		found = False
+		for first in range(len(raw)):
+			for second in range(first + 1, len(raw)):
+				shared = raw[first] & raw[second]
+				# Two rows sharing two columns: one of the four keys may be a ghost
+				if shared & (shared - 1):
+					ghosted[first] |= shared
+					ghosted[second] |= shared
+					found = True
+		if found:
+			self.ghosts += 1
+		return ghosted
+
+	def _scan(self):
+		"""
+		Scan the matrix, report debounced changes and schedule the next scan
+		"""
+		with self._lock:
+			if not self._scanning:
+				return
+
+		self.scans += 1
+		raw = self._read()
+		ghosted = self._ghosted(raw)
+		now = time.monotonic_ns()
+		debounce = int(self.debounce * 1e9)
+		pending = self._pending
+		ambiguous = []
+
+		for row, stable in enumerate(self._stable):
+			# Ghosted keys keep their state, new presses among them are held back
+			changed = (raw[row] ^ stable) & ~ghosted[row]
+			held = raw[row] & ghosted[row] & ~stable
+			for column in range(len(self.columns)):
+				key = (row, column)
+				if held >> column & 1:
+					ambiguous.append(self._key(row, column))
+				if not changed >> column & 1:
+					pending.pop(key, None)
+					continue
+
+				since = pending.setdefault(key, now)
+				if now - since >= debounce:
+					del pending[key]
+					stable ^= 1 << column
+					self.queue.put(self._key(row, column), bool(stable >> column & 1))
+			self._stable[row] = stable
+		self.ambiguous = frozenset(ambiguous)
+
+		if any(raw) or any(self._stable) or pending:
+			default_scheduler.call_later(self.scan_interval, self._scan)
+			return
+
+		# Everything released: wait for the next column edge
+		with self._lock:
+			self._scanning = False
+
+		# A key pressed since the read had its edge ignored while scanning
+		if self.gpio.input_mask(self.columns) != self._all_columns:
+			self._wake()
+
+	def _emit(self, key, pressed):
+		"""
+		Dispatcher side of the queue: run the callbacks
+		"""
+		for callback in self._callbacks:
+			callback(key, pressed)
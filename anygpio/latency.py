@@ -0,0 +1,150 @@
+import time
+
+
+# Histogram bucket i holds values with bit_length() == i (nanoseconds)
+# 40 buckets cover up to about 9 minutes
+BUCKETS = 40
+
+# Stages between an edge and the end of its action
+STAGES = ("enqueue", "wait", "run", "total")
+
+
+class Histogram:
+	"""
+	Fixed power of two bucket histogram of durations in nanoseconds
+
+	Adding a value is O(1) and allocates nothing. Percentiles are
+		reported as the upper bound of their bucket (within 2x)
+
+	Attributes:
+		counts			Number of values in each bucket
+		count			Number of values added
+		total			Sum of the values added
+		max				Largest value added
+	"""
+
+	def __init__(self):
+		"""
+		Sets default values and constructs instance of Histogram
+		"""
+		self.reset()
+
+	def reset(self):
+		"""
+		Forget all values added so far
+		"""
+		self.counts = [0] * BUCKETS
+		self.count = 0
+		self.total = 0
+		self.max = 0
+
+	def add(self, value):
+		"""
+		Add a duration in nanoseconds
+		"""
+		if value < 0:
+			value = 0
+		self.counts[min(value.bit_length(), BUCKETS - 1)] += 1
+		self.count += 1
+		self.total += value
+		if value > self.max:
+			self.max = value
+
+	def percentile(self, percent):
+		"""
+		Returns the upper bound of the bucket holding the percent percentile
+		"""
+		if not self.count:
+			return 0
+		rank = self.count * percent / 100
+		seen = 0
+		for bucket, count in enumerate(self.counts):
+			seen += count
+			if seen >= rank:
+				return min(1 << bucket, self.max)
+		return self.max
+
+	def summary(self):
+		"""
+		Returns count, mean, p50, p99 and max in nanoseconds as a dict
+		"""
+		return {
+			"count": self.count,
+			"mean": self.total / self.count if self.count else 0,
+			"p50": self.percentile(50),
+			"p99": self.percentile(99),
+			"max": self.max,
+		}
+
+
+class LatencyStats:
+	"""
+	Histograms of the stages between an edge and the end of its action
+
+	Stages:
+		enqueue			Edge detected to event queued
+		wait			Event queued to action started
+		run				Action started to action finished
+		total			Edge detected to action finished
+
+	Queued events (event(queue=...)) are timestamped when detected and
+		watch() actions when the tick sees the pin's desired value, they
+		have no enqueue time. Unqueued event() actions only record the
+		run stage
+
+	Attributes:
+		histograms		Histogram by stage name
+	"""
+
+	def __init__(self):
+		"""
+		Sets default values and constructs instance of LatencyStats
+		"""
+		self.histograms = {stage: Histogram() for stage in STAGES}
+
+	def record(self, detected, enqueued, started, ended):
+		"""
+		Add one event from its four time.monotonic_ns() timestamps
+		"""
+		histograms = self.histograms
+		histograms["enqueue"].add(enqueued - detected)
+		histograms["wait"].add(started - enqueued)
+		histograms["run"].add(ended - started)
+		histograms["total"].add(ended - detected)
+
+	def record_run(self, started, ended):
+		"""
+		Add the run stage of an unqueued action, which has no other stages
+		"""
+		self.histograms["run"].add(ended - started)
+
+	def wrap(self, action, detected=None):
+		"""
+		Return a callback that runs action and records its run stage
+
+		With detected (time.monotonic_ns() of the detection), every stage
+			is recorded and the enqueue stage is 0
+		"""
+		def timed(*args):
+			started = time.monotonic_ns()
+			try:
+				return action(*args)
+			finally:
+				if detected is None:
+					self.record_run(started, time.monotonic_ns())
+				else:
+					self.record(detected, detected, started, time.monotonic_ns())
+		return timed
+
+	def reset(self):
+		"""
+		Reset every histogram
+		"""
+		for histogram in self.histograms.values():
+			histogram.reset()
+
+	def summary(self):
+		"""
+		Returns the summary of every stage's histogram as a dict
+		"""
+		return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
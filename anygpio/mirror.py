@@ -0,0 +1,261 @@
+import time, struct, threading
+from multiprocessing import shared_memory, resource_tracker
+
+from . import anygpio
+from . import errors
+from .hooks import hook, unhook
+from .scheduler import default_scheduler
+
+
+# Shared memory layout:
+#	header		magic, sequence (seqlock version), number of pins
+#	slots		one SLOT per pin
+MAGIC = b"AGMIRR01"
+HEADER = struct.Struct("<8sQI4x")
+
+# Bytes of a pin id (str(id) encoded as utf-8) in a slot
+ID_SIZE = 16
+
+# pin id, id kind (0 int, 1 string), level, edge count, last edge time (ns)
+SLOT = struct.Struct("<%dsBB6xQQ" % ID_SIZE)
+
+# Offset of the sequence number in the header
+SEQUENCE = 8
+
+# Default number of pin slots
+MAX_PINS = 64
+
+
+class StateMirror:
+	"""
+	Publishes the state of every pin in shared memory for other processes
+
+	Levels are updated from input(), output() and event callbacks of the
+		attached pins (hooked on the pin instances) and from refresh().
+		Edges are counted when an update changes the level, so an input
+		that changes and changes back between two of them counts no edges.
+		Use events or a short refresh interval to count fast inputs.
+	Writes are guarded by a seqlock so MirrorReader gets consistent
+		snapshots without locks or syscalls
+
+	Attributes:
+		gpio			GPIO wrapper instance being mirrored
+		name			Name of the shared memory block
+		memory			multiprocessing.shared_memory.SharedMemory block
+		max_pins		Number of pin slots
+		_slots			Slot index by pin id
+		_state			[level, edges, last_edge] by pin id
+		_timer			Scheduler timer of the periodic refresh
+		_lock			Guards _state and the shared memory writes
+		_refresh_lock	Serializes refresh() and close()
+		_closed			Has close() been called?
+	"""
+
+	def __init__(self, gpio, name="anygpio", max_pins=MAX_PINS):
+		"""
+		Sets default values, creates the shared memory block and constructs instance of StateMirror
+		"""
+		self.gpio = gpio
+		self.name = name
+		self.max_pins = max_pins
+		self.memory = shared_memory.SharedMemory(name, create=True, size=HEADER.size + max_pins * SLOT.size)
+		self._slots = {}
+		self._state = {}
+		self._interval = None
+		self._timer = None
+		self._lock = threading.Lock()
+		self._refresh_lock = threading.Lock()
+		self._closed = False
+		HEADER.pack_into(self.memory.buf, 0, MAGIC, 0, 0)
+
+	def attach(self):
+		"""
+		Mirror every configured pin that is not mirrored yet
+
+		Call again after configuring more pins
+		Raises MirrorError if the slots are full or a pin id doesn't fit
+			in ID_SIZE bytes
+		"""
+		for pin in list(self.gpio.pins.values()):
+			if pin.id in self._slots:
+				continue
+			if len(self._slots) == self.max_pins:
+				raise errors.MirrorError("No free slot for pin " + str(pin.id))
+			if len(str(pin.id).encode()) > ID_SIZE:
+				raise errors.MirrorError("Pin id %r is longer than %d bytes" % (pin.id, ID_SIZE))
+
+			# Start from the current level without counting an edge
+			level = int(pin.input()) if hasattr(pin, "input") else 0
+
+			with self._lock:
+				self._slots[pin.id] = len(self._slots)
+				self._state[pin.id] = [level, 0, 0]
+				self._write(pin.id)
+			self._hook_pin(pin)
+
+		return self
+
+	def refresh(self, interval=None):
+		"""
+		Read every mirrored input pin once
+
+		With interval (seconds), keep refreshing on the shared scheduler
+			so inputs nobody reads still show up in the mirror. Level
+			changes between two refreshes are only counted as edges if
+			something else reads the pin
+		"""
+		with self._refresh_lock:
+			if self._closed:
+				return
+
+			for pin in list(self.gpio.pins.values()):
+				if pin.id in self._slots and hasattr(pin, "input"):
+					pin.input()
+
+			if interval:
+				self._interval = interval
+			if self._interval:
+				self._timer = default_scheduler.call_later(self._interval, self.refresh)
+
+	def update(self, pin, level):
+		"""
+		Record the level of a pin, counting an edge if it changed
+		"""
+		level = int(level)
+		with self._lock:
+			state = self._state.get(pin.id)
+			if state is None:
+				return
+			if level != state[0]:
+				state[0] = level
+				state[1] += 1
+				state[2] = time.monotonic_ns()
+			self._write(pin.id)
+
+	def close(self):
+		"""
+		Unhook the pins and remove the shared memory block
+
+		Waits for a running refresh(), updates after this are ignored
+		"""
+		with self._refresh_lock:
+			if self._closed:
+				return
+			self._closed = True
+			self._interval = None
+			if self._timer:
+				self._timer.cancel()
+
+		for pin in list(self.gpio.pins.values()):
+			unhook(pin, self)
+		with self._lock:
+			self._state = {}
+		self.memory.close()
+		self.memory.unlink()
+
+	def _write(self, id):
+		"""
+		Write a pin's slot inside a seqlock write section
+		"""
+		buffer = self.memory.buf
+		sequence = struct.unpack_from("<Q", buffer, SEQUENCE)[0]
+
+		# Odd sequence: readers retry until the write is done
+		struct.pack_into("<Q", buffer, SEQUENCE, sequence + 1)
+
+		level, edges, last_edge = self._state[id]
+		kind = 0 if isinstance(id, int) else 1
+		SLOT.pack_into(buffer, HEADER.size + self._slots[id] * SLOT.size, str(id).encode(), kind, level, edges, last_edge)
+		struct.pack_into("<I", buffer, SEQUENCE + 8, len(self._slots))
+
+		struct.pack_into("<Q", buffer, SEQUENCE, sequence + 2)
+
+	def _hook_pin(self, pin):
+		"""
+		Update the mirror from input(), output() and event callbacks of a pin
+		"""
+		update = self.update
+
+		if hasattr(pin, "input"):
+			def hook_input(original):
+				def input():
+					value = original()
+					update(pin, value)
+					return value
+				return input
+			hook(pin, "input", self, hook_input)
+
+		if isinstance(pin, anygpio.InputPin):
+			def hook_add_event(original):
+				def _add_event(rising_or_falling, action, bounce=None):
+					def callback(*args):
+						# Reading the pin through the hook updates the mirror
+						pin.input()
+						return action(*args)
+					return original(rising_or_falling, callback, bounce)
+				return _add_event
+			hook(pin, "_add_event", self, hook_add_event)
+
+		if isinstance(pin, anygpio.OutputPin):
+			def hook_output(original):
+				def output(value):
+					result = original(value)
+					update(pin, value)
+					return result
+				return output
+			hook(pin, "output", self, hook_output)
+
+
+class MirrorReader:
+	"""
+	Reads consistent snapshots of a StateMirror from another process
+
+	Attributes:
+		name			Name of the shared memory block
+		memory			multiprocessing.shared_memory.SharedMemory block
+	"""
+
+	def __init__(self, name="anygpio"):
+		"""
+		Attaches to the shared memory block and constructs instance of MirrorReader
+		"""
+		self.name = name
+		self.memory = shared_memory.SharedMemory(name)
+
+		# Only the owning process removes the block
+		# (the resource tracker would unlink it when this process exits)
+		try:
+			resource_tracker.unregister(self.memory._name, "shared_memory")
+		except Exception:
+			pass
+
+		if bytes(self.memory.buf[:8]) != MAGIC:
+			raise errors.MirrorError("Not an anygpio state mirror: " + name)
+
+	def snapshot(self):
+		"""
+		Returns {pin id: (level, edge count, last edge time in ns)}
+
+		Retries while the owner is writing, so the snapshot is consistent
+		"""
+		buffer = self.memory.buf
+		while True:
+			before = struct.unpack_from("<Q", buffer, SEQUENCE)[0]
+			if before & 1:
+				continue
+			count = struct.unpack_from("<I", buffer, SEQUENCE + 8)[0]
+			data = bytes(buffer[HEADER.size:HEADER.size + count * SLOT.size])
+			if struct.unpack_from("<Q", buffer, SEQUENCE)[0] == before:
+				break
+
+		pins = {}
+		for raw_id, kind, level, edges, last_edge in SLOT.iter_unpack(data):
+			id = raw_id.rstrip(b"\0").decode()
+			pins[int(id) if kind == 0 else id] = (level, edges, last_edge)
+		return pins
+
+	def close(self):
+		"""
+		Detach from the shared memory block
+		"""
+		self.memory.close()
@@ -0,0 +1,146 @@
+import time, threading
+
+
+# Waits shorter than this are busy-waited instead of slept (nanoseconds)
+SPIN_NS = 200000
+
+
+def _check(samples):
+	"""
+	Returns a memoryview of samples, raises ValueError if it is empty
+
+	Looping over an empty buffer would spin without ever sleeping
+	"""
+	samples = memoryview(samples)
+	if not len(samples):
+		raise ValueError("Can't play an empty sample buffer")
+	return samples
+
+
+class Player:
+	"""
+	Streams a buffer of packed pin states to output pins at a fixed rate
+
+	Each sample is an integer bitmask, bit i is the value of pins[i].
+		samples can be bytes, a memoryview or anything with the buffer
+		protocol (e.g. a one dimensional NumPy array). Use a 16 or 32 bit
+		item size for more than 8 pins (memoryview.cast("H"), numpy.uint16)
+
+	Writes go through GPIO.output_mask() and only touch pins whose
+		value changed since the previous sample
+
+	Attributes:
+		gpio			GPIO wrapper instance
+		pins			Output pins, in bit order
+		rate			Samples per second
+		loop			Restart from the first sample at the end of the buffer
+		position		Index of the next sample to write
+		late			Number of samples written after their due time
+		_samples		memoryview of the buffer being played
+		_pending		Buffer queued by update(), swapped in at the end of the current pass
+		_playing		Is the playback thread running?
+		_lock			Guards _pending between update() and the playback thread
+	"""
+
+	def __init__(self, gpio, pins, samples, rate, loop=False):
+		"""
+		Sets default values and constructs instance of Player
+		"""
+		self.gpio = gpio
+		self.pins = pins
+		self.rate = rate
+		self.loop = loop
+		self.position = 0
+		self.late = 0
+		self._samples = _check(samples)
+		self._pending = None
+		self._playing = False
+		self._thread = None
+		self._lock = threading.Lock()
+
+	def start(self):
+		"""
+		Start playback on a dedicated thread
+		"""
+		self._playing = True
+		self._thread = threading.Thread(target=self._run, name="anygpio-player", daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		"""
+		Stop playback after the current sample
+		"""
+		self._playing = False
+		self.wait()
+
+	def wait(self, timeout=None):
+		"""
+		Block until playback finishes
+
+		Returns True if playback has finished
+		"""
+		if self._thread is not None:
+			self._thread.join(timeout)
+			return not self._thread.is_alive()
+		return True
+
+	def update(self, samples):
+		"""
+		Queue a new buffer, played from the start once the current pass ends
+
+		The current buffer is not touched again after the swap, so it can
+			be refilled and passed to update() again (double buffering)
+		Raises ValueError for an empty buffer
+		"""
+		samples = _check(samples)
+		with self._lock:
+			self._pending = samples
+
+	def _run(self):
+		"""
+		Playback thread
+		"""
+		output_mask = self.gpio.output_mask
+		pins = self.pins
+		period = int(1e9 / self.rate)
+		perf_counter_ns = time.perf_counter_ns
+
+		samples = self._samples
+		all_pins = (1 << len(pins)) - 1
+
+		# Every pin is written on the first sample
+		previous = samples[self.position] ^ all_pins
+		due = perf_counter_ns()
+
+		while self._playing:
+			for self.position in range(self.position, len(samples)):
+				if not self._playing:
+					return
+
+				wait = due - perf_counter_ns()
+				if wait > SPIN_NS:
+					time.sleep((wait - SPIN_NS) / 1e9)
+				elif wait < 0:
+					self.late += 1
+				while perf_counter_ns() < due:
+					pass
+
+				sample = samples[self.position]
+				changed = (sample ^ previous) & all_pins
+				if changed:
+					output_mask(pins, sample, changed)
+					previous = sample
+				due += period
+
+			self.position = 0
+
+			# Swap in a queued buffer at the end of a pass
+			with self._lock:
+				pending, self._pending = self._pending, None
+			if pending is not None:
+				samples = self._samples = pending
+			elif not self.loop:
+				break
+
+		self._playing = False
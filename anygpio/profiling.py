@@ -0,0 +1,175 @@
+import sys, time, threading
+
+from . import anygpio
+from .hooks import _rebuild
+
+
+# Methods wrapped on pin classes and on the GPIO class
+PIN_OPS = ("setup", "input", "output", "_add_event", "_remove_event", "start", "stop", "change_frequency", "change_duty_cycle")
+GPIO_OPS = ("setup", "cleanup")
+
+
+class CallStats:
+	"""
+	Built-in Profiler hook: calls and time per op per pin
+
+	Attributes:
+		calls			[count, total ns, max ns] by (op, pin id)
+		start			Time (time.monotonic()) the statistics started
+	"""
+
+	def __init__(self):
+		"""
+		Sets default values and constructs instance of CallStats
+		"""
+		self._lock = threading.Lock()
+		self.reset()
+
+	def __call__(self, op, pin, duration):
+		"""
+		Profiler hook: add one call
+		"""
+		key = (op, getattr(pin, "id", None))
+		with self._lock:
+			entry = self.calls.get(key)
+			if entry is None:
+				entry = self.calls[key] = [0, 0, 0]
+			entry[0] += 1
+			entry[1] += duration
+			if duration > entry[2]:
+				entry[2] = duration
+
+	def reset(self):
+		"""
+		Forget all calls so far
+		"""
+		with self._lock:
+			self.calls = {}
+			self.start = time.monotonic()
+
+	def report(self):
+		"""
+		Returns a list of dicts per (op, pin), most total time first
+
+		Each has op, pin, calls, calls_per_second, total_ns, mean_ns and max_ns
+		"""
+		elapsed = max(time.monotonic() - self.start, 1e-9)
+		with self._lock:
+			calls = list(self.calls.items())
+
+		report = [{
+			"op": op,
+			"pin": id,
+			"calls": count,
+			"calls_per_second": count / elapsed,
+			"total_ns": total,
+			"mean_ns": total / count,
+			"max_ns": maximum,
+		} for (op, id), (count, total, maximum) in calls]
+		return sorted(report, key=lambda entry: entry["total_ns"], reverse=True)
+
+
+class Profiler:
+	"""
+	Times every native call of a GPIO wrapper and its pins
+
+	start() replaces the methods in PIN_OPS and GPIO_OPS on the wrapper's
+		classes with timed versions calling hook(op, pin, duration_ns).
+		stop() puts the original methods back, so there is no overhead at
+		all while not profiling. Pin is None for GPIO methods
+
+	Attributes:
+		gpio			GPIO wrapper instance being profiled
+		hook			Called with (op, pin, duration in ns) after every call
+		_originals		(class, name, original function) of replaced methods
+	"""
+
+	def __init__(self, gpio, hook=None):
+		"""
+		Sets default values and constructs instance of Profiler
+		"""
+		self.gpio = gpio
+		self.hook = hook or CallStats()
+		self._originals = []
+
+	def start(self):
+		"""
+		Install the timed methods
+		"""
+		if self._originals:
+			return self
+
+		for cls, ops in self._classes():
+			for op in ops:
+				# Only wrap methods defined on the class itself, inherited ones are wrapped where defined
+				original = cls.__dict__.get(op)
+				if original is None or not callable(original):
+					continue
+				self._originals.append((cls, op, original))
+				setattr(cls, op, self._timed(op, original, cls is type(self.gpio)))
+		self._rehook()
+		return self
+
+	def stop(self):
+		"""
+		Restore the original methods
+		"""
+		for cls, op, original in reversed(self._originals):
+			setattr(cls, op, original)
+		self._originals = []
+		self._rehook()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *_):
+		self.stop()
+
+	def report(self):
+		"""
+		Returns the report of the built-in CallStats hook
+		"""
+		return self.hook.report()
+
+	def _rehook(self):
+		"""
+		Rebuild instance hooks (trace, mirror) on top of the current class methods
+		"""
+		for pin in list(self.gpio.pins.values()):
+			for name in {name for _, name, _ in pin.__dict__.get("_hooks", [])}:
+				_rebuild(pin, name)
+
+	def _classes(self):
+		"""
+		Returns (class, ops) of the wrapper's GPIO and pin classes
+		"""
+		wrapper = sys.modules[type(self.gpio).__module__]
+		classes = [(type(self.gpio), GPIO_OPS)]
+
+		pin_classes = [getattr(wrapper, name, None) for name in ("Pin", "InputPin", "OutputPin", "PWMPin")]
+		softpwm = sys.modules.get(anygpio.__package__ + ".softpwm")
+		if softpwm:
+			pin_classes.append(softpwm.SoftPWMPin)
+
+		for cls in pin_classes:
+			if cls is not None:
+				classes.append((cls, PIN_OPS))
+		return classes
+
+	def _timed(self, op, original, is_gpio):
+		"""
+		Returns a timed version of original
+		"""
+		hook = self.hook
+		perf_counter_ns = time.perf_counter_ns
+
+		def timed(self, *args, **kwargs):
+			start = perf_counter_ns()
+			try:
+				return original(self, *args, **kwargs)
+			finally:
+				hook(op, None if is_gpio else self, perf_counter_ns() - start)
+
+		timed.__name__ = original.__name__
+		timed.__doc__ = original.__doc__
+		return timed
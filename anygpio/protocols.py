@@ -0,0 +1,527 @@
+import time
+
+from . import errors
+
+
+# Waits shorter than this are busy-waited instead of slept (nanoseconds)
+SPIN_NS = 200000
+
+
+def _bits(value, msb_first=True, count=8):
+	"""
+	Returns the count bits of value in transfer order
+	"""
+	bits = [(value >> bit) & 1 for bit in range(count)]
+	return bits[::-1] if msb_first else bits
+
+
+def _pins(gpio, pins):
+	"""
+	Returns configured pins for a list of pins or queries for pin()
+	"""
+	return [None if pin is None else gpio._resolve_pin(pin) for pin in pins]
+
+
+def _wait_until(deadline):
+	"""
+	Sleep then busy-wait until time.perf_counter_ns() reaches deadline
+	"""
+	remaining = deadline - time.perf_counter_ns()
+	if remaining > SPIN_NS:
+		time.sleep((remaining - SPIN_NS) / 1e9)
+	while time.perf_counter_ns() < deadline:
+		pass
+
+
+class ShiftRegister:
+	"""
+	Writes to a chain of 74HC595 style shift registers
+
+	The data/clock sequence of every byte value is computed once, a
+		write is those sequences and a latch pulse pushed through
+		GPIO.sequence_writer()
+
+	Attributes:
+		gpio			GPIO wrapper instance
+		pins			[data, clock, latch] OutputPins
+		msb_first		Shift the most significant bit out first
+		_table			Steps of each byte value
+		_latch			Steps of the latch pulse
+		_write			Sequence writer of the pins
+	"""
+	DATA = 1
+	CLOCK = 2
+	LATCH = 4
+
+	def __init__(self, gpio, data, clock, latch, msb_first=True):
+		"""
+		Sets default values and constructs instance of ShiftRegister
+
+		data, clock and latch can be OutputPins or queries for pin()
+		"""
+		self.gpio = gpio
+		self.pins = _pins(gpio, [data, clock, latch])
+		self.msb_first = msb_first
+		self._table = [self._byte_steps(value) for value in range(256)]
+		self._latch = ((0, self.CLOCK | self.LATCH), (self.LATCH, self.LATCH), (0, self.LATCH))
+		self._write = gpio.sequence_writer(self.pins)
+
+	def _byte_steps(self, value):
+		"""
+		Returns the steps shifting out one byte, DATA is only written when it changes
+		"""
+		steps = []
+		previous = None
+		for bit in _bits(value, self.msb_first):
+			data = self.DATA if bit else 0
+			changed = self.CLOCK | (self.DATA if bit != previous else 0)
+			steps.append((data, changed))
+			steps.append((data | self.CLOCK, self.CLOCK))
+			previous = bit
+		return tuple(steps)
+
+	def write(self, data):
+		"""
+		Shift out bytes (the first byte ends up in the last register) and latch them
+		"""
+		table = self._table
+		write = self._write
+		for byte in data:
+			write(table[byte])
+		write(self._latch)
+
+	def write_value(self, value, registers=1):
+		"""
+		Shift out an integer over a chain of registers and latch it
+		"""
+		self.write(value.to_bytes(registers, "big"))
+
+
+class SoftSPI:
+	"""
+	SPI master on any output and input pins
+
+	The clock/MOSI steps of every byte value are computed once for the
+		SPI mode. Write only transfers push them through
+		GPIO.sequence_writer(), with MISO the pin is read at each sample edge
+
+	Attributes:
+		gpio			GPIO wrapper instance
+		pins			[sclk, mosi, cs] OutputPins (cs None if not used)
+		miso			MISO InputPin, None for write only
+		mode			SPI mode 0-3 (CPOL << 1 | CPHA)
+		msb_first		Send the most significant bit first
+		_table			(steps, [(before sample, after sample)]) of each byte value
+		_write			Sequence writer of the pins
+	"""
+	SCLK = 1
+	MOSI = 2
+	CS = 4
+
+	def __init__(self, gpio, sclk, mosi, miso=None, cs=None, mode=0, msb_first=True):
+		"""
+		Sets default values and constructs instance of SoftSPI
+
+		Pins can be pins or queries for pin(), cs is active low
+		"""
+		if mode not in (0, 1, 2, 3):
+			raise ValueError("SPI mode must be 0, 1, 2 or 3")
+
+		self.gpio = gpio
+		self.pins = _pins(gpio, [sclk, mosi, cs])
+		self.miso = _pins(gpio, [miso])[0]
+		self.mode = mode
+		self.msb_first = msb_first
+		self._idle = self.SCLK if mode & 2 else 0
+		self._table = [self._byte_steps(value) for value in range(256)]
+
+		# Leave cs out of the writes when it is not used
+		self._cs = self.CS if cs is not None else 0
+		self._write = gpio.sequence_writer(self.pins if cs is not None else self.pins[:2])
+		self._write(((self._idle | self._cs, self.SCLK | self._cs),))
+
+	def _byte_steps(self, value):
+		"""
+		Returns all steps of one byte and the steps before and after each sample edge
+		"""
+		idle = self._idle
+		active = idle ^ self.SCLK
+		bits = []
+		for bit in _bits(value, self.msb_first):
+			mosi = self.MOSI if bit else 0
+			if self.mode & 1:
+				# CPHA 1: MOSI changes on the leading edge, sampled on the trailing edge
+				before = ((active | mosi, self.SCLK | self.MOSI), (idle | mosi, self.SCLK))
+				after = ()
+			else:
+				# CPHA 0: MOSI set while idle, sampled on the leading edge
+				before = ((idle | mosi, self.MOSI), (active | mosi, self.SCLK))
+				after = ((idle | mosi, self.SCLK),)
+			bits.append((before, after))
+
+		steps = tuple(step for before, after in bits for step in before + after)
+		return steps, tuple(bits)
+
+	def write(self, data):
+		"""
+		Send bytes, ignoring MISO
+		"""
+		table = self._table
+		write = self._write
+		self._select()
+		for byte in data:
+			write(table[byte][0])
+		self._deselect()
+
+	def transfer(self, data):
+		"""
+		Send bytes and return the bytes received on MISO at the same time
+		"""
+		if self.miso is None:
+			raise errors.ProtocolError("SoftSPI has no MISO pin to read from")
+
+		table = self._table
+		write = self._write
+		read = self.miso.input
+		weights = [1 << bit for bit in (range(7, -1, -1) if self.msb_first else range(8))]
+		received = bytearray()
+
+		self._select()
+		for byte in data:
+			value = 0
+			for weight, (before, after) in zip(weights, table[byte][1]):
+				write(before)
+				if read():
+					value |= weight
+				write(after)
+			received.append(value)
+		self._deselect()
+
+		return bytes(received)
+
+	def _select(self):
+		"""
+		Pull cs low (if used)
+		"""
+		if self._cs:
+			self._write(((self._idle, self.CS),))
+
+	def _deselect(self):
+		"""
+		Return the clock to idle and release cs (if used)
+		"""
+		self._write(((self._idle | self._cs, self.SCLK | self._cs),))
+
+
+class SoftI2C:
+	"""
+	I2C master on any two pins
+
+	SDA is driven while the master sends and released (set up as a pulled
+		up input) for the device to answer. SCL is always driven, so clock
+		stretching is not supported.
+	The SDA/SCL steps of every byte value are computed once
+
+	Attributes:
+		gpio			GPIO wrapper instance
+		pins			[scl, sda] OutputPins
+		check_ack		Raise ProtocolError when a byte is not acknowledged
+		_sda_low		OutputPin twin of sda, its setup() drives the line low
+		_sda_in			InputPin twin of sda, its setup() releases the line
+		_table			Steps writing each byte value, SCL left low
+		_write			Sequence writer of the pins
+	"""
+	SCL = 1
+	SDA = 2
+
+	def __init__(self, gpio, scl, sda, check_ack=True):
+		"""
+		Sets default values and constructs instance of SoftI2C
+
+		scl and sda can be OutputPins or queries for pin()
+		"""
+		self.gpio = gpio
+		self.pins = _pins(gpio, [scl, sda])
+		self.check_ack = check_ack
+		self._sda_low = gpio._create_OutputPin_instance(self.pins[1].id, self.pins[1].name, initial_value=0)
+		self._sda_in = gpio._create_InputPin_instance(self.pins[1].id, self.pins[1].name, pull_up_down=1)
+		self._table = [self._byte_steps(value) for value in range(256)]
+		self._write = gpio.sequence_writer(self.pins)
+		self._released = False
+
+		# Idle bus: both lines high
+		self._write(((self.SCL | self.SDA, self.SCL | self.SDA),))
+
+	def _byte_steps(self, value):
+		"""
+		Returns the steps writing one byte with SCL low before each SDA change
+		"""
+		steps = []
+		for bit in _bits(value):
+			sda = self.SDA if bit else 0
+			steps.append((sda, self.SDA))
+			steps.append((sda | self.SCL, self.SCL))
+			steps.append((sda, self.SCL))
+		return tuple(steps)
+
+	def write(self, address, data):
+		"""
+		Write bytes to the device at a 7 bit address
+		"""
+		self._start()
+		try:
+			self._send(address << 1)
+			for byte in data:
+				self._send(byte)
+		finally:
+			self._stop()
+
+	def read(self, address, count):
+		"""
+		Read count bytes from the device at a 7 bit address
+		"""
+		self._start()
+		try:
+			self._send(address << 1 | 1)
+			return bytes(self._receive(index == count - 1) for index in range(count))
+		finally:
+			self._stop()
+
+	def write_read(self, address, data, count):
+		"""
+		Write bytes then read count bytes with a repeated start (e.g. register reads)
+		"""
+		self._start()
+		try:
+			self._send(address << 1)
+			for byte in data:
+				self._send(byte)
+			self._start()
+			self._send(address << 1 | 1)
+			return bytes(self._receive(index == count - 1) for index in range(count))
+		finally:
+			self._stop()
+
+	def _drive(self):
+		"""
+		Drive SDA (output), while SCL is low
+		"""
+		if self._released:
+			self._sda_low.setup()
+			self._released = False
+
+	def _release(self):
+		"""
+		Release SDA (input, pulled up), while SCL is low
+		"""
+		if not self._released:
+			self._sda_in.setup()
+			self._released = True
+
+	def _start(self):
+		"""
+		(Repeated) start: SDA falls while SCL is high
+		"""
+		self._drive()
+		self._write(((self.SDA, self.SDA), (self.SDA | self.SCL, self.SCL), (self.SCL, self.SDA), (0, self.SCL)))
+
+	def _stop(self):
+		"""
+		Stop: SDA rises while SCL is high
+		"""
+		self._drive()
+		self._write(((0, self.SDA), (self.SCL, self.SCL), (self.SCL | self.SDA, self.SDA)))
+
+	def _send(self, byte):
+		"""
+		Write one byte and clock in the acknowledge bit
+		"""
+		self._drive()
+		self._write(self._table[byte])
+
+		self._release()
+		self._write(((self.SCL, self.SCL),))
+		nack = self._sda_in.input()
+		self._write(((0, self.SCL),))
+
+		if nack and self.check_ack:
+			raise errors.ProtocolError("I2C byte " + hex(byte) + " was not acknowledged")
+
+	def _receive(self, last):
+		"""
+		Read one byte, acknowledging it unless it is the last one
+		"""
+		self._release()
+		read = self._sda_in.input
+		value = 0
+		for _ in range(8):
+			self._write(((self.SCL, self.SCL),))
+			value = value << 1 | (1 if read() else 0)
+			self._write(((0, self.SCL),))
+
+		if last:
+			# Leave SDA released (high) for the NACK
+			self._write(((self.SCL, self.SCL), (0, self.SCL)))
+		else:
+			self._drive()
+			self._write(((0, self.SDA), (self.SCL, self.SCL), (0, self.SCL)))
+		return value
+
+
+class OneWire:
+	"""
+	1-Wire master on any pin
+
+	The line is driven low by setting the pin up as an output and released
+		(pulled up) as an input. Each byte is a precomputed tuple of
+		(low, released) slot durations timed with perf_counter_ns(), so
+		slots are only as accurate as the wrapper's setup() calls are fast
+
+	Attributes:
+		gpio			GPIO wrapper instance
+		pin				OutputPin of the line
+		_pin_low		OutputPin twin of pin, its setup() drives the line low
+		_pin_in			InputPin twin of pin, its setup() releases the line
+		_table			Write slots of each byte value
+	"""
+	# Slot timings in nanoseconds (standard speed)
+	RESET_LOW = 480000
+	PRESENCE_WAIT = 70000
+	RESET_RELEASE = 410000
+	WRITE_1 = (6000, 64000)
+	WRITE_0 = (60000, 10000)
+	READ_LOW = 6000
+	READ_SAMPLE = 9000
+	READ_RELEASE = 55000
+
+	# ROM commands
+	SKIP_ROM = 0xCC
+	READ_ROM = 0x33
+	MATCH_ROM = 0x55
+
+	def __init__(self, gpio, pin):
+		"""
+		Sets default values and constructs instance of OneWire
+
+		pin can be an OutputPin or a query for pin()
+		"""
+		self.gpio = gpio
+		self.pin = _pins(gpio, [pin])[0]
+		self._pin_low = gpio._create_OutputPin_instance(self.pin.id, self.pin.name, initial_value=0)
+		self._pin_in = gpio._create_InputPin_instance(self.pin.id, self.pin.name, pull_up_down=1)
+		self._table = [tuple(self.WRITE_1 if bit else self.WRITE_0 for bit in _bits(value, False)) for value in range(256)]
+		self._pin_in.setup()
+
+	def reset(self):
+		"""
+		Reset the bus, returns whether a device answered with a presence pulse
+		"""
+		now = time.perf_counter_ns
+		low = self._pin_low.setup
+		release = self._pin_in.setup
+
+		low()
+		start = now()
+		_wait_until(start + self.RESET_LOW)
+		release()
+		start = now()
+		_wait_until(start + self.PRESENCE_WAIT)
+		present = not self._pin_in.input()
+		_wait_until(start + self.PRESENCE_WAIT + self.RESET_RELEASE)
+		return present
+
+	def write(self, data):
+		"""
+		Write bytes, least significant bit first
+		"""
+		now = time.perf_counter_ns
+		low = self._pin_low.setup
+		release = self._pin_in.setup
+		table = self._table
+
+		for byte in data:
+			for low_ns, release_ns in table[byte]:
+				low()
+				start = now()
+				while now() - start < low_ns:
+					pass
+				release()
+				start = now()
+				while now() - start < release_ns:
+					pass
+
+	def read(self, count):
+		"""
+		Read count bytes
+		"""
+		now = time.perf_counter_ns
+		low = self._pin_low.setup
+		release = self._pin_in.setup
+		read = self._pin_in.input
+		received = bytearray()
+
+		for _ in range(count):
+			value = 0
+			for bit in range(8):
+				low()
+				start = now()
+				while now() - start < self.READ_LOW:
+					pass
+				release()
+				while now() - start < self.READ_LOW + self.READ_SAMPLE:
+					pass
+				if read():
+					value |= 1 << bit
+				while now() - start < self.READ_LOW + self.READ_SAMPLE + self.READ_RELEASE:
+					pass
+			received.append(value)
+
+		return bytes(received)
+
+	def read_rom(self):
+		"""
+		Read the 8 byte ROM code of the only device on the bus
+		"""
+		if not self.reset():
+			raise errors.ProtocolError("No 1-Wire device answered the reset")
+		self.write((self.READ_ROM,))
+		rom = self.read(8)
+		if crc8(rom[:7]) != rom[7]:
+			raise errors.ProtocolError("Bad 1-Wire ROM CRC: " + rom.hex())
+		return rom
+
+	def select(self, rom=None):
+		"""
+		Reset the bus and address one device (by ROM code) or all of them (None)
+		"""
+		if not self.reset():
+			raise errors.ProtocolError("No 1-Wire device answered the reset")
+		if rom is None:
+			self.write((self.SKIP_ROM,))
+		else:
+			self.write(bytes((self.MATCH_ROM,)) + bytes(rom))
+
+
+def _crc8_table():
+	"""
+	Returns the Dallas/Maxim CRC-8 of every byte value
+	"""
+	table = []
+	for value in range(256):
+		crc = value
+		for _ in range(8):
+			crc = (crc >> 1) ^ 0x8C if crc & 1 else crc >> 1
+		table.append(crc)
+	return table
+
+CRC8_TABLE = _crc8_table()
+
+
+def crc8(data):
+	"""
+	Returns the Dallas/Maxim CRC-8 of bytes (1-Wire ROM codes and scratchpads)
+	"""
+	crc = 0
+	for byte in data:
+		crc = CRC8_TABLE[crc ^ byte]
+	return crc
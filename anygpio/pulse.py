@@ -0,0 +1,206 @@
+import time, math, threading
+from collections import deque
+
+
+# Default number of periods averaged
+WINDOW = 16
+
+# Seconds without an edge after which the signal is reported as stopped
+TIMEOUT = 1
+
+
+class PulseMeter:
+	"""
+	Measures frequency, period, pulse width and duty cycle of an input signal
+
+	Both edges are timestamped in the native callback. Each rising edge
+		completes a period (rising to rising) with its high time (rising
+		to falling), which is added to running integer sums over a sliding
+		window. Adding a period and dropping the oldest is O(1)
+
+	Averaging is over the last `window` periods, or over the periods of
+		the last `seconds` seconds if seconds is set
+
+	Attributes:
+		pin				InputPin being measured
+		window			Number of periods averaged (when seconds is None)
+		seconds			Seconds of periods averaged, None to average a number of periods
+		timeout			Seconds without an edge after which the signal is stopped
+		edges			Number of edges seen
+		glitches		Edges whose level didn't change (an edge was missed)
+		_periods		(rising edge time, period, high time) in the window, ns
+		_sums			[period, high time, period squared] sums of the window
+	"""
+
+	def __init__(self, pin, window=WINDOW, seconds=None, timeout=TIMEOUT):
+		"""
+		Sets default values, registers the edge callback and constructs instance of PulseMeter
+		"""
+		self.pin = pin
+		self.window = window
+		self.seconds = seconds
+		self.timeout = timeout
+		self.edges = 0
+		self.glitches = 0
+		self._periods = deque()
+		self._sums = [0, 0, 0]
+		self._lock = threading.Lock()
+		self._level = 1 if pin.input() else 0
+		self._rising = None
+		self._falling = None
+		self._last_edge = None
+
+		pin.event(action=self._edge, both=True, bounce=0)
+
+	def _edge(self, *_):
+		"""
+		Native callback: timestamp the edge and update the window
+		"""
+		now = time.monotonic_ns()
+		level = 1 if self.pin.input() else 0
+
+		with self._lock:
+			self.edges += 1
+			self._last_edge = now
+
+			if level == self._level:
+				self.glitches += 1
+				return
+			self._level = level
+
+			if not level:
+				self._falling = now
+				return
+
+			rising = self._rising
+			self._rising = now
+			if rising is None:
+				return
+
+			period = now - rising
+			falling = self._falling
+			high = falling - rising if falling is not None and falling > rising else 0
+
+			periods = self._periods
+			sums = self._sums
+			periods.append((now, period, high))
+			sums[0] += period
+			sums[1] += high
+			sums[2] += period * period
+
+			# Drop periods outside the window
+			if self.seconds is None:
+				while len(periods) > self.window:
+					self._drop()
+			else:
+				start = now - int(self.seconds * 1e9)
+				while periods[0][0] < start:
+					self._drop()
+
+	def _drop(self):
+		"""
+		Remove the oldest period from the window
+		"""
+		_, period, high = self._periods.popleft()
+		sums = self._sums
+		sums[0] -= period
+		sums[1] -= high
+		sums[2] -= period * period
+
+	def _stopped(self):
+		"""
+		Returns whether there was no edge within timeout seconds
+		"""
+		return self._last_edge is None or time.monotonic_ns() - self._last_edge > self.timeout * 1e9
+
+	@property
+	def frequency(self):
+		"""
+		Mean frequency over the window in Hz, 0 once the signal stopped
+		"""
+		with self._lock:
+			count = len(self._periods)
+			total = self._sums[0]
+		if not count or not total or self._stopped():
+			return 0.0
+		return count * 1e9 / total
+
+	@property
+	def period(self):
+		"""
+		Mean period over the window in seconds, None once the signal stopped
+		"""
+		with self._lock:
+			count = len(self._periods)
+			total = self._sums[0]
+		if not count or self._stopped():
+			return None
+		return total / count / 1e9
+
+	@property
+	def pulse_width(self):
+		"""
+		Mean high time over the window in seconds, None once the signal stopped
+		"""
+		with self._lock:
+			count = len(self._periods)
+			high = self._sums[1]
+		if not count or self._stopped():
+			return None
+		return high / count / 1e9
+
+	@property
+	def duty_cycle(self):
+		"""
+		Mean duty cycle over the window (0-100)
+
+		Once the signal stopped, 100 if it stopped high else 0
+		"""
+		with self._lock:
+			period, high = self._sums[0], self._sums[1]
+		if self._stopped() or not period:
+			return 100.0 if self._level else 0.0
+		return high * 100 / period
+
+	def stats(self):
+		"""
+		Returns frequency, period, pulse_width, duty_cycle, jitter (period
+			standard deviation in seconds), periods in the window, edges and glitches
+		"""
+		with self._lock:
+			count = len(self._periods)
+			total, _, squares = self._sums
+
+		jitter = 0.0
+		if count > 1:
+			variance = (squares - total * total / count) / (count - 1)
+			jitter = math.sqrt(max(variance, 0)) / 1e9
+
+		return {
+			"frequency": self.frequency,
+			"period": self.period,
+			"pulse_width": self.pulse_width,
+			"duty_cycle": self.duty_cycle,
+			"jitter": jitter,
+			"periods": count,
+			"edges": self.edges,
+			"glitches": self.glitches,
+		}
+
+	def reset(self):
+		"""
+		Forget all periods measured so far
+		"""
+		with self._lock:
+			self._periods.clear()
+			self._sums = [0, 0, 0]
+			self._rising = None
+			self._falling = None
+			self.edges = 0
+			self.glitches = 0
+
+	def close(self):
+		"""
+		Remove the edge callback
+		"""
+		self.pin.remove_event()
@@ -0,0 +1,391 @@
+import abc, time, threading
+from collections import deque
+
+from . import errors
+from .events import EventQueue
+from .scheduler import default_scheduler
+
+
+# Waits shorter than this are busy-waited instead of slept (nanoseconds)
+SPIN_NS = 200000
+
+# Meters per second at 20°C
+SPEED_OF_SOUND = 343.0
+
+
+def _wait_until(deadline):
+	"""
+	Sleep then busy-wait until time.perf_counter_ns() reaches deadline
+	"""
+	remaining = deadline - time.perf_counter_ns()
+	if remaining > SPIN_NS:
+		time.sleep((remaining - SPIN_NS) / 1e9)
+	while time.perf_counter_ns() < deadline:
+		pass
+
+
+def _near(duration, expected, tolerance=0.3):
+	"""
+	Returns whether a duration is within tolerance (fraction) of expected
+	"""
+	return abs(duration - expected) <= expected * tolerance
+
+
+class Decoder(abc.ABC):
+	"""
+	Base class of pulse train decoders
+
+	decode() gets the pulses of one frame as (level, microseconds) tuples
+		and returns the decoded frame as a dict, or raises ProtocolError
+
+	Attributes:
+		idle			Level of the line between frames
+		gap				Seconds without an edge that end a frame
+		trigger			(level, seconds) of the pulse requesting a frame, None if the device sends by itself
+		timeout			Seconds read() waits for a response
+	"""
+	idle = 1
+	gap = 0.01
+	trigger = None
+	timeout = 0.1
+
+	@abc.abstractmethod
+	def decode(self, pulses):
+		"""
+		Returns the frame decoded from a list of (level, microseconds) pulses
+		"""
+
+
+class NEC(Decoder):
+	"""
+	NEC infrared remote protocol, as output by 38kHz IR receivers (active low)
+
+	A frame is a 9ms mark, a 4.5ms space and 32 bits (address, inverted
+		address, command, inverted command, LSB first) of a 562µs mark and
+		a 562µs (0) or 1687µs (1) space. Holding a button sends repeat
+		codes: a 9ms mark and a 2.25ms space.
+	Frames are {"address", "command", "repeat"}, 16 bit addresses are
+		returned as is (extended NEC)
+
+	Attributes:
+		_last			Last frame, returned again for repeat codes
+	"""
+	gap = 0.02
+
+	def __init__(self):
+		"""
+		Sets default values and constructs instance of NEC
+		"""
+		self._last = None
+
+	def decode(self, pulses):
+		"""
+		Returns {"address", "command", "repeat"}
+		"""
+		# Skip anything before the leader mark
+		for start, (level, duration) in enumerate(pulses):
+			if level == 0 and _near(duration, 9000, 0.2):
+				break
+		else:
+			raise errors.ProtocolError("NEC: no leader")
+
+		pulses = pulses[start + 1:]
+		if not pulses:
+			raise errors.ProtocolError("NEC: truncated frame")
+
+		if _near(pulses[0][1], 2250):
+			if self._last is None:
+				raise errors.ProtocolError("NEC: repeat code without a frame")
+			return dict(self._last, repeat=True)
+
+		if not _near(pulses[0][1], 4500, 0.2) or len(pulses) < 65:
+			raise errors.ProtocolError("NEC: truncated frame")
+
+		value = 0
+		for bit in range(32):
+			mark, space = pulses[1 + bit * 2][1], pulses[2 + bit * 2][1]
+			if not _near(mark, 562, 0.5):
+				raise errors.ProtocolError("NEC: bad mark of bit " + str(bit))
+			if _near(space, 1687):
+				value |= 1 << bit
+			elif not _near(space, 562, 0.5):
+				raise errors.ProtocolError("NEC: bad space of bit " + str(bit))
+
+		address, address_inverted, command, command_inverted = [value >> shift & 0xff for shift in (0, 8, 16, 24)]
+		if command ^ command_inverted != 0xff:
+			raise errors.ProtocolError("NEC: command check failed")
+		if address ^ address_inverted != 0xff:
+			address = value & 0xffff
+
+		self._last = {"address": address, "command": command, "repeat": False}
+		return self._last
+
+
+class DHT(Decoder):
+	"""
+	DHT11 and DHT22 (AM2302) humidity and temperature sensors
+
+	The host pulls the data line low (18ms DHT11, 1ms DHT22) and releases
+		it, the sensor answers 80µs low, 80µs high, then 40 bits of a 50µs
+		low and a 26µs (0) or 70µs (1) high: humidity, temperature and a
+		checksum byte.
+	Frames are {"humidity" (%), "temperature" (°C)}
+
+	The bits are told apart by microseconds, so this needs a backend
+		whose edge callbacks run with little latency
+
+	Attributes:
+		model			11 or 22
+	"""
+	gap = 0.002
+	timeout = 0.05
+
+	def __init__(self, model=22):
+		"""
+		Sets default values and constructs instance of DHT
+		"""
+		self.model = model
+		self.trigger = (0, 0.018 if model == 11 else 0.001)
+
+	def decode(self, pulses):
+		"""
+		Returns {"humidity", "temperature"}
+		"""
+		# The data bits are the last 40 high pulses (the line is left high after them)
+		highs = [duration for level, duration in pulses if level == 1 and duration < 200]
+		if len(highs) < 40:
+			raise errors.ProtocolError("DHT: got " + str(len(highs)) + " of 40 bits")
+
+		value = 0
+		for duration in highs[-40:]:
+			value = value << 1 | (duration > 48)
+		data = value.to_bytes(5, "big")
+
+		if sum(data[:4]) & 0xff != data[4]:
+			raise errors.ProtocolError("DHT: checksum failed")
+
+		if self.model == 11:
+			return {"humidity": data[0] + data[1] / 10, "temperature": data[2] + (data[3] & 0x7f) / 10}
+
+		temperature = ((data[2] & 0x7f) << 8 | data[3]) / 10
+		return {"humidity": (data[0] << 8 | data[1]) / 10, "temperature": -temperature if data[2] & 0x80 else temperature}
+
+
+class HCSR04(Decoder):
+	"""
+	HC-SR04 ultrasonic ranging module
+
+	A 10µs high pulse on the trigger pin starts a measurement, the echo
+		pin is then high for the time the sound took to return (38ms when
+		nothing is in range).
+	Frames are {"distance" (m), "echo" (s)}, distance is None out of range
+
+	Attributes:
+		speed_of_sound	Meters per second
+	"""
+	idle = 0
+	gap = 0.04
+	trigger = (1, 0.00001)
+	timeout = 0.1
+
+	def __init__(self, speed_of_sound=SPEED_OF_SOUND):
+		"""
+		Sets default values and constructs instance of HCSR04
+		"""
+		self.speed_of_sound = speed_of_sound
+
+	def decode(self, pulses):
+		"""
+		Returns {"distance", "echo"}
+		"""
+		for level, duration in pulses:
+			if level == 1:
+				echo = duration / 1e6
+				distance = echo * self.speed_of_sound / 2 if duration < 30000 else None
+				return {"distance": distance, "echo": echo}
+		raise errors.ProtocolError("HC-SR04: no echo")
+
+
+class PulseTrain:
+	"""
+	Captures the edges of an input pin and decodes them into frames
+
+	The native callback only appends a timestamp to a deque, the level of
+		each pulse follows from the decoder's idle level since levels
+		alternate. Edges are decoded in batches, a frame ending after
+		decoder.gap seconds without an edge.
+
+	Devices sending by themselves (decoder.trigger is None, e.g. IR
+		remotes) are decoded on the shared scheduler and frames are
+		delivered to the on_frame() callbacks through an EventQueue.
+	Request/response devices are read with read(), which sends the
+		trigger pulse on the trigger pin, or on the data pin itself
+		(driving it, then releasing it as an input) when there is none
+
+	Attributes:
+		pin				InputPin captured
+		decoder			Decoder of the frames
+		trigger			OutputPin the trigger pulse is sent on, None to use pin
+		frames			Number of frames decoded
+		errors			Number of frames that failed to decode
+		queue			EventQueue delivering frames to the callbacks
+		_edges			time.monotonic_ns() of each edge waiting to be decoded
+		_callbacks		Functions called with each frame
+		_timer			Scheduler timer ending the current frame
+		_frame_lock		Guards _timer and taking a frame's edges
+		_lock			Serializes read()
+		_drive			OutputPin twin of pin, its setup() drives the trigger level
+		_release		InputPin twin of pin, its setup() releases the line
+	"""
+
+	def __init__(self, gpio, pin, decoder, trigger=None):
+		"""
+		Sets default values, registers the edge callback and constructs instance of PulseTrain
+
+		pin and trigger can be pins or queries for pin()
+		"""
+		self.pin = gpio._resolve_pin(pin)
+		self.decoder = decoder
+		self.trigger = None if trigger is None else gpio._resolve_pin(trigger)
+		self.frames = 0
+		self.errors = 0
+		self.queue = EventQueue(self._emit)
+		self._edges = deque()
+		self._callbacks = []
+		self._timer = None
+		self._frame_lock = threading.Lock()
+		self._lock = threading.Lock()
+		self._drive = self._release = None
+
+		if decoder.trigger is not None and self.trigger is None:
+			self._drive = gpio._create_OutputPin_instance(self.pin.id, self.pin.name, initial_value=decoder.trigger[0])
+			self._release = gpio._create_InputPin_instance(self.pin.id, self.pin.name, pull_up_down=1 if decoder.idle else 0)
+
+		# Registered with the wrapper directly, event() would add its own wrappers
+		self.pin._add_event(self.pin._native_both(), self._edge_callback(), 0)
+
+	def _edge_callback(self):
+		"""
+		Returns the native callback: timestamp the edge and start the frame timer
+		"""
+		append = self._edges.append
+		now = time.monotonic_ns
+
+		# read() takes the edges itself
+		if self.decoder.trigger is not None:
+			return lambda *_: append(now())
+
+		lock = self._frame_lock
+
+		def edge(*_):
+			with lock:
+				append(now())
+				if self._timer is None:
+					self._timer = default_scheduler.call_later(self.decoder.gap, self._flush)
+		return edge
+
+	def on_frame(self, callback):
+		"""
+		Call callback(frame) with each frame decoded
+		"""
+		self._callbacks.append(callback)
+
+	def read(self, timeout=None):
+		"""
+		Send the trigger pulse and return the decoded response
+
+		Raises ProtocolError if there is no response within timeout seconds
+			(default decoder.timeout) or it can't be decoded
+		"""
+		gap = int(self.decoder.gap * 1e9)
+		with self._lock:
+			self._edges.clear()
+			self._send_trigger()
+			deadline = time.monotonic_ns() + int((timeout or self.decoder.timeout) * 1e9)
+
+			while True:
+				time.sleep(self.decoder.gap)
+				now = time.monotonic_ns()
+				if self._edges and now - self._edges[-1] >= gap:
+					break
+				if now > deadline:
+					raise errors.ProtocolError("No response on pin " + str(self.pin.id))
+
+			try:
+				frame = self.decoder.decode(self._pulses())
+			except errors.ProtocolError:
+				self.errors += 1
+				raise
+			self.frames += 1
+			return frame
+
+	def close(self):
+		"""
+		Remove the edge callback
+		"""
+		with self._frame_lock:
+			if self._timer:
+				self._timer.cancel()
+				self._timer = None
+		self.pin.remove_event()
+
+	def _send_trigger(self):
+		"""
+		Send decoder.trigger: (level, seconds) on the trigger pin or the data pin
+		"""
+		level, seconds = self.decoder.trigger
+		end = time.perf_counter_ns() + int(seconds * 1e9)
+
+		if self.trigger is not None:
+			self.trigger.output(level)
+			_wait_until(end)
+			self.trigger.output(1 - level)
+		else:
+			self._drive.setup()
+			_wait_until(end)
+			self._release.setup()
+
+	def _pulses(self):
+		"""
+		Take the waiting edges, returns them as (level, microseconds) pulses
+		"""
+		edges = self._edges
+		times = [edges.popleft() for _ in range(len(edges))]
+		level = 1 - self.decoder.idle
+		pulses = []
+		for index in range(len(times) - 1):
+			pulses.append((level, (times[index + 1] - times[index]) // 1000))
+			level = 1 - level
+		return pulses
+
+	def _flush(self):
+		"""
+		Scheduler side: decode the frame once decoder.gap passed without an edge
+		"""
+		gap = int(self.decoder.gap * 1e9)
+		edges = self._edges
+
+		# Edges after the frame's edges are taken start a new timer
+		with self._frame_lock:
+			if edges and time.monotonic_ns() - edges[-1] < gap:
+				self._timer = default_scheduler.call_at(edges[-1] + gap, self._flush)
+				return
+			self._timer = None
+			pulses = self._pulses()
+
+		if not pulses:
+			return
+		try:
+			frame = self.decoder.decode(pulses)
+		except errors.ProtocolError:
+			self.errors += 1
+			return
+		self.frames += 1
+		self.queue.put(frame)
+
+	def _emit(self, frame):
+		"""
+		Dispatcher side of the queue: run the callbacks
+		"""
+		for callback in self._callbacks:
+			callback(frame)
@@ -0,0 +1,217 @@
+import math, time, threading
+from concurrent.futures import Future
+
+from .scheduler import default_scheduler
+
+
+# Number of entries in each easing table
+TABLE_SIZE = 256
+
+# Default time between ramp updates in seconds
+TICK = 0.01
+
+
+def _table(curve):
+	"""
+	Precompute an easing curve (0..1 -> 0..1) as a TABLE_SIZE + 1 entry list
+	"""
+	return [curve(i / TABLE_SIZE) for i in range(TABLE_SIZE + 1)]
+
+
+# Precomputed easing tables by name
+CURVES = {
+	"linear": _table(lambda x: x),
+	"ease_in": _table(lambda x: x * x),
+	"ease_out": _table(lambda x: 1 - (1 - x) * (1 - x)),
+	"ease_in_out": _table(lambda x: x * x * (3 - 2 * x)),
+	"sine": _table(lambda x: (1 - math.cos(math.pi * x)) / 2),
+	# Perceived LED brightness is roughly logarithmic
+	"exponential": _table(lambda x: (2 ** (8 * x) - 1) / 255),
+}
+
+
+class _Ramp:
+	"""
+	A single running ramp of a PWM pin's duty cycle
+
+	Attributes:
+		pin				PWMPin being ramped
+		start_value		Duty cycle when the ramp started
+		target			Duty cycle at the end of the ramp
+		start			Time (ns) the ramp started
+		duration		Length of the ramp (ns)
+		table			Easing table
+		future			Future resolved with the pin when the ramp finishes
+	"""
+
+	def __init__(self, pin, target, start, duration, table):
+		self.pin = pin
+		self.start_value = pin.duty_cycle or 0
+		self.target = target
+		self.start = start
+		self.duration = duration
+		self.table = table
+		self.future = Future()
+
+	def value(self, now):
+		"""
+		Duty cycle of the ramp at time now (ns)
+		"""
+		if now >= self.start + self.duration:
+			return self.target
+		position = (now - self.start) * TABLE_SIZE / self.duration
+		index = int(position)
+
+		# Interpolate between neighbouring table entries
+		eased = self.table[index] + (self.table[index + 1] - self.table[index]) * (position - index)
+		return self.start_value + (self.target - self.start_value) * eased
+
+
+class RampEngine:
+	"""
+	Services any number of PWM duty cycle ramps from one scheduler timer
+
+	Every tick computes all running ramps and only calls
+		change_duty_cycle() on pins whose rounded value changed
+
+	Attributes:
+		scheduler		Scheduler running the ticks
+		tick			Time between updates in seconds
+		resolution		Duty cycle step below which updates are skipped
+		_ramps			Running ramps by pin id
+		_timer			Timer of the next tick, None when idle
+	"""
+
+	def __init__(self, scheduler=default_scheduler, tick=TICK, resolution=0.1):
+		"""
+		Sets default values and constructs instance of RampEngine
+		"""
+		self.scheduler = scheduler
+		self.tick = tick
+		self.resolution = resolution
+		self._ramps = {}
+		self._timer = None
+		self._lock = threading.Lock()
+
+	def ramp(self, pin, target, duration, curve="linear"):
+		"""
+		Ramp the duty cycle of pin to target over duration seconds
+
+		Returns a concurrent.futures.Future resolved when the ramp finishes
+			or cancelled if another ramp replaces it
+		Use asyncio.wrap_future() to await it
+		"""
+		return self.ramp_group([pin], target, duration, curve)
+
+	def ramp_group(self, pins, target, duration, curve="linear"):
+		"""
+		Ramp several PWM pins together, starting on the same tick
+
+		target is one duty cycle for all pins or a list with one per pin,
+			raises ValueError if the list has a different length
+		Returns a Future resolved when every ramp has finished
+		"""
+		table = self._get_table(curve)
+		targets = target if isinstance(target, (list, tuple)) else [target] * len(pins)
+		if len(targets) != len(pins):
+			raise ValueError("Got %d targets for %d pins" % (len(targets), len(pins)))
+		start = time.monotonic_ns()
+		duration = max(int(duration * 1e9), 1)
+
+		ramps = [_Ramp(pin, value, start, duration, table) for pin, value in zip(pins, targets)]
+
+		with self._lock:
+			for ramp in ramps:
+				# A new ramp replaces a running ramp on the same pin
+				previous = self._ramps.get(ramp.pin.id)
+				if previous:
+					previous.future.cancel()
+				self._ramps[ramp.pin.id] = ramp
+
+			if self._timer is None:
+				self._timer = self.scheduler.call_later(0, self._tick)
+
+		if len(ramps) == 1:
+			return ramps[0].future
+		return _gather([ramp.future for ramp in ramps])
+
+	def cancel(self, pin):
+		"""
+		Stop ramping pin, leaving its duty cycle where it is
+		"""
+		with self._lock:
+			ramp = self._ramps.pop(pin.id, None)
+		if ramp:
+			ramp.future.cancel()
+
+	def _get_table(self, curve):
+		"""
+		Return the easing table for a curve name or function
+		"""
+		if callable(curve):
+			return _table(curve)
+		return CURVES[curve]
+
+	def _tick(self):
+		"""
+		Update every running ramp once
+		"""
+		now = time.monotonic_ns()
+		finished = []
+
+		with self._lock:
+			ramps = list(self._ramps.values())
+
+		for ramp in ramps:
+			if ramp.future.cancelled():
+				continue
+			value = ramp.value(now)
+			if value == ramp.target or abs(value - (ramp.pin.duty_cycle or 0)) >= self.resolution:
+				ramp.pin.change_duty_cycle(round(value, 3))
+			if value == ramp.target:
+				finished.append(ramp)
+
+		with self._lock:
+			for ramp in finished:
+				if self._ramps.get(ramp.pin.id) is ramp:
+					del self._ramps[ramp.pin.id]
+
+			# Keep ticking while there are ramps
+			if self._ramps:
+				self._timer = self.scheduler.call_later(self.tick, self._tick)
+			else:
+				self._timer = None
+
+		for ramp in finished:
+			# Cancelled futures can not be resolved
+			if ramp.future.set_running_or_notify_cancel():
+				ramp.future.set_result(ramp.pin)
+
+
+def _gather(futures):
+	"""
+	Return a Future resolved with the list of results once all futures are done
+
+	Cancelled if any of the futures is cancelled
+	"""
+	combined = Future()
+	remaining = [len(futures)]
+	lock = threading.Lock()
+
+	def done(_):
+		with lock:
+			remaining[0] -= 1
+			if remaining[0]:
+				return
+		if any(future.cancelled() for future in futures):
+			combined.cancel()
+		elif combined.set_running_or_notify_cancel():
+			combined.set_result([future.result() for future in futures])
+
+	for future in futures:
+		future.add_done_callback(done)
+	return combined
+
+
+# Engine shared by PWMPin.ramp() and GPIO.ramp()
+default_engine = RampEngine()
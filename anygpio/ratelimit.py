@@ -0,0 +1,131 @@
+import time, threading
+from collections import namedtuple
+
+from .scheduler import default_scheduler
+
+
+# Calls merged by a RateLimit, timestamps are time.monotonic_ns()
+Burst = namedtuple("Burst", ["count", "first", "last"])
+
+
+class RateLimit:
+	"""
+	Limits a pin's action to max_calls per window seconds
+
+	Calls over the limit are merged into a burst. With trailing, the burst
+		is delivered once when the window ends: on_burst(Burst) if set,
+		otherwise the action with the arguments of the last merged call.
+		Without trailing, merged calls are only counted and burst is set
+			by the first call of a later window
+	Costs O(1) per call (a fixed window counter)
+
+	Attributes:
+		max_calls		Calls allowed per window
+		window			Window length in seconds
+		trailing		Deliver merged calls at the end of the window
+		on_burst		Called with a Burst instead of the action for trailing delivery
+		burst			Last Burst delivered (None before the first)
+		passed			Number of calls let through
+		merged			Number of calls merged into bursts
+		_timer			Scheduler timer of the trailing delivery
+	"""
+
+	def __init__(self, max_calls, window, trailing=True, on_burst=None, scheduler=default_scheduler):
+		"""
+		Sets default values and constructs instance of RateLimit
+		"""
+		self.max_calls = max_calls
+		self.window = window
+		self.trailing = trailing
+		self.on_burst = on_burst
+		self.scheduler = scheduler
+		self.burst = None
+		self.passed = 0
+		self.merged = 0
+		self._window_ns = int(window * 1e9)
+		self._window_start = 0
+		self._calls = 0
+		self._count = 0
+		self._first = None
+		self._last = None
+		self._pending = None
+		self._timer = None
+		self._lock = threading.Lock()
+
+	def call(self, action, *args):
+		"""
+		Call action(*args) if under the limit, otherwise merge it into the burst
+		"""
+		now = time.monotonic_ns()
+
+		with self._lock:
+			if now - self._window_start >= self._window_ns:
+				# New window
+				self._window_start = now
+				self._calls = 0
+
+				if self._count and not self.trailing:
+					# Close the burst of the previous window, nothing delivers it
+					self.burst = Burst(self._count, self._first, self._last)
+					self._count = 0
+					self._first = None
+					self._last = None
+					self._pending = None
+
+			if self._calls < self.max_calls:
+				self._calls += 1
+				self.passed += 1
+				allowed = True
+			else:
+				allowed = False
+				self.merged += 1
+				self._count += 1
+				self._first = self._first or now
+				self._last = now
+				self._pending = (action, args)
+
+				if self.trailing and self._timer is None:
+					self._timer = self.scheduler.call_at(self._window_start + self._window_ns, self._flush)
+
+		if allowed:
+			return action(*args)
+
+	def wrap(self, action):
+		"""
+		Return a callback that calls action through the limit
+		"""
+		def limited(*args):
+			return self.call(action, *args)
+		return limited
+
+	def stats(self):
+		"""
+		Return the passed and merged call counters as a dict
+		"""
+		return {"passed": self.passed, "merged": self.merged, "burst": self.burst}
+
+	def _flush(self):
+		"""
+		Deliver the merged calls of the window that just ended
+		"""
+		with self._lock:
+			self._timer = None
+			if not self._count:
+				return
+
+			burst = Burst(self._count, self._first, self._last)
+			action, args = self._pending
+			self._count = 0
+			self._first = None
+			self._last = None
+			self._pending = None
+			self.burst = burst
+
+			# The delivery counts against the next window
+			self._window_start = time.monotonic_ns()
+			self._calls = 1
+
+		if self.on_burst:
+			self.on_burst(burst)
+		else:
+			action(*args)
@@ -0,0 +1,122 @@
+import threading
+from collections.abc import MutableMapping
+
+
+class PinRegistry(MutableMapping):
+	"""
+	Thread-safe dict of pins by id, used for GPIO.pins
+
+	Writes copy the dict under a lock and swap it in (copy-on-write).
+		Reads and iteration use the current dict without locking, so
+		iterating never fails when another thread adds or removes pins,
+		it just sees the pins as they were when iteration started
+
+	Attributes:
+		_pins			Current dict of pins, never mutated once published
+		_lock			Serializes writers
+	"""
+
+	def __init__(self, pins=None):
+		"""
+		Sets default values and constructs instance of PinRegistry
+		"""
+		self._pins = dict(pins or {})
+		self._lock = threading.Lock()
+
+	def snapshot(self):
+		"""
+		Returns the current dict of pins
+
+		The dict is never changed, treat it as read only
+		"""
+		return self._pins
+
+	def __getitem__(self, id):
+		return self._pins[id]
+
+	def __setitem__(self, id, pin):
+		with self._lock:
+			pins = dict(self._pins)
+			pins[id] = pin
+			self._pins = pins
+
+	def __delitem__(self, id):
+		with self._lock:
+			pins = dict(self._pins)
+			del pins[id]
+			self._pins = pins
+
+	def __iter__(self):
+		return iter(self._pins)
+
+	def __len__(self):
+		return len(self._pins)
+
+	def __contains__(self, id):
+		return id in self._pins
+
+	def __repr__(self):
+		return repr(self._pins)
+
+	def get(self, id, default=None):
+		return self._pins.get(id, default)
+
+	def keys(self):
+		return self._pins.keys()
+
+	def values(self):
+		return self._pins.values()
+
+	def items(self):
+		return self._pins.items()
+
+	def replace(self, pin):
+		"""
+		Atomically register pin under pin.id
+
+		Returns the pin it replaced, None if there was none
+		"""
+		with self._lock:
+			pins = dict(self._pins)
+			previous = pins.get(pin.id)
+			pins[pin.id] = pin
+			self._pins = pins
+		return previous
+
+	def replace_all(self, pins):
+		"""
+		Atomically register several pins under their ids with one copy
+
+		Returns the pins they replaced
+		"""
+		with self._lock:
+			current = dict(self._pins)
+			previous = [current[pin.id] for pin in pins if pin.id in current]
+			current.update((pin.id, pin) for pin in pins)
+			self._pins = current
+		return previous
+
+	def clear(self):
+		"""
+		Atomically swap in an empty dict
+
+		Returns the dict of pins that were registered
+		"""
+		with self._lock:
+			pins = self._pins
+			self._pins = {}
+		return pins
+
+	def discard(self, pin):
+		"""
+		Atomically remove pin, only if it is the pin registered under pin.id
+
+		Returns True if the pin was removed
+		"""
+		with self._lock:
+			if self._pins.get(pin.id) is not pin:
+				return False
+			pins = dict(self._pins)
+			del pins[pin.id]
+			self._pins = pins
+		return True
@@ -0,0 +1,112 @@
+import time, heapq, threading, itertools, traceback
+
+
+class Timer:
+	"""
+	Handle for a call scheduled with Scheduler
+
+	Attributes:
+		due				Time (time.monotonic_ns()) the call is due
+		function		Function to call
+		args			Arguments for function
+		cancelled		Has cancel() been called?
+	"""
+
+	def __init__(self, due, function, args):
+		self.due = due
+		self.function = function
+		self.args = args
+		self.cancelled = False
+
+	def cancel(self):
+		"""
+		Prevent the call from running if it has not run yet
+		"""
+		self.cancelled = True
+
+
+class Scheduler:
+	"""
+	Runs timed calls from a single thread
+
+	Used instead of a thread (or threading.Timer) per pin for debounce,
+		gesture and ramp timers. Calls should be short since they
+		delay every call after them
+
+	Attributes:
+		_heap			(due, sequence, Timer) calls waiting to run
+		_condition		Wakes the thread when an earlier call is added
+		_thread			Scheduler thread, started with the first call
+	"""
+
+	def __init__(self, name="anygpio-scheduler"):
+		"""
+		Sets default values and constructs instance of Scheduler
+		"""
+		self.name = name
+		self._heap = []
+		self._sequence = itertools.count()
+		self._condition = threading.Condition()
+		self._thread = None
+
+	def call_at(self, due, function, *args):
+		"""
+		Call function(*args) at due (time.monotonic_ns())
+
+		Returns a Timer that can be cancelled
+		"""
+		timer = Timer(due, function, args)
+
+		with self._condition:
+			heapq.heappush(self._heap, (due, next(self._sequence), timer))
+
+			if self._thread is None:
+				self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+				self._thread.start()
+
+			# Only wake the thread if this is now the first call due
+			if self._heap[0][2] is timer:
+				self._condition.notify()
+
+		return timer
+
+	def call_later(self, delay, function, *args):
+		"""
+		Call function(*args) after delay seconds
+
+		Returns a Timer that can be cancelled
+		"""
+		return self.call_at(time.monotonic_ns() + int(delay * 1e9), function, *args)
+
+	def _run(self):
+		"""
+		Scheduler thread: run each call when it is due
+		"""
+		while True:
+			with self._condition:
+				while True:
+					if not self._heap:
+						self._condition.wait()
+						continue
+
+					due, _, timer = self._heap[0]
+					wait = due - time.monotonic_ns()
+					if wait > 0:
+						self._condition.wait(wait / 1e9)
+						continue
+
+					heapq.heappop(self._heap)
+					break
+
+			if timer.cancelled:
+				continue
+
+			# Run outside the lock so calls can schedule more calls
+			try:
+				timer.function(*timer.args)
+			except Exception:
+				traceback.print_exc()
+
+
+# Scheduler shared by anygpio features that need timers
+default_scheduler = Scheduler()
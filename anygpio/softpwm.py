@@ -0,0 +1,295 @@
+import time, heapq, threading, itertools, traceback
+
+from . import anygpio
+from .stats import RunningStats
+
+
+# Waits shorter than this are busy-waited instead of slept (nanoseconds)
+SPIN_NS = 200000
+
+
+class _Channel:
+	"""
+	Software PWM state of a single pin inside the engine
+
+	Attributes:
+		pin				SoftPWMPin driven by this channel
+		level			Last level written to the pin
+		boundary		Time (ns) of the next period boundary
+		falling			Time (ns) of the falling edge in the current period
+							None if the pin stays at one level this period
+		active			Is the channel still registered with the engine?
+	"""
+
+	def __init__(self, pin):
+		self.pin = pin
+		self.level = None
+		self.boundary = 0
+		self.falling = None
+		self.active = True
+
+
+class SoftPWMEngine:
+	"""
+	Drives any number of software PWM pins from a single timing thread
+
+	Each period is scheduled as at most two edges (rising at the period
+		boundary, falling after the on time). 0% and 100% duty cycles
+		need no writes at all once the level is set.
+	Frequency and duty cycle changes are picked up at period boundaries
+
+	Attributes:
+		jitter			RunningStats of edge lateness in nanoseconds
+		_channels		Channels by pin id
+		_heap			(due, sequence, channel) edges waiting to be written
+		_condition		Wakes the thread when channels are added or removed
+		_thread			Timing thread, started with the first channel
+	"""
+
+	def __init__(self):
+		"""
+		Sets default values and constructs instance of SoftPWMEngine
+		"""
+		self.jitter = RunningStats()
+		self._channels = {}
+		self._heap = []
+		self._sequence = itertools.count()
+		self._condition = threading.Condition()
+		self._thread = None
+
+	def add(self, pin):
+		"""
+		Start driving a pin, the first period starts immediately
+		"""
+		with self._condition:
+			self._remove(pin)
+			channel = _Channel(pin)
+			channel.boundary = time.perf_counter_ns()
+			self._channels[pin.id] = channel
+			self._push(channel.boundary, channel)
+
+			if self._thread is None:
+				self._thread = threading.Thread(target=self._run, name="anygpio-softpwm", daemon=True)
+				self._thread.start()
+
+			self._condition.notify()
+
+	def remove(self, pin):
+		"""
+		Stop driving a pin
+
+		No further writes happen to the pin once this returns
+		"""
+		with self._condition:
+			self._remove(pin)
+			self._condition.notify()
+
+	def stats(self):
+		"""
+		Return the edge lateness (jitter) statistics in nanoseconds
+		"""
+		return self.jitter.summary()
+
+	def _remove(self, pin):
+		"""
+		Deactivate the channel of a pin, its queued edges are skipped
+		"""
+		channel = self._channels.pop(pin.id, None)
+		if channel:
+			channel.active = False
+
+	def _push(self, due, channel):
+		"""
+		Queue an edge of a channel
+		"""
+		heapq.heappush(self._heap, (due, next(self._sequence), channel))
+
+	def _write(self, channel, level):
+		"""
+		Write a level to the pin only if it changes
+		"""
+		if channel.level != level:
+			channel.pin.output(level)
+			channel.level = level
+
+	def _edge(self, channel, due):
+		"""
+		Handle an edge of a channel and schedule its next one
+		"""
+		if due == channel.falling:
+			self._write(channel, 0)
+			channel.falling = None
+			self._push(channel.boundary, channel)
+			return
+
+		# Period boundary: apply the current frequency and duty cycle
+		pin = channel.pin
+		period = int(1e9 / pin.frequency)
+		duty = min(max(pin.duty_cycle or 0, 0), 100)
+		on = period * duty // 100
+
+		channel.boundary = due + period
+		if on <= 0:
+			self._write(channel, 0)
+			self._push(channel.boundary, channel)
+		elif on >= period:
+			self._write(channel, 1)
+			self._push(channel.boundary, channel)
+		else:
+			self._write(channel, 1)
+			channel.falling = due + on
+			self._push(channel.falling, channel)
+
+	def _run(self):
+		"""
+		Timing thread: write every edge as close as possible to its due time
+
+		The last stretch before an edge is busy-waited without holding
+			_condition, so add(), remove() and parameter changes don't
+			stall behind the spin
+		"""
+		while True:
+			with self._condition:
+				entry = self._next_edge()
+
+			# Busy wait the last stretch for accuracy
+			due, _, channel = entry
+			while time.perf_counter_ns() < due:
+				pass
+
+			with self._condition:
+				# An earlier edge may have been queued while spinning and a
+				# removed channel must not be written after remove() returned
+				if not self._heap or self._heap[0] is not entry:
+					continue
+				heapq.heappop(self._heap)
+				if not channel.active:
+					continue
+
+				self.jitter.add(time.perf_counter_ns() - due)
+				try:
+					self._edge(channel, due)
+				except Exception:
+					# A failing pin is dropped, the other channels keep running
+					traceback.print_exc()
+					self._remove(channel.pin)
+
+	def _next_edge(self):
+		"""
+		Wait until the next edge is due within SPIN_NS and return its heap entry
+
+		Must be called with _condition held
+		"""
+		while True:
+			# Wait for channels
+			while not self._heap:
+				self._condition.wait()
+
+			entry = self._heap[0]
+			if not entry[2].active:
+				heapq.heappop(self._heap)
+				continue
+
+			wait = entry[0] - time.perf_counter_ns()
+			if wait > SPIN_NS:
+				# Sleep, but wake early for added or removed channels
+				self._condition.wait((wait - SPIN_NS) / 1e9)
+				continue
+
+			return entry
+
+
+def _check_frequency(frequency):
+	"""
+	Raise ValueError unless frequency is positive and gives a period of at least 1ns
+	"""
+	if frequency is None or frequency <= 0 or int(1e9 / frequency) == 0:
+		raise ValueError("Software PWM frequency must be positive and at most 1GHz, got %r" % (frequency,))
+
+
+# Engine shared by all SoftPWMPins unless one is given
+default_engine = SoftPWMEngine()
+
+
+class SoftPWMPin(anygpio.PWMPin):
+	"""
+	PWM pin driven in software through the wrapper's OutputPin.output()
+
+	Used by GPIO.PWM() on systems without hardware PWM
+
+	Attributes:
+		gpio			GPIO wrapper instance the pin belongs to
+		engine			SoftPWMEngine driving the pin
+		output_pin		Wrapper OutputPin used for the writes
+	"""
+
+	def __init__(self, id, name=None, action=anygpio.do_nothing, gpio=None, engine=None, **kwargs):
+		"""
+		Sets default values and constructs instance of SoftPWMPin
+		"""
+		super().__init__(id, name, action, **kwargs)
+		self.gpio = gpio
+		self.engine = engine or default_engine
+		self.output_pin = gpio._create_OutputPin_instance(id, name, action, **kwargs)
+		self.number = self.output_pin.number
+		self.header = self.output_pin.header
+
+	def output(self, value):
+		"""
+		Output the desired value to the pin
+		"""
+		return self.output_pin.output(value)
+
+	def input(self):
+		"""
+		Read the pin's current level back through the wrapper's OutputPin
+		"""
+		return self.output_pin.input()
+
+	def setup(self, frequency=None, duty_cycle=None):
+		"""
+		Initialize the pin as a native output pin
+		"""
+		frequency = self.frequency if frequency is None else frequency
+		_check_frequency(frequency)
+		self.frequency = frequency
+		self.duty_cycle = duty_cycle or 0
+		self.output_pin.setup()
+
+	def start(self, duty_cycle=None):
+		"""
+		Start PWM at specified duty_cycle
+		"""
+		self.duty_cycle = duty_cycle or self.duty_cycle
+		self.engine.add(self)
+		self._running = True
+
+	def stop(self):
+		"""
+		Stop PWM, leaving the pin LOW
+		"""
+		self.engine.remove(self)
+		self.output_pin.output(0)
+		self._running = False
+
+	def change_frequency(self, value):
+		"""
+		Update the PWM frequency, applied at the next period boundary
+		"""
+		_check_frequency(value)
+		self.frequency = value
+
+	def change_duty_cycle(self, value):
+		"""
+		Update the PWM duty cycle, applied at the next period boundary
+		"""
+		self.duty_cycle = value
+
+	def destroy(self):
+		"""
+		Stop PWM on the pin then drop the pin
+		"""
+		self.stop()
+		self.output_pin.destroy()
+		self.gpio.drop_pin(self)
+
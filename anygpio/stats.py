@@ -0,0 +1,67 @@
+import math
+
+
+class RunningStats:
+	"""
+	Running count, mean, standard deviation, min and max of a series of values
+
+	Uses Welford's algorithm so adding a value is O(1) with no stored samples
+
+	Attributes:
+		count			Number of values added
+		mean			Mean of the values added
+		min				Smallest value added (None if empty)
+		max				Largest value added (None if empty)
+		_m2				Sum of squared differences from the mean
+	"""
+
+	def __init__(self):
+		"""
+		Sets default values and constructs instance of RunningStats
+		"""
+		self.reset()
+
+	def reset(self):
+		"""
+		Forget all values added so far
+		"""
+		self.count = 0
+		self.mean = 0.0
+		self.min = None
+		self.max = None
+		self._m2 = 0.0
+
+	def add(self, value):
+		"""
+		Add a value to the statistics
+		"""
+		self.count += 1
+		delta = value - self.mean
+		self.mean += delta / self.count
+		self._m2 += delta * (value - self.mean)
+
+		if self.min is None or value < self.min:
+			self.min = value
+		if self.max is None or value > self.max:
+			self.max = value
+
+	@property
+	def stdev(self):
+		"""
+		Sample standard deviation of the values added
+		"""
+		if self.count < 2:
+			return 0.0
+		return math.sqrt(self._m2 / (self.count - 1))
+
+	def summary(self):
+		"""
+		Return the statistics as a dict
+		"""
+		return {
+			"count": self.count,
+			"mean": self.mean,
+			"stdev": self.stdev,
+			"min": self.min,
+			"max": self.max,
+		}
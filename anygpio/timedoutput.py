@@ -0,0 +1,229 @@
+import time, heapq, threading, itertools, traceback
+
+from . import anygpio, errors
+from .latency import Histogram
+
+
+# Waits shorter than this are busy-waited instead of slept (nanoseconds)
+SPIN_NS = 200000
+
+# Writes due within this many nanoseconds of the first one are written together
+SLOT_NS = 50000
+
+
+class ScheduledWrite:
+	"""
+	Handle for a write scheduled with OutputScheduler
+
+	Attributes:
+		pin				OutputPin written
+		value			Value written (0 or 1)
+		due				Time (time.monotonic_ns()) the write is due
+		cancelled		Has cancel() been called?
+		written			time.monotonic_ns() after the write, None until written
+	"""
+
+	def __init__(self, pin, value, due):
+		self.pin = pin
+		self.value = value
+		self.due = due
+		self.cancelled = False
+		self.written = None
+
+	def cancel(self):
+		"""
+		Prevent the write if it has not happened yet
+
+		Returns True if the write was cancelled in time
+		"""
+		self.cancelled = True
+		return self.written is None
+
+	@property
+	def lateness(self):
+		"""
+		Nanoseconds between the due time and the end of the write, None until written
+		"""
+		return None if self.written is None else self.written - self.due
+
+
+class OutputScheduler:
+	"""
+	Writes output pins at given times from a single timing thread
+
+	Pending writes are kept in a heap. The thread sleeps until shortly
+		before the first one is due and busy-waits the last stretch.
+		Writes due within slot nanoseconds of it (to different pins) are
+		written together with one GPIO.output_mask() call
+
+	Attributes:
+		gpio			GPIO wrapper instance
+		slot			Nanoseconds within which writes are batched
+		lateness		Histogram of write lateness in nanoseconds
+		writes			Number of writes done
+		batches			Number of native writes (batches) done
+		cancelled		Number of cancelled writes skipped
+		errors			Number of writes that raised, they are dropped
+		_heap			(due, sequence, ScheduledWrite) writes waiting to be done
+		_condition		Wakes the thread when writes are added
+		_thread			Timing thread, started with the first write
+	"""
+
+	def __init__(self, gpio, slot=SLOT_NS):
+		"""
+		Sets default values and constructs instance of OutputScheduler
+		"""
+		self.gpio = gpio
+		self.slot = slot
+		self.lateness = Histogram()
+		self.writes = 0
+		self.batches = 0
+		self.cancelled = 0
+		self.errors = 0
+		self._heap = []
+		self._sequence = itertools.count()
+		self._condition = threading.Condition()
+		self._thread = None
+
+	def schedule(self, pin, value, at):
+		"""
+		Write value to pin at time.monotonic_ns() at
+
+		Returns a ScheduledWrite that can be cancelled
+		Raises WrongPinType if pin is not an OutputPin
+		"""
+		if not isinstance(pin, anygpio.OutputPin):
+			raise errors.WrongPinType("Only output pins can be scheduled")
+		write = ScheduledWrite(pin, 1 if value else 0, at)
+
+		with self._condition:
+			heapq.heappush(self._heap, (at, next(self._sequence), write))
+
+			if self._thread is None:
+				self._thread = threading.Thread(target=self._run, name="anygpio-output-scheduler", daemon=True)
+				self._thread.start()
+
+			# Only wake the thread if this is now the first write due
+			if self._heap[0][2] is write:
+				self._condition.notify()
+
+		return write
+
+	def cancel(self, pin=None):
+		"""
+		Cancel every pending write (of pin if given), returns the number cancelled
+		"""
+		count = 0
+		with self._condition:
+			for _, _, write in self._heap:
+				if not write.cancelled and (pin is None or write.pin is pin):
+					write.cancelled = True
+					count += 1
+		return count
+
+	def pending(self):
+		"""
+		Returns the number of writes waiting (including cancelled ones not yet skipped)
+		"""
+		return len(self._heap)
+
+	def stats(self):
+		"""
+		Returns writes, batches, cancelled, errors, pending and lateness (count, mean, p50, p99, max in ns)
+		"""
+		return {
+			"writes": self.writes,
+			"batches": self.batches,
+			"cancelled": self.cancelled,
+			"errors": self.errors,
+			"pending": self.pending(),
+			"lateness": self.lateness.summary(),
+		}
+
+	def reset_stats(self):
+		"""
+		Forget the statistics collected so far
+		"""
+		self.lateness.reset()
+		self.writes = self.batches = self.cancelled = self.errors = 0
+
+	def _batch(self, due):
+		"""
+		Pop the writes due within slot of due, at most one per pin
+		"""
+		heap = self._heap
+		batch = []
+		pins = set()
+		end = due + self.slot
+
+		while heap and heap[0][0] <= end:
+			write = heap[0][2]
+			if write.cancelled:
+				heapq.heappop(heap)
+				self.cancelled += 1
+				continue
+			# A second write to a pin waits for the next batch, or the first would be lost
+			if write.pin.id in pins:
+				break
+			heapq.heappop(heap)
+			batch.append(write)
+			pins.add(write.pin.id)
+
+		return batch
+
+	def _write(self, batch):
+		"""
+		Write a batch with one native write and record its lateness
+		"""
+		if len(batch) == 1:
+			batch[0].pin.output(batch[0].value)
+		else:
+			pins = [write.pin for write in batch]
+			mask = 0
+			for index, write in enumerate(batch):
+				if write.value:
+					mask |= 1 << index
+			self.gpio.output_mask(pins, mask)
+
+		written = time.monotonic_ns()
+		for write in batch:
+			write.written = written
+			self.lateness.add(written - write.due)
+		self.writes += len(batch)
+		self.batches += 1
+
+	def _run(self):
+		"""
+		Timing thread: write every batch as close as possible to its due time
+		"""
+		with self._condition:
+			while True:
+				# Wait for writes
+				while not self._heap:
+					self._condition.wait()
+
+				due, _, write = self._heap[0]
+				if write.cancelled:
+					heapq.heappop(self._heap)
+					self.cancelled += 1
+					continue
+
+				wait = due - time.monotonic_ns()
+				if wait > SPIN_NS:
+					# Sleep, but wake early for earlier writes
+					self._condition.wait((wait - SPIN_NS) / 1e9)
+					continue
+
+				# Busy wait the last stretch for accuracy
+				while time.monotonic_ns() < due:
+					pass
+
+				batch = self._batch(due)
+				if not batch:
+					continue
+				try:
+					self._write(batch)
+				except Exception:
+					# A failing batch is dropped, later writes keep running
+					traceback.print_exc()
+					self.errors += len(batch)
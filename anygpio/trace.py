@@ -0,0 +1,321 @@
+import os, mmap, json, struct, time, threading
+
+from . import anygpio
+from . import errors
+from .hooks import hook, unhook
+
+
+# Trace file layout:
+#	header		magic, record count, pin table length
+#	pin table	JSON list of pin ids, padded to 8 bytes
+#	records		fixed-size RECORD entries
+MAGIC = b"AGTRACE1"
+HEADER = struct.Struct("<8sQI4x")
+
+# timestamp (ns since start), pin index, op, value
+RECORD = struct.Struct("<QHBxd")
+
+# Record ops
+OP_INPUT = 1
+OP_OUTPUT = 2
+OP_EVENT = 3
+OP_PWM_START = 4
+OP_PWM_STOP = 5
+OP_PWM_FREQUENCY = 6
+OP_PWM_DUTY_CYCLE = 7
+
+# Number of records to grow the trace file by when it fills up
+GROW_RECORDS = 65536
+
+
+class Recorder:
+	"""
+	Records GPIO traffic to a memory-mapped binary trace file
+
+	Hooks input(), output(), PWM calls and event callbacks on every pin
+		configured when start() is called. Each call appends one
+		fixed-size record (timestamp, pin, op, value)
+
+	Only events registered after start() are recorded
+
+	Attributes:
+		gpio			GPIO wrapper instance being recorded
+		path			Path of the trace file
+		pins			List of recorded pins, index is the pin field of a record
+		count			Number of records written
+		_map			mmap of the trace file
+		_offset			Offset of the first record in the file
+		_capacity		Number of records that fit in the file
+		_lock			Serializes appends from multiple threads
+	"""
+
+	def __init__(self, gpio, path):
+		"""
+		Sets default values and constructs instance of Recorder
+		"""
+		self.gpio = gpio
+		self.path = path
+		self.pins = []
+		self.count = 0
+		self._map = None
+		self._file = None
+		self._offset = 0
+		self._capacity = 0
+		self._start = 0
+		self._lock = threading.Lock()
+
+	def start(self):
+		"""
+		Create the trace file and hook all configured pins
+		"""
+		self.pins = list(self.gpio.pins.values())
+
+		# The pin table is written once, records refer to pins by index
+		table = json.dumps([pin.id for pin in self.pins]).encode()
+		table += b" " * (-len(table) % 8)
+		self._offset = HEADER.size + len(table)
+		self._capacity = GROW_RECORDS
+
+		self._file = open(self.path, "w+b")
+		self._file.truncate(self._offset + self._capacity * RECORD.size)
+		self._map = mmap.mmap(self._file.fileno(), 0)
+		HEADER.pack_into(self._map, 0, MAGIC, 0, len(table))
+		self._map[HEADER.size:self._offset] = table
+
+		self._start = time.monotonic_ns()
+		for index, pin in enumerate(self.pins):
+			self._hook_pin(index, pin)
+
+	def stop(self):
+		"""
+		Unhook all pins and close the trace file
+		"""
+		for pin in self.pins:
+			unhook(pin, self)
+
+		if self._map is not None:
+			with self._lock:
+				HEADER.pack_into(self._map, 0, MAGIC, self.count, self._offset - HEADER.size)
+				self._map.flush()
+				self._map.close()
+
+				# Drop the unused preallocated space
+				self._file.truncate(self._offset + self.count * RECORD.size)
+				self._file.close()
+				self._map = None
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, *_):
+		self.stop()
+
+	def record(self, index, op, value=0):
+		"""
+		Append a single record to the trace
+		"""
+		timestamp = time.monotonic_ns() - self._start
+
+		with self._lock:
+			if self._map is None:
+				# Recorder was stopped while a hooked call was running
+				return
+			if self.count == self._capacity:
+				self._grow()
+			RECORD.pack_into(self._map, self._offset + self.count * RECORD.size, timestamp, index, op, value)
+			self.count += 1
+
+			# Keep the count in the header current so a crash leaves a readable trace
+			struct.pack_into("<Q", self._map, 8, self.count)
+
+	def _grow(self):
+		"""
+		Extend the trace file by GROW_RECORDS records
+		"""
+		self._capacity += GROW_RECORDS
+		self._map.resize(self._offset + self._capacity * RECORD.size)
+
+	def _hook_pin(self, index, pin):
+		"""
+		Wrap the native calls of a single pin with recording versions
+		"""
+		record = self.record
+
+		if hasattr(pin, "input"):
+			def hook_input(original):
+				def input():
+					value = original()
+					record(index, OP_INPUT, value)
+					return value
+				return input
+			hook(pin, "input", self, hook_input)
+
+		if isinstance(pin, anygpio.InputPin):
+			def hook_add_event(original):
+				def _add_event(rising_or_falling, action, bounce=None):
+					def callback(*args):
+						record(index, OP_EVENT)
+						return action(*args)
+					return original(rising_or_falling, callback, bounce)
+				return _add_event
+			hook(pin, "_add_event", self, hook_add_event)
+
+		if isinstance(pin, anygpio.OutputPin):
+			def hook_output(original):
+				def output(value):
+					record(index, OP_OUTPUT, value)
+					return original(value)
+				return output
+			hook(pin, "output", self, hook_output)
+
+		if isinstance(pin, anygpio.PWMPin):
+			def hook_start(original):
+				def start(duty_cycle=None):
+					result = original(duty_cycle)
+					record(index, OP_PWM_START, pin.duty_cycle or 0)
+					return result
+				return start
+			hook(pin, "start", self, hook_start)
+
+			def hook_stop(original):
+				def stop():
+					record(index, OP_PWM_STOP)
+					return original()
+				return stop
+			hook(pin, "stop", self, hook_stop)
+
+			def hook_change_frequency(original):
+				def change_frequency(value):
+					record(index, OP_PWM_FREQUENCY, value)
+					return original(value)
+				return change_frequency
+			hook(pin, "change_frequency", self, hook_change_frequency)
+
+			def hook_change_duty_cycle(original):
+				def change_duty_cycle(value):
+					record(index, OP_PWM_DUTY_CYCLE, value)
+					return original(value)
+				return change_duty_cycle
+			hook(pin, "change_duty_cycle", self, hook_change_duty_cycle)
+
+
+class Replayer:
+	"""
+	Feeds a recorded trace back into a GPIO wrapper
+
+	Input records override pin.input() so watch() and value() see the
+		recorded levels. Event records call on_event(pin), which runs
+		pin.action(pin.id) like a native event callback by default
+
+	Attributes:
+		gpio			GPIO wrapper instance to replay into
+		path			Path of the trace file
+		speed			Playback speed multiplier
+							1 is real time, 10 is ten times faster
+							None or 0 replays as fast as possible
+		outputs			Also replay output and PWM records onto the pins
+		on_event		Called with the pin for each event record
+		pin_ids			Pin table of the trace
+	"""
+
+	def __init__(self, gpio, path, speed=1, outputs=False, on_event=None):
+		"""
+		Sets default values and constructs instance of Replayer
+		"""
+		self.gpio = gpio
+		self.path = path
+		self.speed = speed
+		self.outputs = outputs
+		self.on_event = on_event or self._default_on_event
+		self.pin_ids = []
+		self._replaying = False
+		self._overridden = []
+		self._levels = {}
+
+	def records(self):
+		"""
+		Generator of (timestamp, pin_id, op, value) for every record in the trace
+		"""
+		with open(self.path, "rb") as file:
+			with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as trace:
+				magic, count, table_length = HEADER.unpack_from(trace, 0)
+				if magic != MAGIC:
+					raise errors.TraceError("Not an anygpio trace: " + str(self.path))
+
+				offset = HEADER.size + table_length
+				self.pin_ids = json.loads(bytes(trace[HEADER.size:offset]))
+
+				for timestamp, index, op, value in RECORD.iter_unpack(trace[offset:offset + count * RECORD.size]):
+					yield timestamp, self.pin_ids[index], op, value
+
+	def run(self):
+		"""
+		Replay the whole trace, blocking until finished or stop() is called
+		"""
+		self._replaying = True
+		start = time.monotonic_ns()
+
+		try:
+			for timestamp, id, op, value in self.records():
+				if not self._replaying:
+					break
+
+				# Wait until the record is due
+				if self.speed:
+					delay = (start + timestamp / self.speed - time.monotonic_ns()) / 1e9
+					if delay > 0:
+						time.sleep(delay)
+
+				pin = self.gpio.pin(id)
+				if pin:
+					self._apply(pin, op, value)
+		finally:
+			self.finish()
+
+	def stop(self):
+		"""
+		Stop run() after the current record
+		"""
+		self._replaying = False
+
+	def finish(self):
+		"""
+		Restore the native input() of every pin overridden by the replay
+		"""
+		for pin in self._overridden:
+			unhook(pin, self)
+		self._overridden = []
+		self._levels = {}
+
+	def _apply(self, pin, op, value):
+		"""
+		Apply a single record to a pin
+		"""
+		if op == OP_INPUT:
+			self._levels[pin.id] = int(value)
+			if pin not in self._overridden:
+				self._overridden.append(pin)
+				hook(pin, "input", self, lambda original, id=pin.id: lambda: self._levels[id])
+
+		elif op == OP_EVENT:
+			self.on_event(pin)
+
+		elif self.outputs:
+			if op == OP_OUTPUT:
+				pin.output(int(value))
+			elif op == OP_PWM_START:
+				pin.start(value)
+			elif op == OP_PWM_STOP:
+				pin.stop()
+			elif op == OP_PWM_FREQUENCY:
+				pin.change_frequency(value)
+			elif op == OP_PWM_DUTY_CYCLE:
+				pin.change_duty_cycle(value)
+
+	def _default_on_event(self, pin):
+		"""
+		Run pin.action() the way a native event callback would
+		"""
+		pin.action(pin.id)
+
@@ -0,0 +1,92 @@
+import time
+
+from .stats import RunningStats
+from .latency import Histogram
+
+
+class WatchStats:
+	"""
+	Running statistics of the GPIO.watch() loop
+
+	Each tick reads every watched pin then runs the actions of the pins
+		that matched, after sleeping for the requested interval
+
+	Attributes:
+		requested		Requested period (watch() interval) in ns
+		period			RunningStats of the actual tick to tick period in ns
+		jitter			Histogram of |actual - requested period| in ns
+		read			RunningStats of the time reading pins each tick in ns
+		action			RunningStats of the time running actions each tick in ns
+		overruns		Ticks whose reads and actions took longer than the requested period
+		callback		Called with summary() every `every` seconds from the watch loop
+		every			Seconds between callback calls
+		_previous		time.monotonic_ns() of the previous tick
+		_next_report	time.monotonic_ns() of the next callback call
+	"""
+
+	def __init__(self):
+		"""
+		Sets default values and constructs instance of WatchStats
+		"""
+		self.callback = None
+		self.every = None
+		self.requested = 0
+		self.period = RunningStats()
+		self.jitter = Histogram()
+		self.read = RunningStats()
+		self.action = RunningStats()
+		self.reset()
+
+	def reset(self):
+		"""
+		Forget all ticks so far
+		"""
+		self.period.reset()
+		self.jitter.reset()
+		self.read.reset()
+		self.action.reset()
+		self.overruns = 0
+		self._previous = None
+		self._next_report = None
+
+	def start(self, interval):
+		"""
+		Called when watch() starts with its interval in seconds
+		"""
+		self.requested = int(interval * 1e9)
+		self._previous = None
+		if self.callback:
+			self._next_report = time.monotonic_ns() + int(self.every * 1e9)
+
+	def tick(self, started, read, action):
+		"""
+		Add one tick: its start time, read and action time in ns
+		"""
+		if self._previous is not None:
+			period = started - self._previous
+			self.period.add(period)
+			self.jitter.add(abs(period - self.requested))
+		self._previous = started
+
+		self.read.add(read)
+		self.action.add(action)
+		if read + action > self.requested:
+			self.overruns += 1
+
+		if self._next_report is not None and started >= self._next_report:
+			self._next_report = started + int(self.every * 1e9)
+			self.callback(self.summary())
+
+	def summary(self):
+		"""
+		Returns the statistics as a dict, times in ns
+		"""
+		return {
+			"ticks": self.read.count,
+			"requested": self.requested,
+			"period": self.period.summary(),
+			"jitter": self.jitter.summary(),
+			"read": self.read.summary(),
+			"action": self.action.summary(),
+			"overruns": self.overruns,
+		}
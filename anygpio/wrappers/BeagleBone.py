@@ -121,11 +121,14 @@ class InputPin(Pin, anygpio.InputPin):
 		Register an event callback with the native_gpio
 		"""
 
-		# TEMPLATE: Set the default bouncetime in milliseconds (300)
-		bounce = bounce or 300
+		# TEMPLATE: Set the default bouncetime in milliseconds (300), 0 disables it
+		bounce = 300 if bounce is None else bounce
 
 		# TEMPLATE: Call the native add_event_detect function
-		native_gpio.GPIO.add_event_detect(self.id, rising_or_falling, action, bouncetime=bounce)
+		if bounce:
+			native_gpio.GPIO.add_event_detect(self.id, rising_or_falling, action, bouncetime=bounce)
+		else:
+			native_gpio.GPIO.add_event_detect(self.id, rising_or_falling, action)
 
 	def _remove_event(self):
 		"""
@@ -144,6 +147,15 @@ class InputPin(Pin, anygpio.InputPin):
 
 		return wrapper._native_rising_falling(*args[1:])
 
+	def _native_both(self):
+		"""
+		Call the wrapper._native_both() method
+
+		This has to be here to have access to the wrapper variable
+		"""
+
+		return wrapper._native_both()
+
 
 # TEMPLATE: Inherit from InputPin if output pins can be read
 class OutputPin(anygpio.OutputPin, InputPin):
@@ -236,6 +248,9 @@ class PWMPin(anygpio.PWMPin, OutputPin):
 		# TEMPLATE: Run native ChangeFrequency function
 		native_gpio.PWM.set_frequency(self.id, value)
 
+		# Store the new frequency
+		self.frequency = value
+
 	def change_duty_cycle(self, value):
 		"""
 		Update the PWM duty cycle
@@ -244,6 +259,9 @@ class PWMPin(anygpio.PWMPin, OutputPin):
 		# TEMPLATE: Run native ChangeDutyCycle function
 		native_gpio.PWM.set_duty_cycle(self.id, value)
 
+		# Store the new duty cycle
+		self.duty_cycle = value
+
 	def destroy(self):
 		"""
 		Remove PWM pin configuration through native pin object then drop pin
@@ -255,6 +273,46 @@ class PWMPin(anygpio.PWMPin, OutputPin):
 		wrapper.drop_pin(self)
 
 
+class AnalogInputPin(Pin, anygpio.AnalogInputPin):
+	"""
+	Derived class for storing analog input pin configurations and related methods
+
+	Uses Adafruit_BBIO.ADC (AIN0-6 on P9_33 to P9_40, 1.8V full scale)
+	"""
+
+	def setup(self):
+		"""
+		Initialize the ADC with the native_gpio
+		"""
+		_native_adc().setup()
+
+	def read(self):
+		"""
+		Returns the input as a fraction of full scale (0.0 - 1.0)
+		"""
+		return _native_adc().read(self.id)
+
+	def read_raw(self):
+		"""
+		Returns the input in millivolts (0 - 1800)
+		"""
+		return _native_adc().read_raw(self.id)
+
+	def destroy(self):
+		"""
+		Stop streaming then drop pin
+		"""
+		self.stop_stream()
+		wrapper.drop_pin(self)
+
+
+def _native_adc():
+	"""
+	Returns Adafruit_BBIO.ADC, importing it on first use
+	"""
+	return importlib.import_module(native_gpio_name + ".ADC")
+
+
 class GPIO(anygpio.GPIO):
 
 	def setup(self):
@@ -303,6 +361,15 @@ class GPIO(anygpio.GPIO):
 		"""
 		return PWMPin(*args[1:], **kwargs)
 
+	# This has to be here to use the overridden AnalogInputPin class
+	def _create_AnalogInputPin_instance(*args, **kwargs):
+		"""
+		Create an instance of AnalogInputPin
+
+		Must be included in wrapper GPIO class to use overridden AnalogInputPin Class
+		"""
+		return AnalogInputPin(*args[1:], **kwargs)
+
 	# TEMPLATE: Change to LOW or HIGH of native_gpio
 	def _native_high_or_low(self, value):
 		"""
@@ -364,6 +431,16 @@ class GPIO(anygpio.GPIO):
 
 		return (native_gpio.RISING if value else native_gpio.FALLING)
 
+	# TEMPLATE: Change to BOTH of native_gpio
+	def _native_both(self):
+		"""
+		Returns GPIO.BOTH (RISING and FALLING)
+		"""
+
+		self.supports.require('events')
+
+		return native_gpio.BOTH
+
 	def cleanup(self):
 		"""
 		Run the native GPIO cleanup() function if available
@@ -386,6 +463,7 @@ wrapper = GPIO()
 wrapper.supports.pwm = True
 wrapper.supports.pull_up_down = True
 wrapper.supports.events = True
+wrapper.supports.analog = True
 
 
 # Set the system to the name of the file
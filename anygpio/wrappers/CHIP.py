@@ -116,11 +116,14 @@ class InputPin(Pin, anygpio.InputPin):
 		Register an event callback with the native_gpio
 		"""
 
-		# TEMPLATE: Set the default bouncetime in milliseconds (300)
-		bounce = bounce or 300
+		# TEMPLATE: Set the default bouncetime in milliseconds (300), 0 disables it
+		bounce = 300 if bounce is None else bounce
 
 		# TEMPLATE: Call the native add_event_detect function
-		native_gpio.GPIO.add_event_callback(self.id, rising_or_falling, action, bouncetime=bounce)
+		if bounce:
+			native_gpio.GPIO.add_event_callback(self.id, rising_or_falling, action, bouncetime=bounce)
+		else:
+			native_gpio.GPIO.add_event_callback(self.id, rising_or_falling, action)
 
 	def _remove_event(self):
 		"""
@@ -141,6 +144,15 @@ class InputPin(Pin, anygpio.InputPin):
 
 		return wrapper._native_rising_falling(*args[1:])
 
+	def _native_both(self):
+		"""
+		Call the wrapper._native_both() method
+
+		This has to be here to have access to the wrapper variable
+		"""
+
+		return wrapper._native_both()
+
 
 # TEMPLATE: Inherit from InputPin if output pins can be read
 class OutputPin(anygpio.OutputPin, InputPin):
@@ -232,6 +244,9 @@ class PWMPin(anygpio.PWMPin, OutputPin):
 		# TEMPLATE: Run native ChangeFrequency function
 		native_gpio.set_frequency(self.id, value)
 
+		# Store the new frequency
+		self.frequency = value
+
 	def change_duty_cycle(self, value):
 		"""
 		Update the PWM duty cycle
@@ -240,6 +255,9 @@ class PWMPin(anygpio.PWMPin, OutputPin):
 		# TEMPLATE: Run native ChangeDutyCycle function
 		native_gpio.PWM..set_duty_cycle(self.id, value)
 
+		# Store the new duty cycle
+		self.duty_cycle = value
+
 	def destroy(self):
 		"""
 		Remove PWM pin configuration through native pin object then drop pin
@@ -307,6 +325,16 @@ class GPIO(anygpio.GPIO):
 
 		return (native_gpio.GPIO.RISING if value else native_gpio.GPIO.FALLING)
 
+	# TEMPLATE: Change to BOTH of native_gpio
+	def _native_both(self):
+		"""
+		Returns GPIO.BOTH (RISING and FALLING)
+		"""
+
+		self.supports.require('events')
+
+		return native_gpio.GPIO.BOTH
+
 	# TEMPLATE: Change to PULL_UP or PULL_DOWN of native_gpio
 	def _native_pull_up_down(self, value):
 		"""
@@ -201,6 +201,9 @@ class PWMPin(anygpio.PWMPin, OutputPin):
 		# TEMPLATE: Run native ChangeFrequency function
 		self.native.ChangeFrequency(value)
 
+		# Store the new frequency
+		self.frequency = value
+
 	def change_duty_cycle(self, value):
 		"""
 		Update the PWM duty cycle
@@ -209,6 +212,9 @@ class PWMPin(anygpio.PWMPin, OutputPin):
 		# TEMPLATE: Run native ChangeDutyCycle function
 		self.native.ChangeDutyCycle(value)
 
+		# Store the new duty cycle
+		self.duty_cycle = value
+
 	def destroy(self):
 		"""
 		Remove PWM pin configuration through native pin object then drop pin
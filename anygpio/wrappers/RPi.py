@@ -116,11 +116,14 @@ class InputPin(Pin, anygpio.InputPin):
 		Register an event callback with the native_gpio
 		"""
 
-		# TEMPLATE: Set the default bouncetime in milliseconds (300)
-		bounce = bounce or 300
+		# TEMPLATE: Set the default bouncetime in milliseconds (300), 0 disables it
+		bounce = 300 if bounce is None else bounce
 
 		# TEMPLATE: Call the native add_event_detect function
-		native_gpio.add_event_detect(self.id, rising_or_falling, action, bouncetime=bounce)
+		if bounce:
+			native_gpio.add_event_detect(self.id, rising_or_falling, action, bouncetime=bounce)
+		else:
+			native_gpio.add_event_detect(self.id, rising_or_falling, action)
 
 	def _remove_event(self):
 		"""
@@ -139,6 +142,15 @@ class InputPin(Pin, anygpio.InputPin):
 
 		return wrapper._native_rising_falling(*args[1:])
 
+	def _native_both(self):
+		"""
+		Call the wrapper._native_both() method
+
+		This has to be here to have access to the wrapper variable
+		"""
+
+		return wrapper._native_both()
+
 
 # TEMPLATE: Inherit from InputPin if output pins can be read
 class OutputPin(anygpio.OutputPin, InputPin):
@@ -230,6 +242,9 @@ class PWMPin(anygpio.PWMPin, OutputPin):
 		# TEMPLATE: Run native ChangeFrequency function
 		self.native.ChangeFrequency(value)
 
+		# Store the new frequency
+		self.frequency = value
+
 	def change_duty_cycle(self, value):
 		"""
 		Update the PWM duty cycle
@@ -238,6 +253,9 @@ class PWMPin(anygpio.PWMPin, OutputPin):
 		# TEMPLATE: Run native ChangeDutyCycle function
 		self.native.ChangeDutyCycle(value)
 
+		# Store the new duty cycle
+		self.duty_cycle = value
+
 	def destroy(self):
 		"""
 		Remove PWM pin configuration through native pin object then drop pin
@@ -289,6 +307,39 @@ class GPIO(anygpio.GPIO):
 		"""
 		return PWMPin(*args[1:], **kwargs)
 
+	def output_mask(self, pins, mask, changed=None):
+		"""
+		Output a bitmask of values to a list of output pins
+
+		The changed pins are written with one native output() call of lists
+			of channels and values, as for sequence_writer()
+		"""
+		if changed is None:
+			changed = (1 << len(pins)) - 1
+
+		channels, values = _native_step([pin.id for pin in pins], mask, changed)
+		if channels:
+			native_gpio.output(channels, values)
+
+	def sequence_writer(self, pins):
+		"""
+		Returns write(steps) to output sequences of bitmasks to a list of output pins
+
+		Each step is written with one native output() call of lists of
+			channels and values, converted once per distinct sequence
+		"""
+		ids = [pin.id for pin in pins]
+		native_sequences = {}
+		output = native_gpio.output
+
+		def write(steps):
+			sequence = native_sequences.get(steps)
+			if sequence is None:
+				sequence = native_sequences[steps] = [_native_step(ids, *step) for step in steps]
+			for channels, values in sequence:
+				output(channels, values)
+		return write
+
 	# TEMPLATE: Change to LOW or HIGH of native_gpio
 	def _native_high_or_low(self, value):
 		"""
@@ -349,6 +400,16 @@ class GPIO(anygpio.GPIO):
 
 		return (native_gpio.RISING if value else native_gpio.FALLING)
 
+	# TEMPLATE: Change to BOTH of native_gpio
+	def _native_both(self):
+		"""
+		Returns GPIO.BOTH (RISING and FALLING)
+		"""
+
+		self.supports.require('events')
+
+		return native_gpio.BOTH
+
 	def cleanup(self):
 		"""
 		Run the native GPIO cleanup() function if available
@@ -363,6 +424,20 @@ class GPIO(anygpio.GPIO):
 
 
 
+def _native_step(ids, mask, changed):
+	"""
+	Returns the ([channels], [values]) of a (mask, changed) step
+	"""
+	channels = []
+	values = []
+	for index, id in enumerate(ids):
+		bit = 1 << index
+		if changed & bit:
+			channels.append(id)
+			values.append(native_gpio.HIGH if mask & bit else native_gpio.LOW)
+	return channels, values
+
+
 # wrapper is what will be imported by __init__.py
 wrapper = GPIO()
 
@@ -372,6 +447,9 @@ wrapper.supports.pwm = True
 wrapper.supports.pull_up_down = True
 wrapper.supports.events = True
 
+# BCM channels on the 40 pin header
+wrapper.supports.available_pins = frozenset(range(28))
+
 
 # Set the system to the name of the file
 wrapper.system = Path(__file__).stem
@@ -0,0 +1,617 @@
+import threading
+from pathlib import Path
+
+from .. import anygpio
+from .. import errors
+
+
+class VirtualGPIO:
+	"""
+	In-memory stand-in for a native GPIO library (RPi.GPIO style API)
+
+	Used to run anygpio without a board: replaying traces, benchmarks,
+		the broker end to end, development on a desktop
+
+	Attributes:
+		levels			Current level of each channel (0 or 1)
+		directions		IN or OUT for each configured channel
+		callbacks		Event callbacks registered with add_event_detect()
+		pwm				PWM objects created for each channel
+		analog			Current value (0.0 - 1.0) of each analog channel
+	"""
+	BCM = 11
+	IN = 1
+	OUT = 0
+	LOW = 0
+	HIGH = 1
+	FALLING = 32
+	RISING = 31
+	BOTH = 33
+	PUD_OFF = 20
+	PUD_DOWN = 21
+	PUD_UP = 22
+
+	class PWM:
+		"""
+		Virtual PWM channel, only stores its configuration
+		"""
+		def __init__(self, channel, frequency):
+			self.channel = channel
+			self.frequency = frequency
+			self.duty_cycle = 0
+			self.running = False
+
+		def start(self, duty_cycle):
+			self.duty_cycle = duty_cycle
+			self.running = True
+
+		def stop(self):
+			self.running = False
+
+		def ChangeFrequency(self, value):
+			self.frequency = value
+
+		def ChangeDutyCycle(self, value):
+			self.duty_cycle = value
+
+	def __init__(self):
+		self.mode = None
+		self.levels = {}
+		self.directions = {}
+		self.callbacks = {}
+		self.analog = {}
+		self._lock = threading.Lock()
+
+	def setmode(self, mode):
+		self.mode = mode
+
+	def setup(self, channel, direction, pull_up_down=PUD_OFF, initial=LOW):
+		self.directions[channel] = direction
+		if direction == self.OUT:
+			self.levels[channel] = int(initial)
+		else:
+			# Floating inputs read LOW, pulled up inputs read HIGH
+			self.levels[channel] = int(pull_up_down == self.PUD_UP)
+
+	def input(self, channel):
+		return self.levels.get(channel, self.LOW)
+
+	def output(self, channel, value):
+		# Lists of channels and values are written together, as with RPi.GPIO
+		if isinstance(channel, (list, tuple)):
+			values = value if isinstance(value, (list, tuple)) else [value] * len(channel)
+			for channel, value in zip(channel, values):
+				self.output(channel, value)
+			return
+
+		if self.directions.get(channel) != self.OUT:
+			raise errors.WrongPinType("Channel " + str(channel) + " is not set up as an output")
+		self.levels[channel] = int(value)
+
+	def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+		self.callbacks[channel] = (edge, callback)
+
+	def remove_event_detect(self, channel):
+		self.callbacks.pop(channel, None)
+
+	def set_input(self, channel, value):
+		"""
+		Drive an input channel from outside, as the hardware would
+
+		Runs the channel's event callback (if any) on the calling thread
+		"""
+		value = int(value)
+		with self._lock:
+			previous = self.levels.get(channel, self.LOW)
+			self.levels[channel] = value
+
+		edge, callback = self.callbacks.get(channel, (None, None))
+		if callback is None or previous == value:
+			return
+
+		# Only call back for the edges that were asked for
+		if edge == self.BOTH or edge == (self.RISING if value else self.FALLING):
+			callback(channel)
+
+	def set_analog(self, channel, value):
+		"""
+		Set the value (0.0 - 1.0) read from an analog channel
+		"""
+		self.analog[channel] = float(value)
+
+	def read_analog(self, channel):
+		return self.analog.get(channel, 0.0)
+
+	def cleanup(self, channel=None):
+		if channel is None:
+			self.levels.clear()
+			self.directions.clear()
+			self.callbacks.clear()
+			self.analog.clear()
+		else:
+			self.levels.pop(channel, None)
+			self.directions.pop(channel, None)
+			self.callbacks.pop(channel, None)
+			self.analog.pop(channel, None)
+
+
+# The virtual native GPIO library lives in this module, nothing to import
+native_gpio = VirtualGPIO()
+
+
+class Pin(anygpio.Pin):
+	"""
+	Derived class for storing GPIO pin configurations and related methods
+
+	Attributes:
+		name			User defined pin name
+		_id				self.id private variable
+		id				Pin ID as identified by native_gpio
+							Could be int (10) or could be string ("p9_10")
+		number			Pin number as integer
+							Used as id on systems such as RPi and Omega2
+							Used in combination with header info for BeagleBone
+		header			Physical header on which pin is located
+							Used in systems like BeagleBone
+								(id="p" + self.header + "_" + pin.number)
+		is_analog		Is analog pin. False if digital, True if analog
+		action			Stores the function that should be called when:
+							(value() == desired_value) && GPIO._watching
+		desired_value	The desired value of a pin. This should be 1
+							Will be compared to value()
+		supports		Stores Supports() instance for pin support configurations
+		native			Native GPIO pin object if applicable
+	"""
+
+	def __init__(self, id, name=None, action=anygpio.do_nothing, **kwargs):
+		"""
+		Sets default values and constructs instance of Pin
+		"""
+		super().__init__(id, name, action, **kwargs)
+
+		# TEMPLATE: Parse number and header (if applicable) from id by running setter
+		self.id = self._id
+
+	# This has to be here to be able so change setter method
+	@property
+	def id(self):
+		"""
+		Getter for self._id
+
+		Pin ID as identified by native_gpio
+		Could be int (01) or could be string ("p9_10")
+		"""
+		return self._id
+
+	@id.setter
+	def id(self, value):
+		"""
+		Setter function for self._id
+		"""
+		self._id = value
+
+		# TEMPLATE: If id is just the pin number (int), set that here too
+		self.number = value
+
+	def destroy(self):
+		"""
+		Remove pin configuration through native pin object then drop pin
+
+		Subsequently calls GPIO.drop_pin()
+		"""
+		# TEMPLATE: Add native pin deconfig code before drop_pin() if needed
+		wrapper.drop_pin(self)
+
+
+class InputPin(Pin, anygpio.InputPin):
+	"""
+	Derived class for storing GPIO input pin configurations and related methods
+	"""
+
+	def setup(self):
+		"""
+		Initialize the input pin with the native_gpio
+
+		Initialized with pull up resistor (if available)
+		"""
+		# TEMPLATE: Initialize the input pin with the native_gpio
+		native_gpio.setup(self.id, native_gpio.IN, pull_up_down=wrapper._native_pull_up_down(self.pull_up_down))
+
+	def value(self):
+		"""
+		Use this to return a curated, semantic value from the pins input for watch()
+
+		This should return (0 or 1) for INACTIVE and ACTIVE respectively
+		If there is a pull up resistor this should return 0 for HIGH and 1 for LOW
+		"""
+		# TEMPLATE: Change this if native_gpio.input() returns 1 when button is pressed
+		return int(not self.input() if self.pull_up_down else self.input())
+
+	def input(self):
+		"""
+		Get input value of pin from the native GPIO library
+		"""
+		# TEMPLATE: Get input value of pin with native_gpio
+		return native_gpio.input(self.id)
+
+	def _add_event(self, rising_or_falling, action, bounce):
+		"""
+		Register an event callback with the native_gpio
+		"""
+
+		# TEMPLATE: Set the default bouncetime in milliseconds (300), 0 disables it
+		bounce = 300 if bounce is None else bounce
+
+		# TEMPLATE: Call the native add_event_detect function
+		if bounce:
+			native_gpio.add_event_detect(self.id, rising_or_falling, action, bouncetime=bounce)
+		else:
+			native_gpio.add_event_detect(self.id, rising_or_falling, action)
+
+	def _remove_event(self):
+		"""
+		Call the native remove_event_detect() method
+		"""
+
+		# TEMPLATE: Call the native remove_event_detect() method
+		native_gpio.remove_event_detect(self.id)
+
+	def _native_rising_falling(*args):
+		"""
+		Call the wrapper._native_rising_falling() method
+
+		This has to be here to have access to the wrapper variable
+		"""
+
+		return wrapper._native_rising_falling(*args[1:])
+
+	def _native_both(self):
+		"""
+		Call the wrapper._native_both() method
+
+		This has to be here to have access to the wrapper variable
+		"""
+
+		return wrapper._native_both()
+
+
+# TEMPLATE: Inherit from InputPin if output pins can be read
+class OutputPin(anygpio.OutputPin, InputPin):
+	"""
+	Derived class for storing GPIO input pin configurations and related methods
+
+	Inherits from InputPin since virtual output pins can be read
+
+	Attributes:
+		initial_value	If the pin is an output, this determines initial state
+							(0 or 1)
+	"""
+
+	def output(self, value):
+		"""
+		Output the desired value to the pin
+
+		value should be (0 or 1).
+		native_gpio.outputToPin(pin.id, GPIO._native_high_or_low(value))
+		"""
+		# TEMPLATE: Output the desired value to the pin
+		return native_gpio.output(self.id, value)
+
+	def setup(self):
+		"""
+		Initialize the output pin with the native_gpio
+		"""
+		# TEMPLATE: Initialize the output pin with the native_gpio
+		native_gpio.setup(self.id, native_gpio.OUT, initial=wrapper._native_high_or_low(self.initial_value))
+
+
+class PWMPin(anygpio.PWMPin, OutputPin):
+	"""
+	Derived class for storing GPIO PWM pin configurations and related methods
+
+	Attributes:
+		frequency		Array of configured pins
+		duty_cycle		Stores Support() instance for system-wide support configurations
+		_running		Is pwm running on this pin?
+	"""
+
+	def setup(self, frequency=None, duty_cycle=None):
+		"""
+		Initialize the PWM pin with the native_gpio
+		"""
+		# Set attributes to parameters if set
+		self.frequency = frequency or self.frequency
+
+		# TEMPLATE: Set default duty_cycle to 0 (change if necessary)
+		self.duty_cycle = duty_cycle or 0
+
+		# Run OutputPin.setup() to set up as output pin first if needed
+		OutputPin.setup(self)
+
+		# Setup the native pin
+		# TEMPLATE: Native PWM pin setup
+		self.native = native_gpio.PWM(self.id, self.frequency)
+
+	def start(self, duty_cycle=None):
+		"""
+		Start PWM at specified duty_cycle
+		"""
+
+		# Set attributes to parameters
+		self.duty_cycle = duty_cycle or self.duty_cycle
+
+		# TEMPLATE: Start PWM on the native_gpio
+		self.native.start(self.duty_cycle)
+
+		# PWM is running
+		self._running = True
+
+	def stop(self):
+		"""
+		Stop PWM
+		"""
+
+		# TEMPLATE: Stop PWM on the native_gpio
+		self.native.stop()
+
+		# PWM is not running
+		self._running = False
+
+	def change_frequency(self, value):
+		"""
+		Update the PWM frequency
+		"""
+
+		# TEMPLATE: Run native ChangeFrequency function
+		self.native.ChangeFrequency(value)
+
+		# Store the new frequency
+		self.frequency = value
+
+	def change_duty_cycle(self, value):
+		"""
+		Update the PWM duty cycle
+		"""
+
+		# TEMPLATE: Run native ChangeDutyCycle function
+		self.native.ChangeDutyCycle(value)
+
+		# Store the new duty cycle
+		self.duty_cycle = value
+
+	def destroy(self):
+		"""
+		Remove PWM pin configuration through native pin object then drop pin
+
+		Stops PWM on pin, deconfigs, then calls GPIO.drop_pin()
+		"""
+		# TEMPLATE: If needed, do native pin deinit
+		self.stop()
+		wrapper.drop_pin(self)
+
+
+class AnalogInputPin(Pin, anygpio.AnalogInputPin):
+	"""
+	Derived class for storing analog input pin configurations and related methods
+
+	Values are set with native_gpio.set_analog(), raw values are 12 bit counts
+	"""
+
+	def setup(self):
+		"""
+		Initialize the analog input pin with the native_gpio
+		"""
+		native_gpio.analog.setdefault(self.id, 0.0)
+
+	def read(self):
+		"""
+		Returns the input as a fraction of full scale (0.0 - 1.0)
+		"""
+		return native_gpio.read_analog(self.id)
+
+	def read_raw(self):
+		"""
+		Returns the input in 12 bit ADC counts
+		"""
+		return round(native_gpio.read_analog(self.id) * 4095)
+
+	def destroy(self):
+		"""
+		Stop streaming then drop pin
+		"""
+		self.stop_stream()
+		wrapper.drop_pin(self)
+
+
+class GPIO(anygpio.GPIO):
+
+	def setup(self):
+		"""
+		Native GPIO initialization
+
+		Can be performed after GPIO.cleanup()
+		Set numbering mode, etc
+		"""
+		# TEMPLATE: Add GPIO initialization procedures here
+		self.native.setmode(self.native.BCM)
+
+	# This has to be here to use the overridden Pin class
+	def _create_Pin_instance(*args, **kwargs):
+		"""
+		Create an instance of Pin
+		"""
+		return Pin(*args[1:], **kwargs)
+
+	# This has to be here to use the overridden InputPin class
+	def _create_InputPin_instance(*args, **kwargs):
+		"""
+		Create an instance of InputPin
+		"""
+		return InputPin(*args[1:], **kwargs)
+
+	# This has to be here to use the overridden InputPin class
+	def _create_OutputPin_instance(*args, **kwargs):
+		"""
+		Create an instance of OutputPin
+		"""
+		return OutputPin(*args[1:], **kwargs)
+
+	# This has to be here to use the overridden InputPin class
+	def _create_PWMPin_instance(*args, **kwargs):
+		"""
+		Create an instance of PWMPin
+		"""
+		return PWMPin(*args[1:], **kwargs)
+
+	# This has to be here to use the overridden AnalogInputPin class
+	def _create_AnalogInputPin_instance(*args, **kwargs):
+		"""
+		Create an instance of AnalogInputPin
+		"""
+		return AnalogInputPin(*args[1:], **kwargs)
+
+	def sequence_writer(self, pins):
+		"""
+		Returns write(steps) to output sequences of bitmasks to a list of output pins
+
+		Steps are written straight into the virtual levels, like writes to
+			a memory mapped port. Each distinct sequence is converted once to
+			its channels and (channel, value) pairs per step
+		"""
+		ids = [pin.id for pin in pins]
+		native_sequences = {}
+		levels = native_gpio.levels
+		directions = native_gpio.directions
+
+		def write(steps):
+			native = native_sequences.get(steps)
+			if native is None:
+				sequence = [_native_step(ids, *step) for step in steps]
+				channels = {channel for step_channels, _ in sequence for channel in step_channels}
+				native = native_sequences[steps] = (channels, [tuple(zip(*step)) for step in sequence])
+
+			channels, sequence = native
+			for channel in channels:
+				if directions.get(channel) != native_gpio.OUT:
+					raise errors.WrongPinType("Channel " + str(channel) + " is not set up as an output")
+			for pairs in sequence:
+				levels.update(pairs)
+		return write
+
+	# TEMPLATE: Change to LOW or HIGH of native_gpio
+	def _native_high_or_low(self, value):
+		"""
+		Returns LOW or HIGH value from native_gpio
+
+		Value can be (0 or 1) or (True or False)
+		"""
+		return native_gpio.HIGH if value else native_gpio.LOW
+
+	# This has to be here to use the overridden InputPin class
+	def _get_all_input_pins(self):
+		"""
+		Get all input pins from self.pins
+
+		Must be included in wrapper GPIO class to use overridden InputPin Class
+		Since OutputPins can also be read in some systems, they can inherit from InputPin
+		This returns all InputPins (including OutputPins which are derived from InputPin)
+		"""
+		return [pin for pin in self.pins.values() if isinstance(pin, InputPin) and not isinstance(pin, PWMPin)]
+
+	# This has to be here to use the overridden InputPin class
+	def _get_input_pins_only(self):
+		"""
+		Get all input pins from self.pins
+
+		Must be included in wrapper GPIO class to use overridden InputPin Class
+		Since OutputPins can also be read in some systems, they can inherit from InputPin
+		This returns only InputPins
+		"""
+		return [pin for pin in self.pins.values() if isinstance(pin, InputPin) and not isinstance(pin, OutputPin)]
+
+	def _native_pull_up_down(self, value):
+		"""
+		Returns GPIO.PUD_UP (1) or GPIO.PUD_DOWN (0) or None (None)
+		"""
+
+		self.supports.require('pull_up_down')
+
+		if value == 0:
+			# Pull down resistor
+			return native_gpio.PUD_DOWN
+
+		elif value == 1:
+			# Pull up resistor
+			return native_gpio.PUD_UP
+
+		else:
+			# (None) No pull up or pull down resistor (floating)
+			return native_gpio.PUD_OFF
+
+	# TEMPLATE: Change to RISING and FALLING of native_gpio
+	def _native_rising_falling(self, value):
+		"""
+		Returns GPIO.RISING (1) or GPIO.FALLING (0)
+		"""
+
+		self.supports.require('events')
+
+		return (native_gpio.RISING if value else native_gpio.FALLING)
+
+	# TEMPLATE: Change to BOTH of native_gpio
+	def _native_both(self):
+		"""
+		Returns GPIO.BOTH (RISING and FALLING)
+		"""
+
+		self.supports.require('events')
+
+		return native_gpio.BOTH
+
+	def cleanup(self):
+		"""
+		Run the native GPIO cleanup() function if available
+
+		Should also _destroy_all_pins()
+		"""
+		self._destroy_all_pins()
+
+		# TEMPLATE: run native GPIO cleanup() function if available
+		native_gpio.cleanup()
+
+
+
+
+def _native_step(ids, mask, changed):
+	"""
+	Returns the ([channels], [values]) of a (mask, changed) step
+	"""
+	channels = []
+	values = []
+	for index, id in enumerate(ids):
+		bit = 1 << index
+		if changed & bit:
+			channels.append(id)
+			values.append(native_gpio.HIGH if mask & bit else native_gpio.LOW)
+	return channels, values
+
+
+# wrapper is what will be imported by __init__.py
+wrapper = GPIO()
+
+
+# TEMPLATE: Set GPIO Supports:
+wrapper.supports.pwm = True
+wrapper.supports.pull_up_down = True
+wrapper.supports.events = True
+wrapper.supports.analog = True
+
+
+# Set the system to the name of the file
+wrapper.system = Path(__file__).stem
+
+# Link the native GPIO library so it can be accessed directly
+wrapper.native = native_gpio
+
+# Do native GPIO initialization
+wrapper.setup()
@@ -0,0 +1,248 @@
+"""
+anygpio benchmarks, run on the Virtual wrapper (no board needed)
+
+Run and save the results:
+	python benchmarks/bench.py -o before.json
+
+Compare two runs, exits with 1 if anything got slower than the threshold:
+	python benchmarks/bench.py --compare before.json after.json
+"""
+import os, sys, json, time, platform, argparse, subprocess, threading, contextlib, io
+
+# Benchmark the checkout this file is in
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Numbers of pins for the setup_pin()/cleanup() benchmarks
+PIN_COUNTS = (10, 100, 1000)
+
+# Default regression threshold for --compare, in percent
+THRESHOLD = 10
+
+
+def best_of(function, repeat=5):
+	"""
+	Returns the fastest of repeat runs of function() in seconds
+	"""
+	best = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		function()
+		elapsed = time.perf_counter() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return best
+
+
+def ops_per_second(function, count=100000):
+	"""
+	Returns how many calls of function() run per second (best of 5)
+	"""
+	def run():
+		for _ in range(count):
+			function()
+	return count / best_of(run)
+
+
+def bench_import():
+	"""
+	Time to import anygpio in a new interpreter
+	"""
+	command = [sys.executable, "-c", "import anygpio"]
+	environment = dict(os.environ, PYTHONPATH=ROOT)
+
+	def run():
+		subprocess.run(command, env=environment, capture_output=True, check=True)
+
+	# Subtract the interpreter startup
+	startup = best_of(lambda: subprocess.run([sys.executable, "-c", "pass"], capture_output=True, check=True))
+	return {"import_s": max(best_of(run) - startup, 0)}
+
+
+def bench_setup_cleanup(GPIO):
+	"""
+	Time to set up then clean up N input pins
+	"""
+	results = {}
+	for count in PIN_COUNTS:
+		setup = cleanup = None
+		for _ in range(3):
+			start = time.perf_counter()
+			for number in range(count):
+				GPIO.setup_pin(number)
+			middle = time.perf_counter()
+			GPIO.cleanup()
+			end = time.perf_counter()
+			GPIO.setup()
+
+			setup = min(setup or middle - start, middle - start)
+			cleanup = min(cleanup or end - middle, end - middle)
+
+		results["setup_pin_" + str(count) + "_s"] = setup
+		results["cleanup_" + str(count) + "_s"] = cleanup
+	return results
+
+
+def bench_io(GPIO):
+	"""
+	input()/output() calls and pin() lookups per second
+	"""
+	GPIO.setup_pin(4, "BUTTON")
+	GPIO.setup_pin(17, "LED", out=True)
+	button = GPIO.pin(4)
+	led = GPIO.pin(17)
+
+	results = {
+		"input_per_s": ops_per_second(button.input),
+		"output_per_s": ops_per_second(lambda: led.output(1)),
+		"pin_by_id_per_s": ops_per_second(lambda: GPIO.pin(17)),
+		"pin_by_name_per_s": ops_per_second(lambda: GPIO.pin("LED"), 10000),
+	}
+	GPIO.cleanup()
+	GPIO.setup()
+	return results
+
+
+def bench_watch(GPIO, pins=16, duration=1):
+	"""
+	watch() loop ticks per second over 16 input pins
+	"""
+	for number in range(pins):
+		GPIO.setup_pin(number)
+
+	# Count the ticks by counting the tests of one pin
+	ticks = [0]
+	pin = GPIO.pin(0)
+	test = pin.test
+	def counted_test():
+		ticks[0] += 1
+		return test()
+	pin.test = counted_test
+
+	timer = threading.Timer(duration, GPIO.stop_watching)
+	timer.start()
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(io.StringIO()):
+		GPIO.watch(interval=0)
+	elapsed = time.perf_counter() - start
+
+	GPIO.cleanup()
+	GPIO.setup()
+	return {"watch_ticks_per_s": ticks[0] / elapsed}
+
+
+def bench_callback_latency(GPIO, events=20000):
+	"""
+	Edge to end of action latency, direct and through the event queue
+	"""
+	native = GPIO.native
+	results = {}
+
+	for queued in (False, True):
+		GPIO.setup_pin(4)
+		pin = GPIO.pin(4)
+		pin.track_latency()
+		done = threading.Semaphore(0)
+		pin.event(action=lambda *_: done.release(), both=True, queue=queued or None)
+
+		for _ in range(events):
+			native.set_input(4, not native.input(4))
+			# Wait for each action so queueing delay isn't measured
+			done.acquire()
+
+		# Direct events are not timestamped before the action, only its run is recorded
+		summary = pin.latency.summary()["total" if queued else "run"]
+		prefix = "queued_latency_" if queued else "direct_latency_"
+		results[prefix + "p50_ns"] = summary["p50"]
+		results[prefix + "p99_ns"] = summary["p99"]
+		GPIO.cleanup()
+		GPIO.setup()
+
+	return results
+
+
+def run():
+	"""
+	Run every benchmark, returns the results file contents as a dict
+	"""
+	from protocols import bench_protocols
+	from encoder import bench_encoder
+
+	results = bench_import()
+
+	from anygpio import GPIO
+	for benchmark in (bench_setup_cleanup, bench_io, bench_watch, bench_callback_latency, bench_protocols, bench_encoder):
+		results.update(benchmark(GPIO))
+
+	return {
+		"commit": git_commit(),
+		"python": platform.python_version(),
+		"machine": platform.machine(),
+		"time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+		"results": results,
+	}
+
+
+def git_commit():
+	"""
+	Returns the commit of the checkout, None outside a git repository
+	"""
+	try:
+		return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def compare(before, after, threshold=THRESHOLD):
+	"""
+	Print the change of every result, returns the names of regressions
+
+	Results ending in _per_s are better higher, the others (times) lower
+	"""
+	regressions = []
+	print("{:<28} {:>14} {:>14} {:>8}".format("benchmark", str(before["commit"]), str(after["commit"]), "change"))
+
+	for name, old in before["results"].items():
+		new = after["results"].get(name)
+		if new is None or not old:
+			continue
+
+		change = (new - old) / old * 100
+		worse = -change if name.endswith("_per_s") else change
+		flag = ""
+		if worse > threshold:
+			flag = "  REGRESSION"
+			regressions.append(name)
+		print("{:<28} {:>14.6g} {:>14.6g} {:>+7.1f}%{}".format(name, old, new, change, flag))
+
+	return regressions
+
+
+def main():
+	parser = argparse.ArgumentParser(description="anygpio benchmarks (Virtual wrapper)")
+	parser.add_argument("-o", "--output", help="Save the results as JSON to this file")
+	parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two saved results")
+	parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Regression threshold in percent (default 10)")
+	args = parser.parse_args()
+
+	if args.compare:
+		with open(args.compare[0]) as file:
+			before = json.load(file)
+		with open(args.compare[1]) as file:
+			after = json.load(file)
+		sys.exit(1 if compare(before, after, args.threshold) else 0)
+
+	# Run on the Virtual wrapper, see protocols.py for benchmarks on a board
+	os.environ["ANYGPIO_SBC"] = "Virtual"
+
+	report = run()
+	for name, value in report["results"].items():
+		print("{:<28} {:>14.6g}".format(name, value))
+
+	if args.output:
+		with open(args.output, "w") as file:
+			json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+	main()
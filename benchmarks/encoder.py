@@ -0,0 +1,78 @@
+"""
+Quadrature encoder throughput on any wrapper (Virtual by default)
+
+On a board, with the pins wired to nothing (or to the encoder):
+	ANYGPIO_SBC=RPi python benchmarks/encoder.py --pins 5 6 -o rpi.json
+
+The edge callback is called directly, so this is the highest edge rate
+	the Python side keeps up with. The native library's own callback
+	dispatch comes on top of it
+
+Results can be compared with bench.py --compare
+"""
+import os, sys, json, argparse
+
+from bench import ROOT, ops_per_second, git_commit
+
+# A, B
+PINS = (5, 6)
+
+# Edges decoded per batch
+BATCH = 4096
+
+
+def bench_encoder(GPIO, pins=PINS):
+	"""
+	Edges per second through the edge callback and through decode()
+	"""
+	from anygpio.encoder import QuadratureEncoder, EDGE
+
+	a, b = pins
+	GPIO.setup_pin(a)
+	GPIO.setup_pin(b)
+	encoder = QuadratureEncoder(GPIO, a, b)
+	edge = encoder._edge_callback()
+
+	def callback():
+		edge(a)
+
+	def decode():
+		# One forward revolution of states per 4 edges
+		encoder._edges.extend((index, EDGE, (0, 1, 3, 2)[index & 3]) for index in range(BATCH))
+		encoder.decode()
+
+	results = {
+		"encoder_callback_edges_per_s": ops_per_second(callback),
+		"encoder_decode_edges_per_s": ops_per_second(decode, 100) * BATCH,
+	}
+	# Both stages run for every edge
+	callback_ns = 1e9 / results["encoder_callback_edges_per_s"]
+	decode_ns = 1e9 / results["encoder_decode_edges_per_s"]
+	results["encoder_edges_per_s"] = 1e9 / (callback_ns + decode_ns)
+
+	encoder.close()
+	GPIO.cleanup()
+	GPIO.setup()
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description="anygpio quadrature encoder benchmarks")
+	parser.add_argument("--pins", type=int, nargs=2, default=PINS, metavar=("A", "B"), help="Pins to use (default 5 6)")
+	parser.add_argument("-o", "--output", help="Save the results as JSON to this file")
+	args = parser.parse_args()
+
+	os.environ.setdefault("ANYGPIO_SBC", "Virtual")
+	from anygpio import GPIO
+
+	results = bench_encoder(GPIO, args.pins)
+	for name, value in results.items():
+		print("{:<28} {:>14.6g}".format(name, value))
+
+	if args.output:
+		with open(args.output, "w") as file:
+			json.dump({"commit": git_commit(), "sbc": os.environ["ANYGPIO_SBC"], "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+	main()
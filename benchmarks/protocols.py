@@ -0,0 +1,76 @@
+"""
+Bit-banged protocol throughput on any wrapper (Virtual by default)
+
+On a board, with the pins wired to nothing (or to the devices):
+	ANYGPIO_SBC=RPi python benchmarks/protocols.py --pins 17 22 27 6 -o rpi.json
+
+Results can be compared with bench.py --compare
+"""
+import os, sys, json, argparse
+
+from bench import ROOT, ops_per_second, git_commit
+
+# data/MOSI/SDA, clock, latch/cs, MISO
+PINS = (17, 22, 27, 6)
+
+# Bytes per transfer
+TRANSFER = bytes(range(32))
+
+
+def bench_protocols(GPIO, pins=PINS):
+	"""
+	Bytes per second of each protocol engine, and of a plain output() loop
+	"""
+	from anygpio import protocols
+
+	data, clock, latch, miso = pins
+	for number in (data, clock, latch):
+		GPIO.setup_pin(number, out=True)
+	GPIO.setup_pin(miso)
+	data_pin, clock_pin = GPIO.pin(data), GPIO.pin(clock)
+
+	def output_loop():
+		# What the engines replace: one output() per data bit and clock edge
+		for byte in TRANSFER:
+			for bit in range(7, -1, -1):
+				data_pin.output((byte >> bit) & 1)
+				clock_pin.output(1)
+				clock_pin.output(0)
+
+	shift_register = protocols.ShiftRegister(GPIO, data, clock, latch)
+	spi = protocols.SoftSPI(GPIO, clock, data, miso=miso, cs=latch)
+	i2c = protocols.SoftI2C(GPIO, clock, data, check_ack=False)
+	count = 200
+	results = {
+		"output_loop_bytes_per_s": ops_per_second(output_loop, count) * len(TRANSFER),
+		"shift_register_bytes_per_s": ops_per_second(lambda: shift_register.write(TRANSFER), count) * len(TRANSFER),
+		"spi_write_bytes_per_s": ops_per_second(lambda: spi.write(TRANSFER), count) * len(TRANSFER),
+		"spi_transfer_bytes_per_s": ops_per_second(lambda: spi.transfer(TRANSFER), count) * len(TRANSFER),
+		"i2c_write_bytes_per_s": ops_per_second(lambda: i2c.write(0x40, TRANSFER), count) * len(TRANSFER),
+	}
+
+	GPIO.cleanup()
+	GPIO.setup()
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description="anygpio bit-banged protocol benchmarks")
+	parser.add_argument("--pins", type=int, nargs=4, default=PINS, metavar=("DATA", "CLOCK", "LATCH", "MISO"), help="Pins to use (default 17 22 27 6)")
+	parser.add_argument("-o", "--output", help="Save the results as JSON to this file")
+	args = parser.parse_args()
+
+	os.environ.setdefault("ANYGPIO_SBC", "Virtual")
+	from anygpio import GPIO
+
+	results = bench_protocols(GPIO, args.pins)
+	for name, value in results.items():
+		print("{:<28} {:>14.6g}".format(name, value))
+
+	if args.output:
+		with open(args.output, "w") as file:
+			json.dump({"commit": git_commit(), "sbc": os.environ["ANYGPIO_SBC"], "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+	main()
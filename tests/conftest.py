@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+# The tests run against the Virtual wrapper, selected before anygpio is imported
+os.environ["ANYGPIO_SBC"] = "Virtual"
+
+
+@pytest.fixture(autouse=True)
+def clean_gpio():
+	"""
+	Destroy the pins a test set up and reset the virtual native state
+	"""
+	from anygpio import GPIO
+
+	yield GPIO
+	GPIO.cleanup()
+	GPIO.setup()
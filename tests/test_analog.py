@@ -0,0 +1,80 @@
+"""
+Analog input pins and block streaming, on the Virtual wrapper
+"""
+import time
+
+import pytest
+
+from anygpio import GPIO, analog
+from anygpio.wrappers.Virtual import native_gpio
+
+
+def wait_for(condition, timeout=2):
+	deadline = time.monotonic() + timeout
+	while not condition() and time.monotonic() < deadline:
+		time.sleep(0.001)
+
+
+def test_read():
+	GPIO.setup_analog(220)
+	pin = GPIO.pin(220)
+	native_gpio.set_analog(220, 0.5)
+	assert pin.read() == 0.5
+	assert pin.read_raw() == 2048
+
+
+def test_summary():
+	assert analog.summary(memoryview(bytes([1, 2, 6]))) == {"min": 1, "max": 6, "mean": 3}
+	assert analog.summary([]) == {"min": None, "max": None, "mean": None}
+
+
+def test_stream_blocks():
+	GPIO.setup_analog(221)
+	native_gpio.set_analog(221, 0.25)
+	pin = GPIO.pin(221)
+	blocks = []
+	stream = pin.start_stream(2000, lambda samples, started: blocks.append((analog.summary(samples), started)), block=16, blocks=4, numpy=False)
+
+	wait_for(lambda: len(blocks) >= 2)
+	pin.stop_stream()
+
+	assert pin.stream is None
+	assert len(stream.buffer) == 64
+	summary, started = blocks[0]
+	assert summary == {"min": 0.25, "max": 0.25, "mean": 0.25}
+	assert blocks[1][1] > started
+	assert stream.stats()["filled"] >= 2
+
+
+def test_views_share_the_buffer():
+	GPIO.setup_analog(222)
+	stream = analog.AnalogStream(GPIO.pin(222), 1000, block=4, blocks=2, numpy=False)
+	stream.buffer[5] = 1.0
+	assert stream.views[1][1] == 1.0
+	assert stream.views[1].obj is stream.buffer
+
+
+def test_numpy_buffer():
+	pytest.importorskip("numpy")
+	GPIO.setup_analog(223)
+	stream = analog.AnalogStream(GPIO.pin(223), 1000, block=4, blocks=2, numpy=True)
+	assert stream.buffer.dtype.name == "float32"
+	assert stream.views[1].base is stream.buffer
+
+
+def test_numpy_required():
+	try:
+		import numpy
+	except ImportError:
+		with pytest.raises(ImportError):
+			analog._numpy(True)
+	assert analog._numpy(False) is None
+
+
+def test_restart_replaces_the_stream():
+	GPIO.setup_analog(224)
+	pin = GPIO.pin(224)
+	first = pin.start_stream(1000, block=8, numpy=False)
+	second = pin.start_stream(1000, block=8, numpy=False)
+	assert not first._running and second._running
+	pin.stop_stream()
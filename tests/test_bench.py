@@ -0,0 +1,55 @@
+"""
+Comparing saved benchmark results with benchmarks/bench.py
+"""
+import os, sys, json, subprocess, importlib.util
+
+import pytest
+
+
+BENCH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "bench.py")
+
+
+@pytest.fixture(scope="module")
+def bench():
+	spec = importlib.util.spec_from_file_location("bench", BENCH)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+
+def results(commit, **values):
+	return {"commit": commit, "results": values}
+
+
+def test_compare_flags_regressions_by_direction(bench, capsys):
+	before = results("aaa", input_per_s=1000, setup_10_s=1.0, output_per_s=1000, cleanup_10_s=1.0, watch_per_s=0)
+	after = results("bbb", input_per_s=850, setup_10_s=1.2, output_per_s=1200, cleanup_10_s=0.5, watch_per_s=10)
+
+	# Fewer calls per second and longer times are worse, missing or zero baselines are skipped
+	assert bench.compare(before, after) == ["input_per_s", "setup_10_s"]
+	output = capsys.readouterr().out
+	assert "aaa" in output and "bbb" in output
+	assert "watch_per_s" not in output
+
+
+def test_compare_threshold(bench, capsys):
+	before = results("aaa", input_per_s=1000)
+	after = results("bbb", input_per_s=850)
+	assert bench.compare(before, after, threshold=20) == []
+	assert "REGRESSION" not in capsys.readouterr().out
+
+
+def test_compare_exit_status(tmp_path):
+	paths = []
+	for name, value in (("before", 1000), ("after", 500), ("same", 1000)):
+		path = tmp_path / (name + ".json")
+		path.write_text(json.dumps(results(name, input_per_s=value)))
+		paths.append(str(path))
+
+	def run(*args):
+		return subprocess.run([sys.executable, BENCH, "--compare", *args], capture_output=True, text=True)
+
+	regressed = run(paths[0], paths[1])
+	assert regressed.returncode == 1
+	assert "REGRESSION" in regressed.stdout
+	assert run(paths[0], paths[2]).returncode == 0
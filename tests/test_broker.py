@@ -0,0 +1,170 @@
+"""
+End to end tests of the broker and its client over a Unix socket, on the Virtual wrapper
+"""
+import json, time, socket, threading
+
+import pytest
+
+from anygpio import GPIO, errors
+from anygpio.broker import Broker, Client, OP_CALL
+from anygpio.wrappers.Virtual import native_gpio
+
+
+@pytest.fixture
+def client(tmp_path):
+	broker = Broker(GPIO, str(tmp_path / "anygpio.sock")).start()
+	client = Client(broker.path)
+	yield client
+	client.close()
+	broker.shutdown()
+
+
+def wait_for(condition, timeout=2):
+	"""
+	Poll condition until it is true or timeout seconds have passed
+	"""
+	end = time.monotonic() + timeout
+	while not condition() and time.monotonic() < end:
+		time.sleep(0.001)
+	return condition()
+
+
+def test_input(client):
+	pin = client.setup_pin(300, "BROKER_INPUT")
+	assert pin.type == "input"
+
+	native_gpio.set_input(300, 1)
+	assert pin.input() == 1
+	native_gpio.set_input(300, 0)
+	assert pin.input() == 0
+	assert client.pin("BROKER_INPUT").id == 300
+
+
+def test_toggle(client):
+	pin = client.setup_pin(301, out=True)
+	pin.output(0)
+
+	assert pin.toggle() == 1
+	assert native_gpio.levels[301] == 1
+	assert pin.toggle() == 0
+	assert native_gpio.levels[301] == 0
+
+
+def test_read_and_write_pins(client):
+	for id in (302, 303, 304):
+		client.setup_pin(id, out=True)
+
+	client.write_pins({302: 1, 303: 0, 304: 1})
+	assert client.read_pins([302, 303, 304]) == [1, 0, 1]
+	assert [native_gpio.levels[id] for id in (302, 303, 304)] == [1, 0, 1]
+
+
+def test_subscribe_delivers_every_edge(client, monkeypatch):
+	pin = client.setup_pin(305)
+	native_gpio.set_input(305, 0)
+
+	# Virtual doesn't debounce, check the broker asks for no bounce time
+	bounces = []
+	add_event_detect = native_gpio.add_event_detect
+	def record(channel, edge, callback=None, bouncetime=None):
+		bounces.append(bouncetime)
+		add_event_detect(channel, edge, callback, bouncetime)
+	monkeypatch.setattr(native_gpio, "add_event_detect", record)
+
+	received = []
+	done = threading.Event()
+
+	def action(id):
+		received.append(id)
+		if len(received) == 20:
+			done.set()
+
+	pin.event(action=action, both=True)
+
+	# Edges closer together than the native default bounce time are all delivered
+	for level in (1, 0) * 10:
+		native_gpio.set_input(305, level)
+
+	assert done.wait(2)
+	assert received == [305] * 20
+	assert not any(bounces)
+
+	pin.remove_event()
+	native_gpio.set_input(305, 1)
+	time.sleep(0.05)
+	assert len(received) == 20
+
+
+def test_subscribe_bounce_is_applied_on_the_client(client):
+	pin = client.setup_pin(306)
+	native_gpio.set_input(306, 0)
+
+	received = []
+	pin.event(action=received.append, both=True, bounce=1000)
+	for level in (1, 0) * 5:
+		native_gpio.set_input(306, level)
+
+	assert wait_for(lambda: received)
+	time.sleep(0.05)
+	assert received == [306]
+
+
+def test_call_rejects_methods_not_whitelisted(client):
+	with pytest.raises(errors.BrokerError, match="Method not allowed"):
+		client.call("cleanup")
+
+	client.setup_pin(307, out=True)
+	with pytest.raises(errors.BrokerError, match="Method not allowed"):
+		client.call("setup", target=307)
+
+	request = {"target": None, "method": "_destroy_all_pins", "args": [], "kwargs": {}}
+	with pytest.raises(errors.BrokerError, match="Method not allowed"):
+		client.request(OP_CALL, json.dumps(request).encode()).result()
+
+	# The broker's pins are untouched
+	assert client.pin(307).id == 307
+
+
+def test_requests_fail_once_the_broker_is_gone(tmp_path):
+	broker = Broker(GPIO, str(tmp_path / "anygpio.sock")).start()
+	client = Client(broker.path)
+	client.setup_pin(308)
+	client.close()
+
+	assert wait_for(lambda: client._closed)
+	with pytest.raises(errors.BrokerError, match="closed"):
+		client.pin(308)
+	broker.shutdown()
+
+
+def test_analog_pins_are_described_as_analog(client):
+	GPIO.setup_analog(309, "BROKER_ANALOG")
+	assert client.pin("BROKER_ANALOG").type == "analog"
+
+
+def test_bind_replaces_only_stale_sockets(tmp_path):
+	path = str(tmp_path / "anygpio.sock")
+
+	# A socket file nobody listens on is left behind by a dead broker
+	stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	stale.bind(path)
+	stale.close()
+	broker = Broker(GPIO, path).start()
+
+	with pytest.raises(errors.BrokerError, match="already listening"):
+		Broker(GPIO, path).start()
+
+	# The running broker still serves
+	client = Client(path)
+	assert client.setup_pin(310).type == "input"
+	client.close()
+	broker.shutdown()
+
+
+def test_bind_refuses_other_files(tmp_path):
+	path = tmp_path / "anygpio.sock"
+	path.write_text("not a socket")
+
+	with pytest.raises(errors.BrokerError, match="not a socket"):
+		Broker(GPIO, str(path)).start()
+	assert path.read_text() == "not a socket"
@@ -0,0 +1,89 @@
+"""
+Logic analyzer captures and pin resolution, on the Virtual wrapper
+"""
+import threading
+
+import pytest
+
+from anygpio import GPIO, errors, capture, anygpio
+from anygpio.wrappers.Virtual import native_gpio
+
+
+def inputs(*ids):
+	for id in ids:
+		GPIO.setup_pin(id, "CAPTURE_%d" % id, pull_up_down=0)
+
+
+def test_samples(tmp_path):
+	inputs(230, 231)
+	native_gpio.set_input(231, 1)
+	path = str(tmp_path / "samples.bin")
+
+	bus = GPIO.capture([230, "CAPTURE_231"], rate=1000, duration=0.02, path=path)
+	assert (bus.kind, bus.rate, bus.records, bus.reads) == (capture.SAMPLES, 1000, 20, 20)
+	assert bus.pins == [230, 231]
+	assert bus.names == ["CAPTURE_230", "CAPTURE_231"]
+	assert list(bus.masks()) == [0b10] * 20
+	assert list(bus.levels(1)) == [1] * 20
+	assert list(bus.times())[:2] == [0, 0.001]
+
+	# Reopened from the file
+	assert list(capture.load(path).masks()) == [0b10] * 20
+
+
+def test_transitions(tmp_path):
+	inputs(232)
+	stop = threading.Event()
+
+	def toggle():
+		level = 0
+		while not stop.wait(0.002):
+			level ^= 1
+			native_gpio.set_input(232, level)
+	toggler = threading.Thread(target=toggle)
+	toggler.start()
+	try:
+		bus = GPIO.capture([232], duration=0.05, path=str(tmp_path / "transitions.bin"))
+	finally:
+		stop.set()
+		toggler.join()
+
+	assert bus.kind == capture.TRANSITIONS
+	assert bus.reads > bus.records > 2
+	levels = list(bus.levels(0))
+	# Only changes are stored
+	assert all(levels[index] != levels[index + 1] for index in range(len(levels) - 1))
+	times = list(bus.times())
+	assert times == sorted(times) and times[-1] < 0.05
+
+
+def test_capture_errors(tmp_path):
+	with pytest.raises(errors.CaptureError, match="No configured pin"):
+		GPIO.capture([233], rate=1000, duration=0.01, path=str(tmp_path / "missing.bin"))
+	with pytest.raises(errors.CaptureError, match="64 pins"):
+		capture._item_size(65)
+
+	path = tmp_path / "bad.bin"
+	path.write_bytes(b"not a capture")
+	with pytest.raises(errors.CaptureError, match="not a capture file"):
+		capture.load(str(path))
+
+
+def test_item_size():
+	assert [capture._item_size(count) for count in (1, 8, 9, 16, 17, 64)] == [1, 1, 2, 2, 4, 8]
+	assert capture._data_offset(1) % capture.ALIGN == 0
+
+
+def test_resolve_pin():
+	inputs(234)
+	pin = GPIO.pin(234)
+	assert GPIO._resolve_pin("CAPTURE_234") is pin
+	assert GPIO._resolve_pin(pin, anygpio.InputPin) is pin
+
+	with pytest.raises(errors.PinNotFound):
+		GPIO._resolve_pin("NO_SUCH_PIN")
+	# Queries for pins of the wrong kind fail right away
+	with pytest.raises(errors.WrongPinType):
+		GPIO.schedule("CAPTURE_234", 1)
+	with pytest.raises(errors.WrongPinType):
+		GPIO.ramp([pin], 50, 0.1)
@@ -0,0 +1,113 @@
+"""
+Loading pin configuration files, on the Virtual wrapper
+"""
+import json
+
+import pytest
+
+from anygpio import GPIO, config, errors
+from anygpio.wrappers import Virtual
+from anygpio.wrappers.Virtual import native_gpio
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+	monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path / "cache"))
+	monkeypatch.setattr(config, "_plans", {})
+	return tmp_path / "cache"
+
+
+def write(tmp_path, pins, name="pins.json"):
+	path = tmp_path / name
+	path.write_text(json.dumps({"pins": pins}))
+	return str(path)
+
+
+def test_load_sets_up_every_pin(tmp_path, cache):
+	presses = []
+	path = write(tmp_path, [
+		{"id": 160, "name": "CONFIG_BUTTON", "pull": "up", "event": {"edge": "falling", "bounce": 0}, "action": "press"},
+		{"id": 161, "name": "CONFIG_LED", "mode": "out"},
+		{"id": 162, "mode": "pwm", "frequency": 50, "duty_cycle": 10},
+	])
+	pins = GPIO.load_config(path, {"press": presses.append})
+
+	assert [pin.id for pin in pins] == [160, 161, 162]
+	assert GPIO.pin("CONFIG_LED") is pins[1]
+	assert native_gpio.directions[161] == native_gpio.OUT
+	assert (pins[2].frequency, pins[2].duty_cycle) == (50, 10)
+	native_gpio.set_input(160, 0)
+	assert presses == [160]
+
+	# The compiled plan is cached by file hash
+	assert len(list(cache.iterdir())) == 1
+
+
+def test_cached_plan_is_reused(tmp_path, monkeypatch):
+	path = write(tmp_path, [{"id": 163}])
+	GPIO.load_config(path)
+	GPIO.cleanup()
+	GPIO.setup()
+
+	monkeypatch.setattr(config, "_plans", {})
+	def fail(*_):
+		raise AssertionError("compiled again")
+	monkeypatch.setattr(config, "compile_plan", fail)
+	assert [pin.id for pin in GPIO.load_config(path)] == [163]
+
+
+def test_every_problem_is_reported(tmp_path):
+	path = write(tmp_path, [
+		{"name": "NO_ID"},
+		{"id": 164, "name": "TWICE", "mode": "sideways"},
+		{"id": 164, "name": "TWICE", "pull": "sideways"},
+		{"id": [165]},
+		"pin",
+	])
+	with pytest.raises(errors.ConfigError) as error:
+		GPIO.load_config(path)
+
+	message = str(error.value)
+	for problem in ("pins[0]: missing id", "pins[1]: unknown mode", "configured twice", "used twice",
+			"pins[2]: unknown pull", "pins[3]: id must be", "pins[4]: expected a table"):
+		assert problem in message
+	assert not GPIO.pins
+
+
+def test_unknown_action(tmp_path):
+	path = write(tmp_path, [{"id": 166, "action": "missing"}])
+	with pytest.raises(errors.ConfigError, match="No action named missing"):
+		GPIO.load_config(path)
+	assert not GPIO.pins
+
+
+def test_failed_events_restore_the_replaced_pins(tmp_path, monkeypatch):
+	GPIO.setup_pin(167, "OLD_LED", out=True)
+	old = GPIO.pin(167)
+	path = write(tmp_path, [{"id": 167, "name": "NEW_BUTTON", "event": True}])
+
+	def fail(*_):
+		raise RuntimeError("no edge detection")
+	monkeypatch.setattr(Virtual.InputPin, "_add_event", fail)
+	with pytest.raises(RuntimeError):
+		GPIO.load_config(path)
+
+	assert GPIO.pin(167) is old
+	assert GPIO.pin("NEW_BUTTON") is False
+	# The old pin is set up again over the new pin's native setup
+	assert native_gpio.directions[167] == native_gpio.OUT
+
+
+def test_failed_setup_restores_pins_not_registered_yet(tmp_path, monkeypatch):
+	GPIO.setup_pin(168, "OLD_OUTPUT", out=True)
+	old = GPIO.pin(168)
+	path = write(tmp_path, [{"id": 168}, {"id": 169, "mode": "pwm", "frequency": 50}])
+
+	def fail(*_):
+		raise RuntimeError("setup failed")
+	monkeypatch.setattr(Virtual.PWMPin, "setup", fail)
+	with pytest.raises(RuntimeError):
+		GPIO.load_config(path)
+
+	assert list(GPIO.pins.values()) == [old]
+	assert native_gpio.directions[168] == native_gpio.OUT
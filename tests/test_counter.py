@@ -0,0 +1,85 @@
+"""
+Edge counters and count rate reports, on the Virtual wrapper
+"""
+import threading
+
+from anygpio import GPIO
+from anygpio.wrappers.Virtual import native_gpio
+
+
+def pulses(id, count):
+	for _ in range(count):
+		native_gpio.set_input(id, 0)
+		native_gpio.set_input(id, 1)
+
+
+def counting(id, **kwargs):
+	GPIO.setup_pin(id, "COUNTER_%d" % id)
+	return GPIO.pin(id).start_counter(**kwargs)
+
+
+def test_counts_falling_edges_of_pulled_up_inputs():
+	counter = counting(200)
+	pulses(200, 25)
+	assert counter.value == 25
+	# Reads don't count as edges
+	assert counter.value == 25
+	assert counter.total == 25
+
+
+def test_edges():
+	rising = counting(201, rising_falling=1)
+	both = counting(202, both=True)
+	pulses(201, 3)
+	pulses(202, 3)
+	assert (rising.value, both.value) == (3, 6)
+
+
+def test_reset_loses_no_edges():
+	counter = counting(203)
+	pulses(203, 10)
+	assert counter.reset() == 10
+	pulses(203, 4)
+	assert counter.value == 4
+	assert counter.total == 14
+
+
+def test_reads_while_counting():
+	counter = counting(204)
+	thread = threading.Thread(target=pulses, args=(204, 8000))
+	thread.start()
+	reads = [counter.value for _ in range(1000)]
+	thread.join()
+
+	assert reads == sorted(reads)
+	assert counter.value == counter.total == 8000
+
+
+def test_stop_counter():
+	counter = counting(205)
+	pulses(205, 2)
+	GPIO.pin(205).stop_counter()
+	pulses(205, 2)
+	assert counter.value == 2
+
+
+def test_rate_reports():
+	counters = [counting(206), counting(207)]
+	reports = []
+	done = threading.Event()
+
+	def report(counts):
+		reports.append(counts)
+		done.set()
+
+	reporter = GPIO.on_count_rates(report, interval=0.02)
+	pulses(206, 5)
+	assert done.wait(2)
+	reporter.stop()
+
+	counts = reports[0]
+	assert set(counts) == {206, 207}
+	assert counts[206]["count"] == counts[206]["delta"] == 5
+	assert counts[206]["rate"] > 0
+	assert counts[207] == {"count": 0, "delta": 0, "rate": 0.0}
+	assert counters[0].value == 5
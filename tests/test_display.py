@@ -0,0 +1,105 @@
+"""
+Multiplexed and charlieplexed display refresh, on the Virtual wrapper
+"""
+import time
+
+import pytest
+
+from anygpio import GPIO
+from anygpio.display import encode, Multiplexer, Charlieplexer, DP
+from anygpio.wrappers.Virtual import native_gpio
+
+SELECTS = (186, 187)
+SEGMENTS = (188, 189, 190)
+CHARLIE = (191, 192, 193)
+
+
+def levels(ids):
+	return [native_gpio.levels[id] for id in ids]
+
+
+def run(steps):
+	"""
+	Run (function, args) steps as the refresh thread does
+	"""
+	for function, args in steps:
+		function(*args)
+
+
+@pytest.fixture
+def multiplexer():
+	for id in SELECTS + SEGMENTS:
+		GPIO.setup_pin(id, out=True)
+	return Multiplexer(GPIO, SELECTS, SEGMENTS, rate=1000)
+
+
+def test_encode():
+	assert encode("12") == [0x06, 0x5b]
+	assert encode("1.2") == [0x06 | DP, 0x5b]
+	assert encode("..") == [DP, DP]
+	assert encode("?") == [0]
+
+
+def test_multiplexer_program(multiplexer):
+	multiplexer.show([0b101, 0b010])
+	program, start = multiplexer._pending
+	# Starts blanked with the last phase's segments
+	assert start == (0, 1, 0, 0, 0)
+
+	run(multiplexer._steps(None, start))
+	for index, (on_steps, on, off_steps, off) in enumerate(program):
+		run(on_steps)
+		assert levels(SELECTS) == [int(select == index) for select in range(2)]
+		assert levels(SEGMENTS) == [[1, 0, 1], [0, 1, 0]][index]
+		run(off_steps)
+		assert levels(SELECTS) == [0, 0]
+	assert on + off == int(1e9 / (1000 * 2))
+
+
+def test_blank_phases_and_brightness(multiplexer):
+	multiplexer.show([0b001])
+	program, start = multiplexer._pending
+	assert program[1] == ((), 0, (), int(1e9 / 2000))
+
+	multiplexer.set_brightness(0.5, duty=[0.5, 1])
+	program, start = multiplexer._pending
+	assert program[0][1] == int(1e9 / 2000 * 0.25)
+
+
+def test_refresh_swaps_frames_and_blanks_on_stop(multiplexer):
+	multiplexer.show_text("8")
+	multiplexer.start()
+	deadline = time.monotonic() + 2
+	while not multiplexer.frames and time.monotonic() < deadline:
+		time.sleep(0.001)
+	assert multiplexer._pending is None
+
+	multiplexer.show([0b011, 0b110])
+	frames = multiplexer.frames
+	while multiplexer.frames < frames + 2 and time.monotonic() < deadline:
+		time.sleep(0.001)
+	multiplexer.stop()
+
+	assert multiplexer._pending is None
+	assert multiplexer._frame == [0b011, 0b110]
+	assert levels(SELECTS) == [0, 0]
+	assert levels(SEGMENTS) == [0, 0, 0]
+
+
+def test_charlieplexer_releases_unused_pins():
+	for id in CHARLIE:
+		GPIO.setup_pin(id, out=True)
+	leds = Charlieplexer(GPIO, CHARLIE)
+	assert leds.leds == 6
+	assert [leds.led(number) for number in range(6)] == [(0, 1), (0, 2), (1, 0), (1, 2), (2, 0), (2, 1)]
+
+	leds.show([0, (2, 1)])
+	program, start = leds._pending
+	run(leds._steps(None, start))
+	run(program[0][0])
+	# Anode 0 high, cathode 1 low, pin 2 released
+	assert levels(CHARLIE[:2]) == [1, 0]
+	assert [native_gpio.directions[id] for id in CHARLIE] == [native_gpio.OUT, native_gpio.OUT, native_gpio.IN]
+
+	run(program[0][2])
+	assert native_gpio.directions[CHARLIE[0]] == native_gpio.IN
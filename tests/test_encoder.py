@@ -0,0 +1,99 @@
+"""
+Quadrature encoder decoding, on the Virtual wrapper
+"""
+import time
+
+from anygpio import GPIO, encoder as encoder_module
+from anygpio.wrappers.Virtual import native_gpio
+
+
+# A, B levels of one forward cycle (4 counts)
+FORWARD = ((0, 1), (1, 1), (1, 0), (0, 0))
+
+
+def setup_encoder(**kwargs):
+	for id in (180, 181, 182):
+		GPIO.setup_pin(id)
+		native_gpio.set_input(id, 0)
+	return GPIO.encoder(180, 181, **kwargs)
+
+
+def step(levels):
+	a, b = levels
+	if native_gpio.levels[180] != a:
+		native_gpio.set_input(180, a)
+	if native_gpio.levels[181] != b:
+		native_gpio.set_input(181, b)
+
+
+def turn(cycles):
+	sequence = FORWARD if cycles > 0 else FORWARD[::-1][1:] + FORWARD[-1:]
+	for _ in range(abs(cycles)):
+		for levels in sequence:
+			step(levels)
+
+
+def test_counts_both_directions():
+	encoder = setup_encoder()
+	turn(5)
+	assert encoder.position == 20
+	turn(-2)
+	assert encoder.position == 12
+	assert encoder.errors == 0
+
+
+def test_missed_edges_are_errors():
+	encoder = setup_encoder()
+	# Both channels change at once: 00 -> 11
+	native_gpio.levels[181] = 1
+	native_gpio.set_input(180, 1)
+	assert encoder.errors == 1
+	assert encoder.position == 0
+
+
+def test_edges_wait_for_a_read():
+	encoder = setup_encoder()
+	turn(1)
+	assert len(encoder._edges) == 4
+	assert encoder.position == 4
+	assert not encoder._edges
+
+
+def test_callbacks_decode_full_batches(monkeypatch):
+	monkeypatch.setattr(encoder_module, "BATCH", 8)
+	encoder = setup_encoder()
+	turn(3)
+	assert len(encoder._edges) == 4
+	assert encoder._position == 8
+
+
+def test_index_pulses():
+	encoder = setup_encoder(index=182, reset_on_index=True)
+	turn(2)
+	native_gpio.set_input(182, 1)
+	native_gpio.set_input(182, 0)
+	turn(1)
+
+	assert encoder.revolutions == 1
+	assert encoder.index_position == 8
+	assert encoder.position == 4
+
+
+def test_velocity_and_reset():
+	encoder = setup_encoder(window=0.05)
+	turn(10)
+	assert encoder.velocity() > 0
+	time.sleep(0.06)
+	assert encoder.velocity() == 0
+
+	encoder.reset(100)
+	turn(-1)
+	assert (encoder.position, encoder.errors) == (96, 0)
+
+
+def test_close_removes_the_callbacks():
+	encoder = setup_encoder()
+	encoder.close()
+	turn(1)
+	assert encoder.position == 0
+	assert not native_gpio.callbacks.get(180)
@@ -0,0 +1,144 @@
+"""
+Queued pin events and the dispatcher, on the Virtual wrapper
+"""
+import time, threading
+
+import pytest
+
+from anygpio import GPIO
+from anygpio.events import EventQueue, Dispatcher
+from anygpio.wrappers.Virtual import native_gpio
+
+
+class HeldDispatcher:
+	"""
+	Dispatcher that only records notifications, so queues fill up
+	"""
+	def __init__(self):
+		self.notified = []
+
+	def notify(self, queue):
+		self.notified.append(queue)
+
+
+def drain(queue):
+	events = []
+	while True:
+		event = queue.get()
+		if event is None:
+			return events
+		events.append(event[2])
+
+
+def test_queued_actions_run_in_order_on_a_worker():
+	GPIO.setup_pin(70, "QUEUED")
+	pin = GPIO.pin(70)
+	ran = []
+	done = threading.Event()
+
+	def action(*args):
+		ran.append(threading.current_thread().name)
+		if len(ran) == 4:
+			done.set()
+
+	pin.event(action, both=True, queue=True)
+	for level in (0, 1, 0, 1):
+		native_gpio.set_input(70, level)
+
+	assert done.wait(2)
+	assert set(ran) == {"anygpio-dispatcher"}
+	stats = pin.event_stats()
+	assert (stats["enqueued"], stats["dispatched"], stats["dropped"]) == (4, 4, 0)
+
+
+def test_drop_oldest():
+	dispatcher = HeldDispatcher()
+	queue = EventQueue(print, maxsize=2, dispatcher=dispatcher)
+	for event in range(5):
+		queue.put(event)
+
+	assert drain(queue) == [(3,), (4,)]
+	assert queue.stats() == {"depth": 0, "max_depth": 2, "enqueued": 5, "dispatched": 0, "dropped": 3}
+	# Only the first put notifies until a worker hands the queue back
+	assert dispatcher.notified == [queue]
+	queue.put(5)
+	assert dispatcher.notified == [queue, queue]
+
+
+def test_drop_newest():
+	queue = EventQueue(print, maxsize=2, overflow="drop_newest", dispatcher=HeldDispatcher())
+	for event in range(5):
+		queue.put(event)
+
+	assert drain(queue) == [(0,), (1,)]
+	assert queue.stats()["dropped"] == 3
+
+
+def test_unknown_overflow_policy():
+	with pytest.raises(ValueError):
+		EventQueue(print, overflow="block")
+
+
+def test_failing_action_keeps_the_worker(capsys):
+	dispatcher = Dispatcher()
+	ran = []
+	done = threading.Event()
+
+	def action(value):
+		if value == 0:
+			raise RuntimeError("boom")
+		ran.append(value)
+		done.set()
+
+	queue = EventQueue(action, dispatcher=dispatcher)
+	queue.put(0)
+	queue.put(1)
+
+	assert done.wait(2)
+	assert ran == [1]
+	assert "RuntimeError: boom" in capsys.readouterr().err
+
+
+def test_worker_takes_turns_between_queues():
+	dispatcher = Dispatcher()
+	order = []
+	done = threading.Event()
+	gate = threading.Event()
+
+	def slow(value):
+		gate.wait(2)
+		order.append(("slow", value))
+
+	def fast(value):
+		order.append(("fast", value))
+		done.set()
+
+	slow_queue = EventQueue(slow, maxsize=2, dispatcher=dispatcher)
+	fast_queue = EventQueue(fast, dispatcher=dispatcher)
+	for value in range(4):
+		slow_queue.put(value)
+	fast_queue.put(0)
+	gate.set()
+
+	assert done.wait(2)
+	# The slow queue gets maxsize events before the other queue's turn
+	assert order.index(("fast", 0)) == 2
+
+
+def test_queued_latency_records_every_stage():
+	GPIO.setup_pin(71, "QUEUED_LATENCY")
+	pin = GPIO.pin(71)
+	pin.track_latency()
+	done = threading.Event()
+	pin.event(lambda *_: done.set(), queue=True)
+
+	native_gpio.set_input(71, 0)
+	assert done.wait(2)
+
+	# The worker records after running the action
+	for _ in range(200):
+		if pin.latency.summary()["total"]["count"]:
+			break
+		time.sleep(0.005)
+	summary = pin.latency.summary()
+	assert {stage: summary[stage]["count"] for stage in summary} == {"enqueue": 1, "wait": 1, "run": 1, "total": 1}
@@ -0,0 +1,126 @@
+"""
+Button gestures and chords, on the Virtual wrapper
+
+Input pins are pulled up, so level 0 is a press
+"""
+import time
+
+import pytest
+
+from anygpio import GPIO
+from anygpio.wrappers.Virtual import native_gpio
+
+
+def button(id):
+	GPIO.setup_pin(id, "BUTTON_%d" % id)
+	pin = GPIO.pin(id)
+	pin.seen = []
+	return pin
+
+
+def record(pin, *gestures, **ms):
+	for gesture in gestures:
+		pin.on_gesture(gesture, lambda pin, gesture=gesture: pin.seen.append(gesture), ms.get(gesture))
+
+
+def press(id):
+	native_gpio.set_input(id, 0)
+
+
+def release(id):
+	native_gpio.set_input(id, 1)
+
+
+def wait_for(condition, timeout=2):
+	end = time.monotonic() + timeout
+	while not condition() and time.monotonic() < end:
+		time.sleep(0.001)
+	return condition()
+
+
+def test_click():
+	pin = button(90)
+	record(pin, "press", "release", "click")
+	press(90)
+	release(90)
+
+	assert wait_for(lambda: "click" in pin.seen)
+	assert pin.seen == ["press", "release", "click"]
+	assert pin.gestures().state == "idle"
+
+
+def test_long_press_is_not_a_click():
+	pin = button(91)
+	record(pin, "click", "long_press", "release", long_press=30)
+	press(91)
+	assert wait_for(lambda: pin.seen == ["long_press"])
+	release(91)
+
+	time.sleep(0.05)
+	assert pin.seen == ["long_press", "release"]
+
+
+def test_double_press():
+	pin = button(92)
+	record(pin, "click", "double_press", double_press=200)
+	for _ in range(2):
+		press(92)
+		release(92)
+
+	time.sleep(0.25)
+	assert pin.seen == ["double_press"]
+
+
+def test_single_press_with_double_handlers_clicks_after_the_window():
+	pin = button(93)
+	record(pin, "click", "double_press", double_press=30)
+	press(93)
+	release(93)
+	assert pin.seen == []
+	assert wait_for(lambda: pin.seen == ["click"])
+
+
+def test_handlers_share_their_time():
+	pin = button(94)
+	pin.on_long_press(print, ms=500)
+	pin.on_long_press(print)
+	pin.on_long_press(print, ms=500)
+	with pytest.raises(ValueError):
+		pin.on_long_press(print, ms=100)
+	with pytest.raises(ValueError):
+		pin.on_gesture("triple_press", print)
+
+
+def test_chord_fires_once_per_press():
+	button(95)
+	button(96)
+	chords = []
+	GPIO.on_chord(["BUTTON_95", 96], chords.append, ms=100)
+
+	press(95)
+	assert chords == []
+	press(96)
+	assert [[pin.id for pin in pins] for pins in chords] == [[95, 96]]
+
+	# Releasing one pin doesn't re-arm the chord
+	release(96)
+	press(96)
+	assert len(chords) == 1
+
+	release(95)
+	release(96)
+	press(95)
+	press(96)
+	assert len(chords) == 2
+
+
+def test_chord_outside_the_window():
+	button(97)
+	button(98)
+	chords = []
+	GPIO.on_chord([97, 98], chords.append, ms=10)
+
+	press(97)
+	time.sleep(0.03)
+	press(98)
+	assert chords == []
@@ -0,0 +1,152 @@
+"""
+Key matrix scanning and ghosting, on the Virtual wrapper
+
+The Virtual levels are replaced with a simulated matrix without diodes:
+	a column reads low when held keys connect it to a row driven low,
+	through any number of other held keys
+"""
+import time
+
+import pytest
+
+from anygpio import GPIO, keypad as keypad_module
+from anygpio.wrappers.Virtual import native_gpio
+
+ROWS = (180, 181, 182)
+COLUMNS = (183, 184, 185)
+
+
+class Matrix(dict):
+	"""
+	Virtual levels updating the columns whenever a row is written
+	"""
+	def __init__(self, levels):
+		super().__init__(levels)
+		self.held = set()
+
+	def __setitem__(self, channel, level):
+		super().__setitem__(channel, level)
+		if channel in ROWS:
+			self.settle()
+
+	def update(self, pairs):
+		for channel, level in pairs:
+			self[channel] = level
+
+	def settle(self):
+		"""
+		Pull down every column connected to a low row through held keys
+		"""
+		low = {row for row in ROWS if not self.get(row, 1)}
+		reached = set(low)
+		while True:
+			more = {ROWS[row] for row, column in self.held if COLUMNS[column] in reached}
+			more |= {COLUMNS[column] for row, column in self.held if ROWS[row] in reached}
+			if more <= reached:
+				break
+			reached |= more
+		for column in COLUMNS:
+			super().__setitem__(column, 0 if column in reached else 1)
+
+	def hold(self, *keys):
+		self.held = set(keys)
+		self.settle()
+
+
+class Scheduler:
+	"""
+	Records the scans scheduled instead of running them
+	"""
+	def __init__(self):
+		self.calls = []
+
+	def call_later(self, delay, callback):
+		self.calls.append(callback)
+
+
+@pytest.fixture
+def matrix(monkeypatch):
+	monkeypatch.setattr(keypad_module, "default_scheduler", Scheduler())
+	for row in ROWS:
+		GPIO.setup_pin(row, out=True)
+	for column in COLUMNS:
+		GPIO.setup_pin(column)
+	matrix = Matrix(native_gpio.levels)
+	monkeypatch.setattr(native_gpio, "levels", matrix)
+	return matrix
+
+
+@pytest.fixture
+def keypad(matrix):
+	keypad = GPIO.keypad(ROWS, COLUMNS, debounce=0)
+	keypad._scanning = True
+	yield keypad
+	keypad.close()
+
+
+def test_keys_pressed_and_released(matrix, keypad):
+	matrix.hold((0, 1), (2, 2))
+	keypad._scan()
+	assert sorted(keypad.pressed()) == [(0, 1), (2, 2)]
+	# The rows are left low for the next wake up
+	assert [matrix[row] for row in ROWS] == [0, 0, 0]
+
+	matrix.hold((2, 2))
+	keypad._scan()
+	assert keypad.pressed() == [(2, 2)]
+	assert keypad.ghosts == 0 and not keypad.ambiguous
+
+
+def test_debounce(matrix):
+	keypad = GPIO.keypad(ROWS, COLUMNS, debounce=60)
+	keypad._scanning = True
+	matrix.hold((1, 1))
+	keypad._scan()
+	assert keypad.pressed() == []
+	assert (1, 1) in keypad._pending
+	keypad.close()
+
+
+def test_ghost_keeps_reported_keys(matrix, keypad):
+	matrix.hold((0, 0), (0, 1))
+	keypad._scan()
+	assert sorted(keypad.pressed()) == [(0, 0), (0, 1)]
+
+	# A third key of the rectangle makes (1, 1) read as pressed too
+	matrix.hold((0, 0), (0, 1), (1, 0))
+	keypad._scan()
+	assert sorted(keypad.pressed()) == [(0, 0), (0, 1)]
+	assert keypad.ambiguous == {(1, 0), (1, 1)}
+	assert keypad.ghosts == 1
+
+	# Once the rectangle breaks up the real key is reported
+	matrix.hold((0, 0), (1, 0))
+	keypad._scan()
+	assert sorted(keypad.pressed()) == [(0, 0), (1, 0)]
+	assert not keypad.ambiguous
+
+
+def test_ghost_held_back_when_pressed_together(matrix, keypad):
+	matrix.hold((0, 0), (0, 1), (1, 0))
+	keypad._scan()
+	assert keypad.pressed() == []
+	assert keypad.ambiguous == {(0, 0), (0, 1), (1, 0), (1, 1)}
+
+	matrix.hold((0, 0), (0, 1))
+	keypad._scan()
+	assert sorted(keypad.pressed()) == [(0, 0), (0, 1)]
+
+
+def test_keys_mapping_and_callback(matrix):
+	events = []
+	keys = ["123", "456", "789"]
+	keypad = GPIO.keypad(ROWS, COLUMNS, keys=keys, callback=lambda key, pressed: events.append((key, pressed)), debounce=0)
+	keypad._scanning = True
+	matrix.hold((1, 2))
+	keypad._scan()
+	assert keypad.pressed() == ["6"]
+	deadline = time.monotonic() + 2
+	while not events and time.monotonic() < deadline:
+		time.sleep(0.001)
+	assert events == [("6", True)]
+	keypad.close()
@@ -0,0 +1,69 @@
+"""
+Latency histograms of event() and watch() actions, on the Virtual wrapper
+"""
+import time, threading
+
+from anygpio import GPIO
+from anygpio.latency import Histogram, LatencyStats
+from anygpio.wrappers.Virtual import native_gpio
+
+
+def test_histogram_percentiles():
+	histogram = Histogram()
+	for value in [100] * 98 + [5000, 70000]:
+		histogram.add(value)
+	histogram.add(-5)
+
+	summary = histogram.summary()
+	assert summary["count"] == 101
+	assert summary["max"] == 70000
+	# Percentiles are the upper bound of their power of two bucket
+	assert summary["p50"] == 128
+	assert summary["p99"] == 8192
+	histogram.reset()
+	assert histogram.summary()["count"] == 0
+
+
+def test_wrap_with_a_detection_time():
+	stats = LatencyStats()
+	detected = time.monotonic_ns()
+	stats.wrap(lambda: time.sleep(0.001), detected)()
+	stats.wrap(lambda: None)()
+
+	summary = stats.summary()
+	assert summary["run"]["count"] == 2
+	assert summary["total"]["count"] == 1
+	assert summary["enqueue"]["max"] == 0
+	assert summary["total"]["max"] >= 1000000
+
+
+def test_unqueued_events_only_record_run():
+	GPIO.setup_pin(120, "LATENCY_EVENT")
+	GPIO.track_latency()
+	GPIO.pin(120).event(lambda *_: None)
+
+	native_gpio.set_input(120, 0)
+	summary = GPIO.latency_stats()["pins"][120]
+	assert summary["run"]["count"] == 1
+	assert summary["total"]["count"] == 0
+
+
+def test_watch_records_from_detection():
+	ran = threading.Event()
+	GPIO.setup_pin(121, "LATENCY_WATCH", action=lambda: (time.sleep(0.001), ran.set()))
+	GPIO.track_latency()
+	native_gpio.set_input(121, 0)
+
+	thread = threading.Thread(target=GPIO.watch, args=(0.001,), daemon=True)
+	thread.start()
+	assert ran.wait(2)
+	GPIO.stop_watching()
+	thread.join(2)
+
+	summary = GPIO.latency_stats()["pins"][121]
+	assert summary["total"]["count"] == summary["run"]["count"] >= 1
+	assert summary["enqueue"]["max"] == 0
+	assert summary["total"]["max"] >= summary["run"]["max"] >= 1000000
+
+	GPIO.reset_latency()
+	assert GPIO.latency_stats()["pins"][121]["total"]["count"] == 0
@@ -0,0 +1,89 @@
+"""
+Publishing pin states in shared memory, on the Virtual wrapper
+"""
+import time, uuid
+
+import pytest
+
+from anygpio import GPIO, errors
+from anygpio.mirror import MirrorReader
+from anygpio.wrappers.Virtual import native_gpio
+
+
+@pytest.fixture
+def mirror():
+	mirror = GPIO.publish_state("anygpio-test-" + uuid.uuid4().hex[:8])
+	yield mirror
+	mirror.close()
+
+
+def test_levels_and_edges(mirror):
+	GPIO.setup_pin(110, "MIRROR_IN")
+	GPIO.setup_pin(111, "MIRROR_OUT", out=True)
+	mirror.attach()
+	reader = MirrorReader(mirror.name)
+
+	GPIO.pin(111).output(1)
+	GPIO.pin(111).output(1)
+	GPIO.pin(111).output(0)
+	native_gpio.set_input(110, 0)
+	GPIO.pin(110).input()
+
+	snapshot = reader.snapshot()
+	assert snapshot[111][:2] == (0, 2)
+	assert snapshot[110][:2] == (0, 1)
+	assert snapshot[110][2] > 0
+	reader.close()
+
+
+def test_events_update_the_mirror(mirror):
+	GPIO.setup_pin(112, "MIRROR_EVENT")
+	mirror.attach()
+	GPIO.pin(112).event(lambda *_: None, both=True)
+
+	native_gpio.set_input(112, 0)
+	native_gpio.set_input(112, 1)
+	reader = MirrorReader(mirror.name)
+	assert reader.snapshot()[112][:2] == (1, 2)
+	reader.close()
+
+
+def test_refresh_samples_inputs_nobody_reads(mirror):
+	GPIO.setup_pin("door", "MIRROR_DOOR")
+	mirror.attach()
+	mirror.refresh(0.005)
+	reader = MirrorReader(mirror.name)
+
+	native_gpio.set_input("door", 0)
+	end = time.monotonic() + 2
+	while reader.snapshot()["door"][0] and time.monotonic() < end:
+		time.sleep(0.002)
+	assert reader.snapshot()["door"][:2] == (0, 1)
+	reader.close()
+
+
+def test_ids_must_fit_a_slot(mirror):
+	GPIO.setup_pin("a" * 16)
+	mirror.attach()
+	GPIO.setup_pin("b" * 17)
+	with pytest.raises(errors.MirrorError):
+		mirror.attach()
+
+	reader = MirrorReader(mirror.name)
+	assert list(reader.snapshot()) == ["a" * 16]
+	reader.close()
+
+
+def test_close_stops_refreshing(mirror):
+	GPIO.setup_pin(113)
+	mirror.attach()
+	mirror.refresh(0.005)
+	timer = mirror._timer
+	mirror.close()
+	mirror.refresh(0.005)
+
+	assert timer.cancelled
+	assert mirror._timer is timer
+	# Updates after close are ignored instead of writing to the closed block
+	GPIO.pin(113).input()
+	mirror.update(GPIO.pin(113), 0)
@@ -0,0 +1,74 @@
+"""
+Streaming packed pin states with Player, on the Virtual wrapper
+"""
+import time
+
+import pytest
+
+from anygpio import GPIO
+from anygpio.player import Player
+from anygpio.wrappers.Virtual import native_gpio
+
+
+@pytest.fixture
+def writes(monkeypatch):
+	"""
+	Record every native (channel, value) write
+	"""
+	writes = []
+	output = native_gpio.output
+	def record(channel, value):
+		writes.append((channel, value))
+		output(channel, value)
+	monkeypatch.setattr(native_gpio, "output", record)
+	return writes
+
+
+def outputs(*ids):
+	for id in ids:
+		GPIO.setup_pin(id, "PLAYER_%d" % id, out=True)
+	return [GPIO.pin(id) for id in ids]
+
+
+def test_plays_only_changed_pins(writes):
+	outputs(50, 51)
+	player = GPIO.play(["PLAYER_50", 51], bytes([0b00, 0b01, 0b11, 0b10]), 1000)
+
+	assert player.wait(2)
+	# Every pin on the first sample, then only the pins that changed
+	assert writes == [(50, 0), (51, 0), (50, 1), (51, 1), (50, 0)]
+	assert (native_gpio.levels[50], native_gpio.levels[51]) == (0, 1)
+	assert player.position == 0
+
+
+def test_update_swaps_at_the_end_of_a_pass():
+	pins = outputs(52, 53)
+	player = Player(GPIO, pins, bytes([0b01, 0b10]), 2000, loop=True).start()
+	time.sleep(0.01)
+	player.update(bytes([0b11]))
+	time.sleep(0.01)
+	player.stop()
+
+	assert (native_gpio.levels[52], native_gpio.levels[53]) == (1, 1)
+	assert player._samples.tobytes() == bytes([0b11])
+	assert player._pending is None
+
+
+def test_16_bit_samples(writes):
+	pins = outputs(*range(54, 63))
+	samples = memoryview(bytearray(4)).cast("H")
+	samples[1] = 1 << 8
+
+	Player(GPIO, pins, samples, 1000).start().wait(2)
+	assert writes[-1] == (62, 1)
+	assert native_gpio.levels[62] == 1
+
+
+def test_rejects_empty_buffers():
+	pins = outputs(63)
+	with pytest.raises(ValueError):
+		GPIO.play(pins, b"", 1000)
+
+	player = Player(GPIO, pins, b"\x00", 1000)
+	with pytest.raises(ValueError):
+		player.update(bytearray())
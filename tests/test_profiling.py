@@ -0,0 +1,55 @@
+"""
+Profiling native calls, on the Virtual wrapper
+"""
+from anygpio import GPIO, trace
+from anygpio.wrappers import Virtual
+from anygpio.wrappers.Virtual import native_gpio
+
+
+def test_report_counts_calls_per_pin():
+	GPIO.setup_pin(130, "PROFILED_IN")
+	GPIO.setup_pin(131, "PROFILED_OUT", out=True)
+	profiler = GPIO.profile()
+
+	for _ in range(3):
+		GPIO.pin(130).input()
+	GPIO.pin(131).output(1)
+	GPIO.pin(131).output(0)
+	profiler.stop()
+	GPIO.pin(130).input()
+
+	calls = {(entry["op"], entry["pin"]): entry for entry in profiler.report()}
+	assert calls[("input", 130)]["calls"] == 3
+	assert calls[("output", 131)]["calls"] == 2
+	assert calls[("output", 131)]["max_ns"] >= calls[("output", 131)]["mean_ns"] > 0
+	totals = [entry["total_ns"] for entry in profiler.report()]
+	assert totals == sorted(totals, reverse=True)
+
+
+def test_stop_restores_the_methods():
+	original = Virtual.InputPin.__dict__["input"]
+	with GPIO.profile():
+		assert Virtual.InputPin.__dict__["input"] is not original
+	assert Virtual.InputPin.__dict__["input"] is original
+
+
+def test_custom_hook_gets_gpio_calls():
+	calls = []
+	profiler = GPIO.profile(hook=lambda op, pin, duration: calls.append((op, pin, duration)))
+	GPIO.setup_pin(132, "PROFILED_HOOK")
+	profiler.stop()
+
+	assert ("setup", 132) in [(op, getattr(pin, "id", None)) for op, pin, _ in calls]
+	assert all(duration >= 0 for _, _, duration in calls)
+
+
+def test_profiling_keeps_instance_hooks(tmp_path):
+	GPIO.setup_pin(133, "PROFILED_TRACE", out=True)
+	with trace.Recorder(GPIO, str(tmp_path / "profiled.trace")) as recorder:
+		with GPIO.profile() as profiler:
+			GPIO.pin(133).output(1)
+		GPIO.pin(133).output(0)
+
+	assert recorder.count == 2
+	assert [entry["calls"] for entry in profiler.report() if entry["op"] == "output"] == [1]
+	assert native_gpio.levels[133] == 0
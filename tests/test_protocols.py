@@ -0,0 +1,307 @@
+"""
+Bit-banged protocol engines against simulated devices, on the Virtual wrapper
+
+The Virtual levels are replaced with a dict that tells the simulated
+	devices about every level written by the master, including the bulk
+	writes of GPIO.sequence_writer()
+"""
+import time
+
+import pytest
+
+from anygpio import GPIO, errors
+from anygpio.protocols import ShiftRegister, SoftSPI, SoftI2C, OneWire, crc8
+from anygpio.wrappers.Virtual import native_gpio
+
+
+class Wires(dict):
+	"""
+	Virtual levels calling listener(channel, level) on every write
+	"""
+	def __init__(self, levels):
+		super().__init__(levels)
+		self.listeners = []
+
+	def __setitem__(self, channel, level):
+		super().__setitem__(channel, level)
+		for listener in self.listeners:
+			listener(channel, level)
+
+	def update(self, pairs):
+		for channel, level in pairs:
+			self[channel] = level
+
+	def drive(self, channel, level):
+		"""
+		Set a level from a simulated device, without notifying the devices
+		"""
+		super().__setitem__(channel, level)
+
+
+@pytest.fixture
+def wires(monkeypatch):
+	wires = Wires(native_gpio.levels)
+	monkeypatch.setattr(native_gpio, "levels", wires)
+	return wires
+
+
+def outputs(*ids):
+	for id in ids:
+		GPIO.setup_pin(id, out=True)
+
+
+class Register595:
+	"""
+	Chain of 74HC595 shift registers
+	"""
+	def __init__(self, wires, data, clock, latch):
+		self.wires = wires
+		self.pins = (data, clock, latch)
+		self.shifted = 0
+		self.value = None
+		wires.listeners.append(self.change)
+
+	def change(self, channel, level):
+		data, clock, latch = self.pins
+		if channel == clock and level:
+			self.shifted = self.shifted << 1 | self.wires[data]
+		elif channel == latch and level:
+			self.value = self.shifted
+
+
+def test_shift_register(wires):
+	outputs(170, 171, 172)
+	device = Register595(wires, 170, 171, 172)
+	register = ShiftRegister(GPIO, 170, 171, 172)
+
+	register.write(bytes([0xA5, 0x3C]))
+	assert device.value & 0xFFFF == 0xA53C
+
+	register.write_value(0x81)
+	assert device.value & 0xFF == 0x81
+
+	# LSB first
+	ShiftRegister(GPIO, 170, 171, 172, msb_first=False).write(bytes([0x01]))
+	assert device.value & 0xFF == 0x80
+
+
+class SPIDevice:
+	"""
+	SPI device sending reply while recording what it receives
+	"""
+	def __init__(self, wires, sclk, mosi, miso, cs, mode, reply):
+		self.wires = wires
+		self.pins = (sclk, mosi, miso, cs)
+		self.cpol = mode >> 1
+		self.cpha = mode & 1
+		self.reply = [(byte >> bit) & 1 for byte in reply for bit in range(7, -1, -1)]
+		self.received = []
+		self.selected = cs is None
+		self.clock = self.cpol
+		wires.listeners.append(self.change)
+
+	def shift_out(self):
+		if self.reply:
+			self.wires.drive(self.pins[2], self.reply.pop(0))
+
+	def change(self, channel, level):
+		sclk, mosi, miso, cs = self.pins
+		if channel == cs:
+			self.selected = not level
+			if self.selected and not self.cpha:
+				self.shift_out()
+		elif channel == sclk and level != self.clock:
+			self.clock = level
+			if not self.selected:
+				return
+			leading = level != self.cpol
+			if leading != bool(self.cpha):
+				self.received.append(self.wires[mosi])
+			else:
+				self.shift_out()
+
+	def bytes(self):
+		bits = self.received
+		return bytes(int("".join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits), 8))
+
+
+@pytest.mark.parametrize("mode", [0, 1, 2, 3])
+def test_spi_transfer(wires, mode):
+	outputs(173, 174, 175)
+	GPIO.setup_pin(176)
+	device = SPIDevice(wires, 173, 174, 176, 175, mode, b"\x5a\xc3")
+	spi = SoftSPI(GPIO, 173, 174, miso=176, cs=175, mode=mode)
+
+	assert spi.transfer(b"\x12\xfe") == b"\x5a\xc3"
+	assert device.bytes() == b"\x12\xfe"
+	# The clock idles at CPOL and cs is released
+	assert (wires[173], wires[175]) == (mode >> 1, 1)
+
+
+def test_spi_write_without_cs(wires):
+	outputs(173, 174)
+	device = SPIDevice(wires, 173, 174, None, None, 0, b"")
+	spi = SoftSPI(GPIO, 173, 174)
+
+	spi.write(b"\x01\x80")
+	assert device.bytes() == b"\x01\x80"
+	with pytest.raises(errors.ProtocolError):
+		spi.transfer(b"\x00")
+	with pytest.raises(ValueError):
+		SoftSPI(GPIO, 173, 174, mode=4)
+
+
+class I2CDevice:
+	"""
+	I2C device at address with 8 bit registers, auto incrementing
+	"""
+	def __init__(self, wires, scl, sda, address, registers):
+		self.wires = wires
+		self.scl, self.sda = scl, sda
+		self.address = address
+		self.registers = registers
+		self.state = "idle"
+		self.bits = 0
+		self.byte = 0
+		self.pointer = None
+		wires.listeners.append(self.change)
+
+	def change(self, channel, level):
+		wires = self.wires
+		if channel == self.sda and wires[self.scl]:
+			# START or STOP
+			self.state = "idle" if level else "address"
+			self.bits = self.byte = 0
+			self.pointer = None if level else self.pointer
+			return
+		if channel != self.scl or self.state == "idle":
+			return
+
+		if level:
+			self.clock_high()
+		elif self.bits == 9:
+			# End of the acknowledge clock
+			self.bits = self.byte = 0
+			wires.drive(self.sda, 1)
+		elif self.state == "sending" and self.bits == 8:
+			# Release SDA for the master's acknowledge
+			wires.drive(self.sda, 1)
+
+	def clock_high(self):
+		wires = self.wires
+		self.bits += 1
+		if self.state == "sending":
+			if self.bits <= 8:
+				wires.drive(self.sda, (self.registers[self.pointer] >> (8 - self.bits)) & 1)
+			elif self.bits == 9:
+				if wires[self.sda]:
+					# NACK, the master is done
+					self.state = "idle"
+				else:
+					self.pointer += 1
+			return
+
+		if self.bits <= 8:
+			self.byte = self.byte << 1 | wires[self.sda]
+			return
+
+		# Acknowledge clock
+		if self.state == "address":
+			if self.byte >> 1 != self.address:
+				self.state = "idle"
+				return
+			wires.drive(self.sda, 0)
+			if self.byte & 1:
+				self.state = "sending"
+				self.pointer = self.pointer or 0
+			else:
+				self.state = "receiving"
+		else:
+			wires.drive(self.sda, 0)
+			if self.pointer is None:
+				self.pointer = self.byte
+			else:
+				self.registers[self.pointer] = self.byte
+				self.pointer += 1
+
+
+def test_i2c_write_and_read_registers(wires):
+	outputs(177, 178)
+	registers = bytearray(8)
+	I2CDevice(wires, 177, 178, 0x40, registers)
+	i2c = SoftI2C(GPIO, 177, 178)
+
+	i2c.write(0x40, b"\x02\xaa\x55")
+	assert registers[2:4] == b"\xaa\x55"
+	assert i2c.write_read(0x40, b"\x02", 2) == b"\xaa\x55"
+	# The bus is left idle
+	assert (wires[177], wires[178]) == (1, 1)
+
+
+def test_i2c_nack(wires):
+	outputs(177, 178)
+	I2CDevice(wires, 177, 178, 0x40, bytearray(8))
+
+	with pytest.raises(errors.ProtocolError, match="not acknowledged"):
+		SoftI2C(GPIO, 177, 178).write(0x41, b"\x00")
+	SoftI2C(GPIO, 177, 178, check_ack=False).write(0x41, b"\x00")
+
+
+class OneWireDevice:
+	"""
+	1-Wire device answering resets and READ ROM
+	"""
+	def __init__(self, wires, pin, rom):
+		self.wires = wires
+		self.pin = pin
+		self.rom = [(byte >> bit) & 1 for byte in rom for bit in range(8)]
+		self.command = []
+		self.fell = None
+		wires.listeners.append(self.change)
+
+	def change(self, channel, level):
+		if channel != self.pin:
+			return
+		now = time.perf_counter_ns()
+		if not level:
+			self.fell = now
+			return
+		if self.fell is None:
+			return
+
+		low = now - self.fell
+		if low > 400000:
+			# Reset: answer with a presence pulse
+			self.command = []
+			self.wires.drive(self.pin, 0)
+		elif len(self.command) < 8:
+			self.command.append(0 if low > 30000 else 1)
+		elif self.command == [1, 1, 0, 0, 1, 1, 0, 0] and self.rom:
+			# READ ROM (0x33, LSB first): hold the line low for 0 bits
+			if not self.rom.pop(0):
+				self.wires.drive(self.pin, 0)
+
+
+def test_one_wire_read_rom(wires):
+	GPIO.setup_pin(179, out=True)
+	rom = bytes([0x02, 0x1C, 0xB8, 0x01, 0, 0, 0])
+	rom += bytes([crc8(rom)])
+	OneWireDevice(wires, 179, rom)
+
+	assert OneWire(GPIO, 179).read_rom() == rom
+
+
+def test_one_wire_errors(wires):
+	GPIO.setup_pin(179, out=True)
+	bus = OneWire(GPIO, 179)
+	with pytest.raises(errors.ProtocolError, match="No 1-Wire device"):
+		bus.select()
+
+	OneWireDevice(wires, 179, bytes(7) + b"\x01")
+	with pytest.raises(errors.ProtocolError, match="CRC"):
+		bus.read_rom()
+
+
+def test_crc8():
+	assert crc8(bytes([0x02, 0x1C, 0xB8, 0x01, 0, 0, 0])) == 0xA2
+	assert crc8(bytes([0x02, 0x1C, 0xB8, 0x01, 0, 0, 0, 0xA2])) == 0
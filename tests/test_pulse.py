@@ -0,0 +1,116 @@
+"""
+Frequency and duty cycle measurement, on the Virtual wrapper
+
+Edges are timestamped with a fake clock so the signals are exact
+"""
+import pytest
+
+from anygpio import GPIO, pulse
+from anygpio.wrappers.Virtual import native_gpio
+
+
+class Clock:
+	"""
+	Stand-in for the time module, advanced by the tests
+	"""
+	def __init__(self):
+		self.now = 10 ** 9
+
+	def monotonic_ns(self):
+		return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+	clock = Clock()
+	monkeypatch.setattr(pulse, "time", clock)
+	return clock
+
+
+def signal(clock, id, periods, period_ns, high_ns):
+	"""
+	Drive a square wave on an input, starting with a rising edge
+	"""
+	for _ in range(periods):
+		native_gpio.set_input(id, 1)
+		clock.now += high_ns
+		native_gpio.set_input(id, 0)
+		clock.now += period_ns - high_ns
+
+
+def meter(id, **kwargs):
+	GPIO.setup_pin(id, pull_up_down=0)
+	native_gpio.set_input(id, 0)
+	return GPIO.pin(id).measure(**kwargs)
+
+
+def test_square_wave(clock):
+	measured = meter(190)
+	signal(clock, 190, 20, 1000000, 250000)
+	native_gpio.set_input(190, 1)
+
+	assert measured.frequency == pytest.approx(1000)
+	assert measured.period == pytest.approx(0.001)
+	assert measured.pulse_width == pytest.approx(0.00025)
+	assert measured.duty_cycle == pytest.approx(25)
+	stats = measured.stats()
+	assert stats["jitter"] == 0
+	assert (stats["periods"], stats["edges"], stats["glitches"]) == (16, 41, 0)
+
+
+def test_window_follows_the_signal(clock):
+	measured = meter(191, window=4)
+	signal(clock, 191, 10, 1000000, 500000)
+	signal(clock, 191, 5, 2000000, 500000)
+	native_gpio.set_input(191, 1)
+
+	assert measured.frequency == pytest.approx(500)
+	assert measured.duty_cycle == pytest.approx(25)
+
+
+def test_seconds_window(clock):
+	measured = meter(192, seconds=0.0105)
+	signal(clock, 192, 30, 1000000, 500000)
+	native_gpio.set_input(192, 1)
+
+	# Periods ending in the last 10.5ms
+	assert measured.stats()["periods"] == 11
+
+
+def test_jitter(clock):
+	measured = meter(193)
+	for period in (900000, 1100000) * 4:
+		signal(clock, 193, 1, period, 100000)
+	native_gpio.set_input(193, 1)
+
+	assert measured.frequency == pytest.approx(1000)
+	assert measured.stats()["jitter"] == pytest.approx(0.0001, rel=0.1)
+
+
+def test_stopped_signal(clock):
+	measured = meter(194, timeout=0.5)
+	signal(clock, 194, 5, 1000000, 500000)
+	native_gpio.set_input(194, 1)
+	clock.now += 10 ** 9
+
+	assert measured.frequency == 0
+	assert measured.period is None
+	assert measured.pulse_width is None
+	# Stuck high
+	assert measured.duty_cycle == 100
+
+
+def test_glitches_and_reset(clock):
+	measured = meter(195)
+	signal(clock, 195, 3, 1000000, 500000)
+	# A callback without a level change: an edge was missed
+	measured._edge()
+	assert measured.glitches == 1
+
+	measured.reset()
+	assert measured.stats()["periods"] == 0
+	assert measured.edges == 0
+
+	measured.close()
+	signal(clock, 195, 3, 1000000, 500000)
+	assert measured.edges == 0
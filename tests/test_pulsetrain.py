@@ -0,0 +1,149 @@
+"""
+Pulse train decoders and capture, on the Virtual wrapper
+"""
+import time
+
+import pytest
+
+from anygpio import GPIO, errors, pulsetrain
+from anygpio.wrappers.Virtual import native_gpio
+
+
+def nec_pulses(address, command):
+	"""
+	Returns the (level, microseconds) pulses of an NEC frame
+	"""
+	value = address | (address ^ 0xff) << 8 | command << 16 | (command ^ 0xff) << 24
+	pulses = [(0, 9000), (1, 4500)]
+	for bit in range(32):
+		pulses += [(0, 562), (1, 1687 if value >> bit & 1 else 562)]
+	return pulses + [(0, 562)]
+
+
+def dht_pulses(data):
+	"""
+	Returns the (level, microseconds) pulses of a DHT response carrying 5 bytes
+	"""
+	pulses = [(0, 80), (1, 80)]
+	for byte in data:
+		for bit in range(7, -1, -1):
+			pulses += [(0, 50), (1, 70 if byte >> bit & 1 else 26)]
+	return pulses + [(0, 50)]
+
+
+def edges(pulses, start=None):
+	"""
+	Returns the edge timestamps of pulses, ending a second ago by default
+	"""
+	if start is None:
+		start = time.monotonic_ns() - 1000000000 - sum(duration for _, duration in pulses) * 1000
+	times = [start]
+	for _, duration in pulses:
+		times.append(times[-1] + duration * 1000)
+	return times
+
+
+def test_nec():
+	decoder = pulsetrain.NEC()
+	assert decoder.decode(nec_pulses(0x04, 0x08)) == {"address": 0x04, "command": 0x08, "repeat": False}
+	assert decoder.decode([(0, 9000), (1, 2250), (0, 562)]) == {"address": 0x04, "command": 0x08, "repeat": True}
+
+	pulses = nec_pulses(0x04, 0x08)
+	pulses[-2] = (1, 3000)
+	with pytest.raises(errors.ProtocolError, match="bad space"):
+		decoder.decode(pulses)
+	with pytest.raises(errors.ProtocolError, match="no leader"):
+		decoder.decode([(0, 562), (1, 562)])
+	with pytest.raises(errors.ProtocolError, match="repeat code"):
+		pulsetrain.NEC().decode([(0, 9000), (1, 2250)])
+
+
+def test_dht():
+	# 65.2%, -10.1°C
+	data = bytes([0x02, 0x8c, 0x80, 0x65])
+	frame = pulsetrain.DHT(22).decode(dht_pulses(data + bytes([sum(data) & 0xff])))
+	assert frame == {"humidity": 65.2, "temperature": -10.1}
+
+	data = bytes([40, 0, 21, 3])
+	frame = pulsetrain.DHT(11).decode(dht_pulses(data + bytes([sum(data) & 0xff])))
+	assert frame == {"humidity": 40, "temperature": 21.3}
+
+	with pytest.raises(errors.ProtocolError, match="checksum"):
+		pulsetrain.DHT(11).decode(dht_pulses(data + b"\x00"))
+	with pytest.raises(errors.ProtocolError, match="of 40 bits"):
+		pulsetrain.DHT().decode(dht_pulses(data))
+
+
+def test_hcsr04():
+	decoder = pulsetrain.HCSR04()
+	frame = decoder.decode([(1, 5831)])
+	assert frame["distance"] == pytest.approx(1.0, rel=0.01)
+	assert decoder.decode([(1, 38000)])["distance"] is None
+	with pytest.raises(errors.ProtocolError):
+		decoder.decode([])
+
+
+def test_frames_from_edges():
+	GPIO.setup_pin(200)
+	frames = []
+	train = GPIO.pin(200).pulse_train(pulsetrain.NEC(), callback=frames.append)
+
+	# Levels alternate from the idle level
+	train._edges.extend(edges([(0, 100), (1, 200)], start=0))
+	assert train._pulses() == [(0, 100), (1, 200)]
+	assert not train._edges
+
+	train._edges.extend(edges(nec_pulses(0x10, 0x20)))
+	train._flush()
+	train._edges.extend(edges([(0, 562)] * 3))
+	train._flush()
+	deadline = time.monotonic() + 2
+	while not frames and time.monotonic() < deadline:
+		time.sleep(0.001)
+
+	assert frames == [{"address": 0x10, "command": 0x20, "repeat": False}]
+	assert (train.frames, train.errors) == (1, 1)
+	train.close()
+
+
+def test_edges_start_the_frame_timer():
+	GPIO.setup_pin(200)
+	train = GPIO.pin(200).pulse_train(pulsetrain.NEC())
+	native_gpio.set_input(200, 0)
+	native_gpio.set_input(200, 1)
+	assert len(train._edges) == 2
+	assert train._timer is not None
+	train.close()
+	assert train._timer is None
+
+
+def test_read_with_trigger_pin(monkeypatch):
+	GPIO.setup_pin(201, pull_up_down=0)
+	GPIO.setup_pin(202, out=True)
+	train = GPIO.pin(201).pulse_train(pulsetrain.HCSR04(), trigger=202)
+	triggers = []
+
+	def echo():
+		triggers.append(native_gpio.levels[202])
+		# A 5.8ms echo, about 1m
+		now = time.monotonic_ns()
+		train._edges.extend([now - 5831000, now])
+	send = train._send_trigger
+	monkeypatch.setattr(train, "_send_trigger", lambda: (send(), echo()))
+
+	frame = train.read()
+	assert frame["distance"] == pytest.approx(1.0, rel=0.01)
+	# The trigger pulse ended low
+	assert triggers == [0]
+	assert train.frames == 1
+	train.close()
+
+
+def test_read_without_response():
+	GPIO.setup_pin(203)
+	train = GPIO.pin(203).pulse_train(pulsetrain.DHT(22))
+	with pytest.raises(errors.ProtocolError, match="No response"):
+		train.read(timeout=0.01)
+	# The data line was released after the trigger pulse
+	assert native_gpio.directions[203] == native_gpio.IN
+	train.close()
@@ -0,0 +1,98 @@
+"""
+PWM duty cycle ramps, on the Virtual wrapper
+"""
+import concurrent.futures
+
+import pytest
+
+from anygpio import GPIO
+from anygpio.ramp import RampEngine
+
+
+@pytest.fixture
+def engine():
+	return RampEngine(tick=0.002)
+
+
+def pwm(id, name=None):
+	"""
+	Set up a Virtual PWM pin and record every duty cycle written to it
+	"""
+	GPIO.PWM(id, 100, name=name)
+	pin = GPIO.pin(id)
+	pin.written = []
+	change_duty_cycle = pin.change_duty_cycle
+	def record(value):
+		pin.written.append(value)
+		change_duty_cycle(value)
+	pin.change_duty_cycle = record
+	return pin
+
+
+def test_ramp_reaches_the_target(engine):
+	pin = pwm(40)
+	future = engine.ramp(pin, 80, 0.05, curve="ease_in_out")
+
+	assert future.result(timeout=2) is pin
+	assert pin.duty_cycle == 80
+	assert pin.native.duty_cycle == 80
+	assert len(pin.written) > 2
+	assert pin.written == sorted(pin.written)
+
+
+def test_ramp_down_with_a_curve_function(engine):
+	pin = pwm(41)
+	pin.change_duty_cycle(100)
+	engine.ramp(pin, 0, 0.03, curve=lambda x: x ** 3).result(timeout=2)
+
+	assert pin.duty_cycle == 0
+	assert pin.written[1:] == sorted(pin.written[1:], reverse=True)
+
+
+def test_new_ramp_replaces_the_running_one(engine):
+	pin = pwm(42)
+	first = engine.ramp(pin, 100, 10)
+	second = engine.ramp(pin, 20, 0.02)
+
+	assert first.cancelled()
+	second.result(timeout=2)
+	assert pin.duty_cycle == 20
+
+
+def test_cancel_leaves_the_duty_cycle(engine):
+	pin = pwm(43)
+	future = engine.ramp(pin, 100, 10)
+	engine.cancel(pin)
+
+	assert future.cancelled()
+	value = pin.duty_cycle
+	assert not engine._ramps
+	assert pin.duty_cycle == value
+
+
+def test_group_ramp(engine):
+	pins = [pwm(44), pwm(45)]
+	result = engine.ramp_group(pins, [30, 60], 0.02).result(timeout=2)
+
+	assert result == pins
+	assert [pin.duty_cycle for pin in pins] == [30, 60]
+
+	with pytest.raises(ValueError):
+		engine.ramp_group(pins, [10], 0.02)
+
+
+def test_group_is_cancelled_with_any_ramp(engine):
+	pins = [pwm(46), pwm(47)]
+	group = engine.ramp_group(pins, 50, 10)
+	engine.cancel(pins[1])
+	assert not group.done()
+	engine.ramp(pins[0], 50, 0.01).result(timeout=2)
+
+	with pytest.raises(concurrent.futures.CancelledError):
+		group.result(timeout=2)
+
+
+def test_gpio_ramp_resolves_queries():
+	pins = [pwm(48, "FADE_A"), pwm(49)]
+	GPIO.ramp(["FADE_A", 49], 40, 0.02).result(timeout=2)
+	assert [pin.duty_cycle for pin in pins] == [40, 40]
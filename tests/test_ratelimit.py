@@ -0,0 +1,78 @@
+"""
+Rate limited pin actions, on the Virtual wrapper
+"""
+import time, threading
+
+from anygpio import GPIO
+from anygpio.ratelimit import RateLimit
+from anygpio.wrappers.Virtual import native_gpio
+
+
+WINDOW = 0.05
+
+
+def test_trailing_delivers_the_last_merged_call():
+	limit = RateLimit(2, WINDOW)
+	calls = []
+	done = threading.Event()
+	def action(value):
+		calls.append(value)
+		if value == 4:
+			done.set()
+
+	for value in range(5):
+		limit.call(action, value)
+	assert calls == [0, 1]
+
+	assert done.wait(2)
+	assert calls == [0, 1, 4]
+	assert limit.burst.count == 3
+	assert limit.burst.first <= limit.burst.last
+	assert (limit.passed, limit.merged) == (2, 3)
+
+
+def test_on_burst_replaces_the_action():
+	bursts = []
+	done = threading.Event()
+	limit = RateLimit(1, WINDOW, on_burst=lambda burst: (bursts.append(burst), done.set()))
+	calls = []
+	for value in range(3):
+		limit.call(calls.append, value)
+
+	assert done.wait(2)
+	assert calls == [0]
+	assert [burst.count for burst in bursts] == [2]
+
+
+def test_without_trailing_each_window_has_its_own_burst():
+	limit = RateLimit(1, WINDOW, trailing=False)
+	calls = []
+	for value in range(4):
+		limit.call(calls.append, value)
+	assert limit.burst is None
+
+	time.sleep(WINDOW * 1.5)
+	limit.call(calls.append, 4)
+	limit.call(calls.append, 5)
+	assert calls == [0, 4]
+	assert limit.burst.count == 3
+
+	time.sleep(WINDOW * 1.5)
+	limit.call(calls.append, 6)
+	# Only the merged call of the second window
+	assert limit.burst.count == 1
+	assert limit._first is None and limit._pending is None
+	assert limit.stats()["merged"] == 4
+
+
+def test_pin_events_are_limited():
+	GPIO.setup_pin(80, "LIMITED")
+	pin = GPIO.pin(80)
+	pin.rate_limit(2, WINDOW, trailing=False)
+	calls = []
+	pin.event(calls.append, both=True)
+
+	for level in (0, 1) * 5:
+		native_gpio.set_input(80, level)
+	assert calls == [80, 80]
+	assert pin.limiter.stats()["merged"] == 8
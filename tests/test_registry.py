@@ -0,0 +1,145 @@
+"""
+Stress tests of the pin registry and OutputPin.toggle()
+
+Meant for free-threaded (no-GIL) CPython, where the threads really run
+	at once. On GIL builds the switch interval is lowered so the threads
+	still interleave as often as possible
+"""
+import sys, threading
+
+import pytest
+
+from anygpio import GPIO
+from anygpio.registry import PinRegistry
+from anygpio.wrappers.Virtual import native_gpio
+
+
+THREADS = 8
+ROUNDS = 2000
+
+
+@pytest.fixture(autouse=True)
+def switch_often():
+	"""
+	Switch threads as often as possible when the GIL is enabled
+	"""
+	interval = sys.getswitchinterval()
+	sys.setswitchinterval(1e-6)
+	yield
+	sys.setswitchinterval(interval)
+
+
+def run_threads(targets):
+	"""
+	Start every target on its own thread at the same time, returns the exceptions raised
+	"""
+	errors = []
+	barrier = threading.Barrier(len(targets))
+
+	def run(target):
+		barrier.wait()
+		try:
+			target()
+		except Exception as error:
+			errors.append(error)
+
+	threads = [threading.Thread(target=run, args=(target,)) for target in targets]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	return errors
+
+
+class Pin:
+	def __init__(self, id):
+		self.id = id
+
+
+def test_concurrent_replace_discard_and_iteration():
+	registry = PinRegistry()
+	ids = range(32)
+
+	def writer():
+		for round in range(ROUNDS):
+			pin = Pin(ids[round % len(ids)])
+			registry.replace(pin)
+			if round % 3:
+				assert registry.discard(pin) in (True, False)
+
+	def bulk_writer():
+		for _ in range(ROUNDS // 10):
+			registry.replace_all([Pin(id) for id in ids])
+
+	def reader():
+		for round in range(ROUNDS):
+			for id, pin in registry.items():
+				assert pin.id == id
+			for id in registry:
+				registry.get(id)
+			pin = registry.get(round % len(ids))
+			assert pin is None or pin.id == round % len(ids)
+			len(registry)
+
+	errors = run_threads([writer] * (THREADS // 2) + [bulk_writer] + [reader] * (THREADS // 2))
+	assert errors == []
+	assert all(registry[id].id == id for id in registry)
+
+
+def test_concurrent_lookups_while_pins_are_set_up():
+	ids = range(100, 116)
+	for id in ids:
+		GPIO.setup_pin(id, out=True)
+
+	def setter():
+		for round in range(ROUNDS // 10):
+			GPIO.setup_pin(ids[round % len(ids)], out=True)
+
+	def reader():
+		for round in range(ROUNDS):
+			pin = GPIO.pin(ids[round % len(ids)])
+			assert pin.id == ids[round % len(ids)]
+			for pin in GPIO.pins.values():
+				pin.id
+
+	errors = run_threads([setter] * 2 + [reader] * (THREADS - 2))
+	assert errors == []
+	assert all(GPIO.pin(id).id == id for id in ids)
+
+
+def test_concurrent_toggles_keep_every_update():
+	ids = range(200, 204)
+	toggles = 501
+	for id in ids:
+		GPIO.setup_pin(id, out=True)
+		GPIO.pin(id).output(0)
+
+	def toggler():
+		for _ in range(toggles):
+			for id in ids:
+				GPIO.pin(id).toggle()
+
+	# An odd number of toggles in total, a lost update leaves the wrong level
+	threads = THREADS - 1
+	errors = run_threads([toggler] * threads)
+	assert errors == []
+
+	expected = threads * toggles % 2
+	assert expected == 1
+	for id in ids:
+		assert native_gpio.levels[id] == expected
+		assert GPIO.pin(id).input() == expected
+
+
+def test_cleanup_empties_the_registry():
+	for id in range(300, 310):
+		GPIO.setup_pin(id)
+	pins = list(GPIO.pins.values())
+
+	GPIO.cleanup()
+
+	assert len(GPIO.pins) == 0
+	assert native_gpio.directions == {}
+	# Destroying a pin that is no longer registered leaves the registry alone
+	pins[0].destroy()
+	assert len(GPIO.pins) == 0
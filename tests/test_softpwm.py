@@ -0,0 +1,102 @@
+"""
+Software PWM engine and pins, on the Virtual wrapper
+"""
+import time
+
+import pytest
+
+from anygpio import GPIO, errors
+from anygpio.softpwm import SoftPWMEngine
+from anygpio.wrappers.Virtual import native_gpio
+
+
+@pytest.fixture
+def engine():
+	return SoftPWMEngine()
+
+
+def soft_pwm(engine, id, frequency=100, duty_cycle=0):
+	"""
+	Set up a software PWM pin driven by engine and return it
+	"""
+	pin = GPIO._create_SoftPWMPin_instance(id, None, engine=engine)
+	pin.setup(frequency, duty_cycle)
+	GPIO._add_pin(pin)
+	return pin
+
+
+def sample(id, seconds):
+	"""
+	Return the levels of a channel read every 100us for seconds
+	"""
+	levels = []
+	end = time.monotonic() + seconds
+	while time.monotonic() < end:
+		levels.append(native_gpio.levels[id])
+		time.sleep(0.0001)
+	return levels
+
+
+def test_duty_cycle(engine):
+	pin = soft_pwm(engine, 20, frequency=100)
+	pin.start(50)
+
+	levels = sample(20, 0.1)
+	assert 0.3 < sum(levels) / len(levels) < 0.7
+	# Both edges of every period are written
+	edges = sum(a != b for a, b in zip(levels, levels[1:]))
+	assert edges >= 10
+	assert engine.stats()["count"] >= 10
+
+	pin.change_duty_cycle(100)
+	time.sleep(0.03)
+	assert set(sample(20, 0.03)) == {1}
+
+	pin.change_duty_cycle(0)
+	time.sleep(0.03)
+	assert set(sample(20, 0.03)) == {0}
+
+
+def test_stop_leaves_the_pin_low(engine):
+	pin = soft_pwm(engine, 21, frequency=1000)
+	pin.start(100)
+	time.sleep(0.01)
+	assert native_gpio.levels[21] == 1
+
+	pin.stop()
+	assert set(sample(21, 0.02)) == {0}
+
+
+def test_input_and_toggle_read_the_output(engine):
+	pin = soft_pwm(engine, 22)
+	pin.output(1)
+	assert pin.input() == 1
+	assert pin.toggle() == 0
+	assert native_gpio.levels[22] == 0
+
+
+@pytest.mark.parametrize("frequency", [None, 0, -5, 2e9])
+def test_rejects_bad_frequencies(engine, frequency):
+	pin = GPIO._create_SoftPWMPin_instance(23, None, engine=engine)
+	with pytest.raises(ValueError):
+		pin.setup(frequency)
+
+	pin = soft_pwm(engine, 24)
+	with pytest.raises(ValueError):
+		pin.change_frequency(frequency)
+	assert pin.frequency == 100
+
+
+def test_failing_pin_is_dropped(engine, capsys):
+	good = soft_pwm(engine, 25, frequency=1000)
+	bad = soft_pwm(engine, 26, frequency=1000)
+	good.start(50)
+	bad.start(50)
+
+	# Stealing the channel makes the engine's writes fail
+	native_gpio.setup(26, native_gpio.IN)
+	time.sleep(0.02)
+	assert "WrongPinType" in capsys.readouterr().err
+	assert 26 not in engine._channels
+	assert set(sample(25, 0.02)) == {0, 1}
+	native_gpio.setup(26, native_gpio.OUT)
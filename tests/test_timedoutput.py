@@ -0,0 +1,107 @@
+"""
+Output writes scheduled at precise times, on the Virtual wrapper
+"""
+import time
+
+import pytest
+
+from anygpio import GPIO, errors
+from anygpio.timedoutput import OutputScheduler
+from anygpio.wrappers.Virtual import native_gpio
+
+
+@pytest.fixture
+def scheduler():
+	return OutputScheduler(GPIO)
+
+
+def outputs(*ids):
+	for id in ids:
+		GPIO.setup_pin(id, out=True)
+	return [GPIO.pin(id) for id in ids]
+
+
+def wait(scheduler, timeout=2):
+	"""
+	Wait until no write is pending
+	"""
+	deadline = time.monotonic() + timeout
+	while scheduler.pending() and time.monotonic() < deadline:
+		time.sleep(0.001)
+	# The last batch may still be writing
+	time.sleep(0.005)
+
+
+def test_writes_due_together_are_batched(scheduler):
+	first, second = outputs(210, 211)
+	at = time.monotonic_ns() + 5000000
+	writes = [scheduler.schedule(first, 1, at), scheduler.schedule(second, 1, at + 10000)]
+	wait(scheduler)
+
+	assert (native_gpio.levels[210], native_gpio.levels[211]) == (1, 1)
+	stats = scheduler.stats()
+	assert (stats["writes"], stats["batches"], stats["errors"]) == (2, 1, 0)
+	assert all(write.lateness >= 0 for write in writes)
+
+
+def test_second_write_to_a_pin_waits_for_the_next_batch(scheduler):
+	pin, = outputs(212)
+	at = time.monotonic_ns() + 5000000
+	scheduler.schedule(pin, 1, at)
+	scheduler.schedule(pin, 0, at + 1000)
+	wait(scheduler)
+
+	assert native_gpio.levels[212] == 0
+	assert (scheduler.writes, scheduler.batches) == (2, 2)
+
+
+def test_cancel(scheduler):
+	first, second = outputs(213, 214)
+	at = time.monotonic_ns() + 20000000
+	write = scheduler.schedule(first, 1, at)
+	scheduler.schedule(second, 1, at)
+	assert write.cancel()
+	assert scheduler.cancel(second) == 1
+	wait(scheduler)
+
+	assert (native_gpio.levels[213], native_gpio.levels[214]) == (0, 0)
+	assert (scheduler.writes, scheduler.cancelled) == (0, 2)
+	assert write.lateness is None
+
+
+def test_failing_write_is_counted_and_the_thread_keeps_running(scheduler, monkeypatch, capsys):
+	broken, pin = outputs(215, 216)
+	def fail(value):
+		raise RuntimeError("broken pin")
+	monkeypatch.setattr(broken, "output", fail)
+
+	at = time.monotonic_ns() + 5000000
+	scheduler.schedule(broken, 1, at)
+	scheduler.schedule(pin, 1, at + 5000000)
+	wait(scheduler)
+
+	assert native_gpio.levels[216] == 1
+	assert (scheduler.writes, scheduler.errors) == (1, 1)
+	assert "broken pin" in capsys.readouterr().err
+	scheduler.reset_stats()
+	assert scheduler.stats()["errors"] == 0
+
+
+def test_only_output_pins_can_be_scheduled(scheduler):
+	GPIO.setup_pin(217)
+	with pytest.raises(errors.WrongPinType):
+		scheduler.schedule(GPIO.pin(217), 1, time.monotonic_ns())
+	with pytest.raises(errors.WrongPinType):
+		GPIO.schedule(217, 1)
+	assert scheduler.pending() == 0 and scheduler._thread is None
+
+
+def test_schedule_pulse():
+	outputs(218)
+	start, end = GPIO.schedule_pulse(218, 0.005, delay=0.005)
+	deadline = time.monotonic() + 2
+	while end.written is None and time.monotonic() < deadline:
+		time.sleep(0.001)
+
+	assert native_gpio.levels[218] == 0
+	assert end.written - start.written >= 5000000 - GPIO._output_scheduler.slot
@@ -0,0 +1,83 @@
+"""
+Recording GPIO traffic to a trace file and replaying it, on the Virtual wrapper
+"""
+import pytest
+
+from anygpio import GPIO, errors, trace
+from anygpio.wrappers.Virtual import native_gpio
+
+
+def record_session(path):
+	"""
+	Record a short session: input reads, outputs and an event, returns the recorder
+	"""
+	GPIO.setup_pin(5, "BUTTON")
+	GPIO.setup_pin(6, "LED", out=True)
+	native_gpio.set_input(5, 1)
+
+	with trace.Recorder(GPIO, str(path)) as recorder:
+		GPIO.pin(5).event(both=True, bounce=0)
+		GPIO.pin(5).input()
+		native_gpio.set_input(5, 0)
+		GPIO.pin(5).input()
+		GPIO.pin(6).output(1)
+		GPIO.pin(6).output(0)
+	return recorder
+
+
+def test_records_every_call(tmp_path):
+	path = tmp_path / "session.trace"
+	recorder = record_session(path)
+
+	records = list(trace.Replayer(GPIO, str(path)).records())
+	assert len(records) == recorder.count
+	assert [(id, op, value) for _, id, op, value in records] == [
+		(5, trace.OP_INPUT, 1),
+		(5, trace.OP_EVENT, 0),
+		(5, trace.OP_INPUT, 0),
+		(6, trace.OP_OUTPUT, 1),
+		(6, trace.OP_OUTPUT, 0),
+	]
+	timestamps = [timestamp for timestamp, *_ in records]
+	assert timestamps == sorted(timestamps)
+	magic, count, table_length = trace.HEADER.unpack_from(path.read_bytes())
+	assert (magic, count) == (trace.MAGIC, recorder.count)
+	assert path.stat().st_size == trace.HEADER.size + table_length + count * trace.RECORD.size
+
+
+def test_stop_unhooks_the_pins(tmp_path):
+	recorder = record_session(tmp_path / "session.trace")
+	count = recorder.count
+
+	GPIO.pin(6).output(1)
+	GPIO.pin(5).input()
+	assert recorder.count == count
+
+
+def test_replay_inputs_events_and_outputs(tmp_path):
+	path = tmp_path / "session.trace"
+	record_session(path)
+	native_gpio.set_input(5, 1)
+	native_gpio.output(6, 1)
+
+	seen = []
+	def on_event(pin):
+		# The replayed level is visible to actions
+		seen.append((pin.id, pin.input()))
+
+	replayer = trace.Replayer(GPIO, str(path), speed=None, outputs=True, on_event=on_event)
+	replayer.run()
+
+	assert seen == [(5, 1)]
+	assert native_gpio.levels[6] == 0
+	# The native input() is restored once the replay finishes
+	native_gpio.set_input(5, 1)
+	assert GPIO.pin(5).input() == 1
+
+
+def test_replay_rejects_other_files(tmp_path):
+	path = tmp_path / "not.trace"
+	path.write_bytes(b"x" * 64)
+
+	with pytest.raises(errors.TraceError):
+		list(trace.Replayer(GPIO, str(path)).records())
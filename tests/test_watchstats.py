@@ -0,0 +1,85 @@
+"""
+Statistics of the watch() loop, on the Virtual wrapper
+"""
+import time, threading
+
+import pytest
+
+from anygpio import GPIO
+from anygpio.watchstats import WatchStats
+from anygpio.wrappers.Virtual import native_gpio
+
+
+@pytest.fixture
+def watching():
+	"""
+	Start watch() on a thread with the given interval, stopped at teardown
+	"""
+	threads = []
+	GPIO.reset_watch_stats()
+
+	def watch(interval):
+		thread = threading.Thread(target=GPIO.watch, args=(interval,), daemon=True)
+		thread.start()
+		threads.append(thread)
+
+	yield watch
+	GPIO.stop_watching()
+	for thread in threads:
+		thread.join(2)
+	GPIO.on_watch_stats(None)
+	GPIO.reset_watch_stats()
+
+
+def test_ticks():
+	stats = WatchStats()
+	stats.start(0.001)
+	stats.tick(0, 100, 0)
+	stats.tick(1200000, 600000, 500000)
+	stats.tick(2100000, 100, 0)
+
+	summary = stats.summary()
+	assert summary["ticks"] == 3
+	assert summary["requested"] == 1000000
+	assert summary["period"]["mean"] == 1050000
+	assert summary["jitter"]["max"] == 200000
+	assert summary["action"]["max"] == 500000
+	assert summary["overruns"] == 1
+
+	stats.reset()
+	assert stats.summary()["ticks"] == 0
+
+
+def test_callback_every():
+	reports = []
+	stats = WatchStats()
+	stats.callback = reports.append
+	stats.every = 0.01
+	stats.start(0.001)
+	first = time.monotonic_ns()
+	for tick in range(30):
+		stats.tick(first + tick * 1000000, 0, 0)
+
+	assert len(reports) == 2
+	assert reports[-1]["ticks"] == 21
+
+
+def test_watch_loop_counts_slow_actions(watching):
+	GPIO.setup_pin(140, "WATCHED", action=lambda: time.sleep(0.004))
+	reports = []
+	GPIO.on_watch_stats(reports.append, every=0.01)
+	native_gpio.set_input(140, 0)
+
+	watching(0.001)
+	end = time.monotonic() + 2
+	while len(reports) < 2 and time.monotonic() < end:
+		time.sleep(0.005)
+
+	summary = GPIO.watch_stats()
+	assert len(reports) >= 2
+	assert summary["requested"] == 1000000
+	assert summary["ticks"] >= 2
+	# The loop may be inside a tick while summary() runs
+	assert summary["overruns"] >= summary["ticks"] - 1
+	assert summary["action"]["min"] >= 4000000
+	assert summary["period"]["min"] >= 5000000